@@ -0,0 +1,110 @@
+"""
+Compara os dois caminhos de geração de áudio do agente.
+
+- ffmpeg: TTS em mp3 + Transcoder (atempo e compressão)
+- nativo: TTS já no formato e na velocidade finais, sem ffmpeg
+
+Para cada caminho mede a latência (TTS, transcodificação e total) e o tempo
+de CPU gasto localmente: o do próprio processo e o dos subprocessos ffmpeg.
+Faz chamadas reais à API de TTS (OPENAI_API_KEY).
+
+Uso:
+    uv run python -m scripts.benchmark_tts_audio --runs 10
+"""
+
+import argparse
+import asyncio
+import resource
+import time
+from typing import Dict, List
+
+from src.config import settings
+from src.lib.clients.openai import TTS_NATIVE_FORMATS, TTS_SPEED_MODELS, OpenAIClient
+from src.lib.ffmpeg import Transcoder, audio_options
+from src.lib.metrics import LatencyRecorder
+
+DEFAULT_TEXT = (
+    "Em caso de alagamento, evite atravessar ruas com água acumulada e "
+    "procure um local elevado. Se precisar de ajuda, ligue para a Defesa "
+    "Civil de Aracaju pelo número 199."
+)
+
+
+def _children_cpu() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+async def _run_path(
+    client: OpenAIClient, transcoder: Transcoder, text: str, runs: int, native: bool
+) -> Dict[str, object]:
+    latencies = LatencyRecorder()
+    sizes: List[int] = []
+    response_format = TTS_NATIVE_FORMATS.get(
+        (settings.audio_codec, settings.audio_format), "opus"
+    )
+    cpu_started = time.process_time()
+    children_started = _children_cpu()
+
+    for _ in range(runs):
+        started = time.perf_counter()
+        if native:
+            audio = await client.create_audio_bytes(
+                text, response_format=response_format, speed=settings.audio_speed
+            )
+            latencies.record("tts", (time.perf_counter() - started) * 1000)
+        else:
+            audio = await client.create_audio_bytes(text)
+            tts_done = time.perf_counter()
+            latencies.record("tts", (tts_done - started) * 1000)
+            audio = await transcoder.transcode(audio, **audio_options())
+            latencies.record("transcode", (time.perf_counter() - tts_done) * 1000)
+        latencies.record("total", (time.perf_counter() - started) * 1000)
+        sizes.append(len(audio))
+
+    return {
+        "latencies": latencies.summary(),
+        "cpu_ms_per_run": round((time.process_time() - cpu_started) * 1000 / runs, 2),
+        "ffmpeg_cpu_ms_per_run": round(
+            (_children_cpu() - children_started) * 1000 / runs, 2
+        ),
+        "mean_bytes": round(sum(sizes) / len(sizes)),
+    }
+
+
+def _print(name: str, result: Dict[str, object]):
+    print(f"\n[{name}]")
+    for stage, summary in result["latencies"].items():
+        print(
+            f"  {stage:<10} mean {summary['mean_ms']:>8} ms  "
+            f"p50 {summary['p50_ms']:>8} ms  p95 {summary['p95_ms']:>8} ms"
+        )
+    print(f"  CPU do processo   {result['cpu_ms_per_run']} ms/execução")
+    print(f"  CPU do ffmpeg     {result['ffmpeg_cpu_ms_per_run']} ms/execução")
+    print(f"  tamanho médio     {result['mean_bytes']} bytes")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--text", default=DEFAULT_TEXT)
+    args = parser.parse_args()
+
+    if settings.audio_speed != 1 and settings.tts_model not in TTS_SPEED_MODELS:
+        print(
+            f"Aviso: {settings.tts_model} ignora `speed`; o caminho nativo sai "
+            f"em velocidade 1 (use TTS_MODEL=tts-1 para comparar com "
+            f"{settings.audio_speed}x)."
+        )
+
+    client = OpenAIClient()
+    transcoder = Transcoder(concurrency=1, timeout=settings.transcode_timeout)
+    # Aquece conexão HTTP e cache do ffmpeg antes de medir
+    await transcoder.transcode(await client.create_audio_bytes("Olá."))
+
+    for name, native in (("ffmpeg", False), ("nativo", True)):
+        _print(name, await _run_path(client, transcoder, args.text, args.runs, native))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,171 @@
+"""
+Compara os engines de busca vetorial: sqlite-vec, exact (NumPy) e hnsw.
+
+Para cada engine mede a latência das buscas (p50/p95/p99) e o recall@k em
+relação à busca exata, além do tempo de construção do grafo HNSW. As
+consultas são vetores do próprio índice com um pouco de ruído. Usa o banco
+configurado (PATH_DB_FILE) ou, com --synthetic, um corpus sintético gerado
+em um diretório temporário. --hnsw-backend escolhe entre o hnswlib e o
+grafo em Python puro (padrão: hnswlib, se instalado).
+
+Uso:
+    uv run python -m scripts.benchmark_vector_engines --queries 200 --k 10
+    uv run python -m scripts.benchmark_vector_engines --synthetic 100000 --dim 384
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.config import settings
+from src.lib.metrics import LatencyRecorder
+from src.lib.vector_engines import ExactEngine, HNSWEngine, VectorMatrix
+
+Search = Callable[[np.ndarray, int], List[int]]
+
+
+def _synthetic_db(path: str, size: int, dimension: int, seed: int = 0):
+    """Tabela `documents` com vetores agrupados em clusters, como texto real."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, size // 500), dimension)).astype(np.float32)
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE documents (rowid INTEGER PRIMARY KEY AUTOINCREMENT, "
+        "text TEXT, text_embedding BLOB)"
+    )
+    for start in range(0, size, 10_000):
+        count = min(10_000, size - start)
+        vectors = centers[rng.integers(len(centers), size=count)]
+        vectors = vectors + 0.3 * rng.normal(size=vectors.shape).astype(np.float32)
+        conn.executemany(
+            "INSERT INTO documents(text, text_embedding) VALUES (?, ?)",
+            (("", vector.tobytes()) for vector in vectors.astype(np.float32)),
+        )
+    conn.commit()
+    return conn
+
+
+def _sqlite_vec_search(conn: sqlite3.Connection) -> Optional[Search]:
+    try:
+        import sqlite_vec
+
+        conn.enable_load_extension(True)
+        sqlite_vec.load(conn)
+        conn.enable_load_extension(False)
+        conn.execute("SELECT 1 FROM documents_vec LIMIT 1")
+    except Exception:
+        return None
+
+    def search(query: np.ndarray, k: int) -> List[int]:
+        rows = conn.execute(
+            "SELECT rowid FROM documents_vec "
+            "WHERE text_embedding MATCH ? AND k = ? ORDER BY distance",
+            (query.astype(np.float32).tobytes(), k),
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    return search
+
+
+def _measure(
+    search: Search, queries: np.ndarray, k: int, truth: List[set]
+) -> Tuple[Dict[str, float], float]:
+    latencies = LatencyRecorder(window=len(queries))
+    hits = 0
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        found = search(query, k)
+        latencies.record("search", (time.perf_counter() - started) * 1000)
+        hits += len(expected.intersection(found))
+    return latencies.summary()["search"], hits / (k * len(queries))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--synthetic", type=int, default=0)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--ef-search", type=int, default=settings.hnsw_ef_search)
+    parser.add_argument(
+        "--hnsw-backend", choices=("auto", "hnswlib", "python"), default="auto"
+    )
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="vector-engines-")
+    if args.synthetic:
+        conn = _synthetic_db(os.path.join(workdir, "vec.db"), args.synthetic, args.dim)
+    else:
+        conn = sqlite3.connect(settings.path_db_file)
+
+    started = time.perf_counter()
+    row = conn.execute(
+        "SELECT text_embedding FROM documents WHERE text_embedding IS NOT NULL "
+        "LIMIT 1"
+    ).fetchone()
+    if row is None:
+        raise SystemExit("Nenhum vetor na tabela documents")
+    matrix = VectorMatrix(
+        os.path.join(workdir, "vectors"), "benchmark", len(row[0]) // 4
+    )
+    matrix.sync(conn, "documents")
+    print(
+        f"{matrix.size} vetores de {matrix.dimension} dimensões carregados em "
+        f"{time.perf_counter() - started:.1f}s"
+    )
+
+    exact = ExactEngine(matrix)
+    started = time.perf_counter()
+    hnsw = HNSWEngine(
+        matrix,
+        m=settings.hnsw_m,
+        ef_construction=settings.hnsw_ef_construction,
+        ef_search=args.ef_search,
+        compiled=(
+            None if args.hnsw_backend == "auto" else args.hnsw_backend == "hnswlib"
+        ),
+    )
+    builder = hnsw._builder
+    if builder is not None:
+        builder.join()
+    elapsed = time.perf_counter() - started
+    print(
+        f"grafo HNSW ({hnsw.graph.backend}) construído em {elapsed:.1f}s "
+        f"({matrix.size / elapsed:.0f} linhas/s)"
+    )
+
+    rng = np.random.default_rng(1)
+    sample = rng.choice(matrix.size, size=min(args.queries, matrix.size), replace=False)
+    queries = np.asarray(matrix.vectors[np.sort(sample)])
+    queries = queries + 0.05 * queries.std() * rng.normal(size=queries.shape)
+    queries = queries.astype(np.float32)
+
+    def engine_search(engine) -> Search:
+        return lambda query, k: [rowid for rowid, _ in engine.search(query, k)]
+
+    truth = [set(engine_search(exact)(query, args.k)) for query in queries]
+    engines: Dict[str, Optional[Search]] = {
+        "sqlite-vec": _sqlite_vec_search(conn),
+        "exact": engine_search(exact),
+        "hnsw": engine_search(hnsw),
+    }
+
+    print(f"\n{'engine':<12}{'recall@' + str(args.k):>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, search in engines.items():
+        if search is None:
+            print(f"{name:<12}{'indisponível':>30}")
+            continue
+        latency, recall = _measure(search, queries, args.k, truth)
+        print(
+            f"{name:<12}{recall:>10.3f}{latency['p50_ms']:>10.2f}"
+            f"{latency['p99_ms']:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Compara formatos de armazenamento dos vetores no sqlite-vec: dimensão
+reduzida (parâmetro `dimensions` do modelo) e quantização int8 ou binary com
+reordenação pelos vetores float32.
+
+Para cada combinação gera um banco com o mesmo corpus sintético e mede o
+tamanho do arquivo, a latência das buscas (p50/p99) e o recall@k em relação
+à busca exata float32 na dimensão completa. Os vetores sintéticos são
+normalizados e concentram a variância nas primeiras dimensões, como os
+modelos treinados para truncamento (text-embedding-3-*). O padrão é um
+corpus de um milhão de chunks de 1536 dimensões: reserve algumas dezenas de
+GB em --workdir.
+
+Uso:
+    uv run python -m scripts.benchmark_vector_storage
+    uv run python -m scripts.benchmark_vector_storage --size 100000 --dims 1536,512
+"""
+
+import argparse
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from typing import Dict, Iterator, List, Set
+
+import numpy as np
+import sqlite_vec
+
+from src.config import settings
+from src.lib.clients.langchain import VEC_MAX_K, VECTOR_COLUMN_TYPES, quantize_sql
+from src.lib.metrics import LatencyRecorder
+
+BATCH_ROWS = 10_000
+CLUSTER_ROWS = 500
+
+
+def _centers(size: int, dimension: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    # Variância decrescente: as primeiras dimensões carregam mais sinal
+    scale = 1 / np.sqrt(1 + np.arange(dimension) / 64)
+    centers = rng.normal(size=(max(1, size // CLUSTER_ROWS), dimension)) * scale
+    return centers.astype(np.float32)
+
+
+def _reduce(vectors: np.ndarray, dimension: int) -> np.ndarray:
+    vectors = vectors[:, :dimension]
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _corpus(
+    centers: np.ndarray, size: int, dimension: int, seed: int
+) -> Iterator[np.ndarray]:
+    """Lotes de vetores do corpus; a mesma semente gera sempre os mesmos."""
+    rng = np.random.default_rng(seed + 1)
+    scale = 1 / np.sqrt(1 + np.arange(centers.shape[1]) / 64)
+    for start in range(0, size, BATCH_ROWS):
+        count = min(BATCH_ROWS, size - start)
+        vectors = centers[rng.integers(len(centers), size=count)]
+        noise = rng.normal(size=vectors.shape) * scale
+        yield _reduce(vectors + 0.5 * noise, dimension).astype(np.float32)
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    conn.enable_load_extension(True)
+    sqlite_vec.load(conn)
+    conn.enable_load_extension(False)
+    return conn
+
+
+def _build(
+    path: str,
+    centers: np.ndarray,
+    args: argparse.Namespace,
+    dimension: int,
+    quantization: str,
+) -> sqlite3.Connection:
+    conn = _connect(path)
+    conn.execute(
+        "CREATE TABLE documents (rowid INTEGER PRIMARY KEY AUTOINCREMENT, "
+        "text TEXT, metadata BLOB, text_embedding BLOB)"
+    )
+    conn.execute(
+        "CREATE VIRTUAL TABLE documents_vec USING vec0(rowid INTEGER PRIMARY KEY, "
+        f"text_embedding {VECTOR_COLUMN_TYPES[quantization]}[{dimension}])"
+    )
+    text = "x" * args.text_bytes
+    for vectors in _corpus(centers, args.size, dimension, args.seed):
+        with conn:
+            conn.executemany(
+                "INSERT INTO documents(text, metadata, text_embedding) "
+                "VALUES (?, '{}', ?)",
+                ((text, vector.tobytes()) for vector in vectors),
+            )
+    with conn:
+        conn.execute(
+            "INSERT INTO documents_vec(rowid, text_embedding) "
+            f"SELECT rowid, {quantize_sql('text_embedding', quantization)} "
+            "FROM documents"
+        )
+    return conn
+
+
+def _search(
+    conn: sqlite3.Connection, quantization: str, query: np.ndarray, k: int, factor: int
+) -> List[int]:
+    if quantization == "float32":
+        sql = (
+            "SELECT rowid FROM documents_vec "
+            "WHERE text_embedding MATCH :query AND k = :k ORDER BY distance"
+        )
+    else:
+        sql = f"""
+            SELECT e.rowid FROM (
+                SELECT rowid FROM documents_vec
+                WHERE text_embedding MATCH {quantize_sql(":query", quantization)}
+                  AND k = :candidates
+            ) AS v
+            INNER JOIN documents AS e ON e.rowid = v.rowid
+            ORDER BY vec_distance_l2(e.text_embedding, :query)
+            LIMIT :k
+            """
+    rows = conn.execute(
+        sql,
+        {
+            "query": query.tobytes(),
+            "k": k,
+            "candidates": min(k * factor, VEC_MAX_K),
+        },
+    ).fetchall()
+    return [row[0] for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--dims", default="1536,512")
+    parser.add_argument("--quantizations", default="float32,int8,binary")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument(
+        "--rerank-factor", type=int, default=settings.vector_rerank_factor
+    )
+    parser.add_argument("--text-bytes", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", default=None)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="vector-storage-", dir=args.workdir)
+    centers = _centers(args.size, args.dim, args.seed)
+    rng = np.random.default_rng(args.seed + 2)
+    scale = 1 / np.sqrt(1 + np.arange(args.dim) / 64)
+    queries = centers[rng.integers(len(centers), size=args.queries)]
+    queries = queries + 0.5 * rng.normal(size=queries.shape) * scale
+
+    # A referência (float32 na dimensão completa) é sempre a primeira
+    modes = [(args.dim, "float32")] + [
+        (int(dimension), quantization)
+        for dimension in args.dims.split(",")
+        for quantization in args.quantizations.split(",")
+        if (int(dimension), quantization) != (args.dim, "float32")
+    ]
+    truth: List[Set[int]] = []
+    print(f"{args.size} chunks, {args.dim} dimensões, recall@{args.k} em {workdir}")
+    print(
+        f"\n{'dim':>6} {'formato':<9}{'banco MB':>10}{'B/chunk':>9}"
+        f"{'build s':>9}{'p50 ms':>9}{'p99 ms':>9}{'recall':>8}"
+    )
+    try:
+        for dimension, quantization in modes:
+            path = os.path.join(workdir, f"vec-{dimension}-{quantization}.db")
+            started = time.perf_counter()
+            conn = _build(path, centers, args, dimension, quantization)
+            build = time.perf_counter() - started
+            size = os.path.getsize(path)
+
+            reduced = _reduce(queries, dimension).astype(np.float32)
+            latencies = LatencyRecorder(window=len(reduced))
+            results: List[List[int]] = []
+            for query in reduced:
+                started = time.perf_counter()
+                results.append(
+                    _search(conn, quantization, query, args.k, args.rerank_factor)
+                )
+                latencies.record("search", (time.perf_counter() - started) * 1000)
+            conn.close()
+            if not truth:
+                truth = [set(found) for found in results]
+            hits = sum(len(t.intersection(r)) for t, r in zip(truth, results))
+            latency: Dict[str, float] = latencies.summary()["search"]
+            print(
+                f"{dimension:>6} {quantization:<9}{size / 2**20:>10.1f}"
+                f"{size / args.size:>9.0f}{build:>9.1f}{latency['p50_ms']:>9.2f}"
+                f"{latency['p99_ms']:>9.2f}{hits / (args.k * len(truth)):>8.3f}"
+            )
+            # Libera o disco antes do próximo banco
+            os.remove(path)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -33,3 +33,14 @@ def InvalidFormatException(type: DocsType):
         },
         headers={"X-Error": "Formatos válidos: " + ", ".join(DocsType)},
     )
+
+
+def JobNotFoundException(job_id: str):
+    raise HTTPException(
+        status_code=404,
+        detail={
+            "message": "Job de indexação não encontrado",
+            "status": "job_not_found",
+            "job_id": job_id,
+        },
+    )
@@ -1,6 +1,15 @@
+import json
+import time
+
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 
-from src.schemas.chat_schema import ChatRequest, ChatResponse
+from src.schemas.chat_schema import (
+    AnswerCacheStats,
+    ChatMetrics,
+    ChatRequest,
+    ChatResponse,
+)
 from src.services.chat_service import ChatService
 
 router = APIRouter(prefix="", tags=["Chat"])
@@ -44,3 +53,89 @@ async def chat_with_rag(request: ChatRequest):
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro no processamento: {str(e)}")
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/chat/stream", status_code=200)
+async def chat_with_rag_stream(request: ChatRequest):
+    """
+    Versão em streaming do `/chat`, via Server-Sent Events.
+
+    Eventos, nesta ordem:
+        - `retrieval`: `context_used` e `expanded_query`, assim que a busca termina
+        - `token`: trechos da resposta (`{"content": "..."}`) à medida que o
+          modelo os gera
+        - `summary`: o ChatResponse completo, com `token_usage` real e `timings`
+        - `error`: enviado no lugar dos restantes se a geração falhar
+
+    O cabeçalho `X-Time-To-First-Byte-Ms` (e `Server-Timing`) informa o tempo
+    até o primeiro evento ficar pronto; o tempo até o primeiro token vem em
+    `timings.first_token_ms` do evento `summary`.
+    """
+    started = time.perf_counter()
+    try:
+        turn = await chat_service.prepare_turn(request)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro no processamento: {str(e)}")
+
+    if isinstance(turn, ChatResponse):
+        retrieval = {
+            "context_used": [doc.model_dump() for doc in turn.context_used],
+            "expanded_query": turn.expanded_query,
+            "cached": True,
+        }
+    else:
+        retrieval = {
+            "context_used": [doc.model_dump() for doc in turn.context_docs],
+            "expanded_query": turn.expanded_query,
+            "cached": False,
+        }
+    ttfb = (time.perf_counter() - started) * 1000
+
+    async def events():
+        yield _sse("retrieval", retrieval)
+        if isinstance(turn, ChatResponse):
+            yield _sse("token", {"content": turn.output})
+            yield _sse("summary", turn.model_dump(mode="json"))
+            return
+        try:
+            async for item in chat_service.stream_turn(turn):
+                if isinstance(item, ChatResponse):
+                    yield _sse("summary", item.model_dump(mode="json"))
+                else:
+                    yield _sse("token", {"content": item})
+        except Exception as e:
+            yield _sse("error", {"detail": f"Erro no processamento: {str(e)}"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+            "X-Time-To-First-Byte-Ms": f"{ttfb:.2f}",
+            "Server-Timing": f"ttfb;dur={ttfb:.2f}",
+        },
+    )
+
+
+@router.get("/chat/cache", status_code=200, response_model=AnswerCacheStats)
+async def chat_cache_stats():
+    """
+    Estatísticas do cache semântico de respostas: acertos, taxa de acerto,
+    entradas invalidadas por mudança nos documentos e limiar de similaridade.
+    """
+    return chat_service.answer_cache_stats()
+
+
+@router.get("/chat/metrics", status_code=200, response_model=ChatMetrics)
+async def chat_metrics():
+    """
+    Latências recentes do chat (média, p50, p95, p99 em ms) por etapa:
+    expansão de query, busca e total por estratégia de expansão, e acertos
+    do cache de respostas.
+    """
+    return chat_service.metrics()
@@ -1,6 +1,8 @@
 from fastapi import APIRouter
 from fastapi.responses import RedirectResponse
 
+from src.lib.ffmpeg import get_transcoder
+
 router = APIRouter(prefix="")
 
 
@@ -12,3 +14,9 @@ async def root():
 @router.get("/health")
 async def health():
     return {"status": "ok"}
+
+
+@router.get("/health/transcoding")
+async def transcoding_stats():
+    """Fila e latência (espera e transcodificação, em ms) do ffmpeg."""
+    return get_transcoder().stats()
@@ -1,13 +1,26 @@
-from typing import List
+from datetime import datetime
+from typing import List, Optional
 
 from fastapi import APIRouter, File, HTTPException, Query, UploadFile
 
 from src.api.exceptions.store_excpetions import InvalidFormatExceptionResponse
-from src.schemas.store_schema import (DocsIndexingResponse, SearchDocsResponse,
-                                      SearchDocsWithContextResponse)
+from src.schemas.store_schema import (
+    DocsIndexingResponse,
+    DocsType,
+    IndexingJobCreatedResponse,
+    IndexingJobResponse,
+    SearchDocsResponse,
+    SearchDocsWithContextResponse,
+    SearchFilters,
+    SearchMode,
+    StoreCacheStats,
+    VectorEngineStats,
+)
+from src.services.indexing_job_service import IndexingJobService
 from src.services.store_service import StoreService
 
 store_service = StoreService()
+indexing_jobs = IndexingJobService(store_service)
 
 router = APIRouter(prefix="", tags=["Store"])
 
@@ -62,6 +75,54 @@ async def index_documents_in_vector_store(
     return result
 
 
+@router.post(
+    "/store/docs/jobs",
+    status_code=202,
+    response_model=IndexingJobCreatedResponse,
+)
+async def create_indexing_job(
+    files: List[UploadFile] = File(
+        ..., description="Selecione múltiplos arquivos (Ctrl+Click ou Cmd+Click)"
+    ),
+):
+    """
+    Enfileira a indexação dos arquivos e responde imediatamente com o id do job.
+
+    Os arquivos são gravados em disco e processados em segundo plano pelos
+    workers de indexação; o andamento é consultado em
+    `GET /store/docs/jobs/{job_id}`. Arquivos com formato inválido entram no
+    job como falhos. Jobs pendentes são retomados após um restart da API.
+
+    Exemplo de uso:
+        >>> POST /store/docs/jobs
+        Files: [documento1.pdf, documento2.docx]
+
+        Resposta:
+        {
+            "job_id": "3f2c...",
+            "status": "queued",
+            "total_files": 2,
+            "rejected_files": 0,
+            "status_url": "/api/v1/store/docs/jobs/3f2c..."
+        }
+    """
+    return await indexing_jobs.enqueue(files)
+
+
+@router.get(
+    "/store/docs/jobs/{job_id}",
+    status_code=200,
+    response_model=IndexingJobResponse,
+)
+async def get_indexing_job(job_id: str):
+    """
+    Retorna o estado de um job de indexação: situação e progresso de cada
+    arquivo (chunks gravados/total), erros, resultados e vazão em chunks e
+    bytes por segundo.
+    """
+    return indexing_jobs.get_job(job_id)
+
+
 @router.get(
     "/store/docs/search",
     status_code=200,
@@ -71,9 +132,40 @@ async def index_documents_in_vector_store(
 async def search_docs(
     query: str = Query(..., description="Texto de busca", min_length=1),
     limit: int = Query(5, description="Número máximo de resultados", ge=1, le=20),
+    mode: SearchMode = Query(
+        SearchMode.VECTOR,
+        description=(
+            "vector: similaridade semântica; lexical: termos exatos (BM25), "
+            "sem chamada à API de embeddings; hybrid: os dois combinados"
+        ),
+    ),
+    filename: Optional[str] = Query(
+        None, description="Busca só nos chunks deste arquivo"
+    ),
+    file_type: Optional[DocsType] = Query(
+        None, description="Busca só em arquivos deste tipo"
+    ),
+    indexed_after: Optional[datetime] = Query(
+        None, description="Busca só em arquivos indexados a partir desta data"
+    ),
+    indexed_before: Optional[datetime] = Query(
+        None, description="Busca só em arquivos indexados até esta data"
+    ),
 ):
+    """
+    Os filtros são aplicados antes da busca: com um filtro seletivo, só os
+    chunks que casam com ele são comparados.
+    """
+    filters = SearchFilters(
+        filename=filename,
+        file_type=file_type,
+        indexed_after=indexed_after,
+        indexed_before=indexed_before,
+    )
     try:
-        results = await store_service.search_docs(query, limit)
+        results = await store_service.search_docs(
+            query, limit, mode=mode, filters=filters
+        )
         return results
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro na busca: {str(e)}")
@@ -87,9 +179,40 @@ async def search_docs(
 async def search_docs_with_context(
     query: str = Query(..., description="Texto de busca", min_length=1),
     limit: int = Query(5, description="Número máximo de resultados", ge=1, le=10),
+    mode: SearchMode = Query(SearchMode.VECTOR, description="Modo de busca"),
 ):
     try:
-        results = await store_service.search_docs_with_context(query, limit)
+        results = await store_service.search_docs_with_context(query, limit, mode=mode)
         return results
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro na busca: {str(e)}")
+
+
+@router.get(
+    "/store/cache",
+    status_code=200,
+    response_model=StoreCacheStats,
+)
+async def store_cache_stats():
+    """
+    Estatísticas dos caches da busca: acertos, taxa de acerto, entradas e
+    memória estimada do cache de resultados, além do cache de embeddings, da
+    geração atual do índice e do banco (leituras, gravações e tamanho médio
+    dos grupos confirmados pelo escritor).
+    """
+    return await store_service.cache_stats()
+
+
+@router.get(
+    "/store/vector-engine",
+    status_code=200,
+    response_model=VectorEngineStats,
+)
+async def vector_engine_stats():
+    """
+    Engine de busca vetorial em uso (sqlite, exact ou hnsw) com a quantidade
+    de vetores, removidos ainda não compactados, progresso do grafo HNSW e
+    latência das buscas (p50/p95/p99). No sqlite, informa a quantização dos
+    vetores e o fator de reordenação.
+    """
+    return store_service.vector_engine_stats()
@@ -1,11 +1,17 @@
-from fastapi import APIRouter, WebSocket
+from base64 import b64encode
 
-import src.lib.clients.openai as openai
-from src.lib.ffmpeg import speed_and_compress_b64
-from src.schemas.agent_schema import AgentResponse
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+
+from src.schemas.agent_schema import (
+    AgentAudioFrame,
+    AgentAudioHeader,
+    AgentTextFrame,
+    AudioCacheStats,
+)
+from src.services.agent_service import AUDIO_FORMAT, AgentService, SentenceAudio
 
 router = APIRouter()
-client = openai.OpenAIClient()
+agent_service = AgentService()
 
 
 @router.websocket("/ws/health")
@@ -15,20 +21,70 @@ async def websocket_health_ws(ws: WebSocket):
     await ws.close()
 
 
+async def _send_audio(ws: WebSocket, index: int, audio: bytes, binary: bool):
+    if binary:
+        await ws.send_json(
+            AgentAudioHeader(
+                index=index, format=AUDIO_FORMAT, size=len(audio)
+            ).model_dump()
+        )
+        await ws.send_bytes(audio)
+    else:
+        await ws.send_json(
+            AgentAudioFrame(
+                index=index, audio_base64=b64encode(audio).decode()
+            ).model_dump()
+        )
+
+
+@router.get("/agent/cache", status_code=200, response_model=AudioCacheStats)
+async def agent_audio_cache_stats():
+    """
+    Estatísticas do cache de áudio do agente: acertos, taxa de acerto,
+    bytes servidos do disco sem chamar o TTS e ocupação.
+    """
+    return agent_service.audio_cache_stats()
+
+
 # TODO: viseme/fonemes
 @router.websocket("/ws/agent")
 async def websocket_endpoint(ws: WebSocket):
+    """
+    Agente de voz.
+
+    Por padrão cada mensagem recebe um único JSON (AgentResponse) com o
+    texto e o áudio completos. Com `?mode=pipeline` a resposta chega frase a
+    frase: frames `text` e `audio` (com `index`, em ordem) e por fim um
+    frame `done` com o texto completo e as latências.
+
+    Com `?audio=binary` o áudio não vai em base64: cada áudio é anunciado
+    por um frame JSON `audio` (index, format, size) seguido de um frame
+    binário com os bytes. Sem pipeline, a resposta vira um frame `text`
+    seguido do áudio nesse formato.
+    """
     await ws.accept()
+    pipeline = ws.query_params.get("mode") == "pipeline"
+    binary = ws.query_params.get("audio") == "binary"
 
-    while True:
-        data = await ws.receive_text()
+    try:
+        while True:
+            data = await ws.receive_text()
 
-        response = await client.create_response(data)
-        audio_base64 = speed_and_compress_b64(response.audio_base64)
+            if pipeline:
+                async for frame in agent_service.stream(data):
+                    if isinstance(frame, SentenceAudio):
+                        await _send_audio(ws, frame.index, frame.audio, binary)
+                    else:
+                        await ws.send_json(frame.model_dump())
+                continue
 
-        await ws.send_json(
-            AgentResponse(
-                text=response.answer,
-                audio_base64=audio_base64,
-            ).model_dump()
-        )
+            if binary:
+                answer, audio = await agent_service.respond_audio(data)
+                await ws.send_json(AgentTextFrame(index=0, text=answer).model_dump())
+                await _send_audio(ws, 0, audio, binary)
+                continue
+
+            response = await agent_service.respond(data)
+            await ws.send_json(response.model_dump())
+    except WebSocketDisconnect:
+        pass
@@ -1,3 +1,5 @@
+from typing import Literal, Optional
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -6,6 +8,89 @@ class Settings(BaseSettings):
     path_db_file: str = "./vec.db"
     serp_api_key: str
 
+    embedding_backend: Literal["openai", "local"] = "openai"
+    embedding_model: str = "text-embedding-3-small"
+    embedding_dimensions: Optional[int] = None
+    local_embedding_model: str = (
+        "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+    )
+    local_embedding_device: str = "cpu"
+    local_embedding_threads: int = 4
+    local_embedding_batch_size: int = 32
+    local_embedding_max_wait: float = 0.005
+    embedding_cache_file: Optional[str] = None
+    embedding_cache_memory_items: int = 2048
+    embedding_cache_max_entries: int = 200_000
+    embedding_batch_tokens: int = 250_000
+    embedding_batch_size: int = 1000
+    embedding_concurrency: int = 4
+    embedding_batch_wait: float = 0.02
+
+    store_read_connections: int = 4
+    store_write_group_max: int = 64
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_cache_size_kib: int = 64 * 1024
+    sqlite_busy_timeout: float = 30.0
+
+    search_cache_max_entries: int = 1024
+    search_cache_ttl: float = 300.0
+    search_hybrid_candidates: int = 20
+    search_filter_scan_rows: int = 20_000
+
+    vector_engine: Literal["sqlite", "exact", "hnsw"] = "sqlite"
+    vector_engine_dir: Optional[str] = None
+    hnsw_m: int = 16
+    hnsw_ef_construction: int = 100
+    hnsw_ef_search: int = 64
+    vector_quantization: Literal["float32", "int8", "binary"] = "float32"
+    vector_rerank_factor: int = 10
+
+    query_expansion_strategy: Literal["always", "cache", "adaptive", "speculative"] = (
+        "always"
+    )
+    query_expansion_cache_ttl: float = 24 * 60 * 60
+    query_expansion_cache_max_entries: int = 2048
+    query_expansion_min_words: int = 4
+    query_expansion_timeout: float = 1.5
+
+    answer_cache_enabled: bool = False
+    answer_cache_threshold: float = 0.97
+    answer_cache_max_entries: int = 1000
+    answer_cache_file: Optional[str] = None
+
+    tts_model: str = "gpt-4o-mini-tts"
+    tts_voice: str = "ash"
+    tts_native_audio: bool = True
+    audio_speed: float = 1.25
+    audio_codec: str = "libopus"
+    audio_bitrate: str = "64k"
+    audio_format: str = "opus"
+    audio_cache_enabled: bool = True
+    audio_cache_dir: Optional[str] = None
+    audio_cache_max_bytes: int = 256 * 1024 * 1024
+
+    agent_tts_concurrency: int = 3
+    agent_sentence_min_chars: int = 40
+    transcode_concurrency: int = 2
+    transcode_timeout: float = 30.0
+
+    scraping_concurrency: int = 10
+    scraping_per_host_concurrency: int = 2
+    scraping_per_host_delay: float = 0.2
+    scraping_timeout: float = 20.0
+    scraping_retries: int = 2
+    scraping_workers: Optional[int] = None
+
+    extraction_workers: Optional[int] = None
+    extraction_timeout: float = 120.0
+
+    ingest_window_chunks: int = 256
+    ingest_spool_dir: Optional[str] = None
+
+    indexing_job_workers: int = 2
+    indexing_jobs_file: Optional[str] = None
+    indexing_jobs_dir: Optional[str] = None
+
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
 
@@ -0,0 +1,182 @@
+import asyncio
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+
+class TokenCounter:
+    """
+    Conta tokens com o tiktoken do modelo; se o encoding não puder ser
+    carregado (ex.: sem acesso à rede), usa a estimativa de ~3 caracteres
+    por token, conservadora para texto em português.
+    """
+
+    def __init__(self, model: str):
+        self.model = model
+        self._encode: Optional[Callable[[str], list]] = None
+        self._loaded = False
+
+    def _load(self):
+        self._loaded = True
+        try:
+            import tiktoken
+
+            try:
+                encoding = tiktoken.encoding_for_model(self.model)
+            except KeyError:
+                encoding = tiktoken.get_encoding("cl100k_base")
+            self._encode = encoding.encode_ordinary
+        except Exception:
+            self._encode = None
+
+    def count(self, text: str) -> int:
+        if not self._loaded:
+            self._load()
+        if self._encode is None:
+            return len(text) // 3 + 1
+        return len(self._encode(text))
+
+
+class _EmbeddingRequest:
+    """Uma chamada a embed: seus textos podem ser divididos entre lotes."""
+
+    def __init__(self, texts: List[str], future: asyncio.Future):
+        self.texts = texts
+        self.future = future
+        self.vectors: List[Optional[List[float]]] = [None] * len(texts)
+        self.offset = 0
+        self.pending = len(texts)
+
+    def has_texts(self) -> bool:
+        return self.offset < len(self.texts) and not self.future.done()
+
+
+class EmbeddingScheduler:
+    """
+    Fila de embeddings dimensionada por tokens.
+
+    Os textos de chamadas simultâneas a embed (ex.: janelas de arquivos
+    diferentes de um mesmo upload) entram nos mesmos lotes, limitados por
+    `max_tokens` e `max_items`; uma chamada grande é dividida em vários
+    lotes. Um lote que ainda não encheu espera até `max_wait` segundos por
+    mais textos. Até `concurrency` lotes ficam em andamento no provedor,
+    somando todas as chamadas.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model: str,
+        max_tokens: int = 250_000,
+        max_items: int = 1000,
+        concurrency: int = 4,
+        max_wait: float = 0.02,
+    ):
+        self.embeddings = embeddings
+        self.counter = TokenCounter(model)
+        self.max_tokens = max_tokens
+        self.max_items = max(1, max_items)
+        self.concurrency = max(1, concurrency)
+        self.max_wait = max_wait
+        self.requests = 0
+        self.batches = 0
+        self.texts = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._current: Optional[_EmbeddingRequest] = None
+        self._sending: Set[asyncio.Task] = set()
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._current = None
+            self._worker = loop.create_task(self._drain())
+        request = _EmbeddingRequest(texts, loop.create_future())
+        self.requests += 1
+        await self._queue.put(request)
+        return await request.future
+
+    async def _take(self, timeout: Optional[float]) -> Optional[_EmbeddingRequest]:
+        """Chamada com textos ainda não enviados; None se `timeout` acabar."""
+        while self._current is None or not self._current.has_texts():
+            try:
+                self._current = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                if timeout is None:
+                    self._current = await self._queue.get()
+                elif timeout <= 0:
+                    return None
+                else:
+                    try:
+                        self._current = await asyncio.wait_for(
+                            self._queue.get(), timeout
+                        )
+                    except asyncio.TimeoutError:
+                        return None
+        return self._current
+
+    async def _next_batch(self) -> List[Tuple[_EmbeddingRequest, int]]:
+        batch: List[Tuple[_EmbeddingRequest, int]] = []
+        tokens = 0
+        request = await self._take(None)
+        deadline = self._loop.time() + self.max_wait
+        while request is not None:
+            text_tokens = self.counter.count(request.texts[request.offset])
+            if batch and tokens + text_tokens > self.max_tokens:
+                break
+            batch.append((request, request.offset))
+            request.offset += 1
+            tokens += text_tokens
+            if len(batch) >= self.max_items:
+                break
+            request = await self._take(deadline - self._loop.time())
+        return batch
+
+    async def _drain(self):
+        while True:
+            # Só monta o próximo lote quando houver vaga no provedor: enquanto
+            # isso, as chamadas que chegam se acumulam e enchem o lote.
+            await self._semaphore.acquire()
+            try:
+                batch = await self._next_batch()
+            except BaseException:
+                self._semaphore.release()
+                raise
+            task = self._loop.create_task(self._send(batch))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _send(self, batch: List[Tuple[_EmbeddingRequest, int]]):
+        try:
+            vectors = await self.embeddings.aembed_documents(
+                [request.texts[index] for request, index in batch]
+            )
+        except Exception as e:
+            for request, _ in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            return
+        finally:
+            self._semaphore.release()
+
+        self.batches += 1
+        self.texts += len(batch)
+        for (request, index), vector in zip(batch, vectors):
+            request.vectors[index] = vector
+            request.pending -= 1
+            if request.pending == 0 and not request.future.done():
+                request.future.set_result(request.vectors)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "embed_calls": self.requests,
+            "provider_batches": self.batches,
+            "mean_batch_size": self.texts / self.batches if self.batches else 0.0,
+        }
@@ -0,0 +1,220 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+from pydantic import BaseModel
+
+
+class CachedAnswer(BaseModel):
+    id: int
+    prompt: str
+    response: str
+    generation: int
+    chunk_rowids: List[int]
+    similarity: float
+
+
+def _normalize(vector: List[float]) -> np.ndarray:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(array)
+    return array / norm if norm else array
+
+
+class AnswerCache:
+    """
+    Cache semântico de respostas do chat.
+
+    Guarda o embedding do prompt, a resposta serializada, a geração do
+    índice e os rowids dos chunks usados como contexto. A busca compara o
+    prompt novo com todos os guardados (similaridade de cosseno em uma
+    matriz NumPy mantida em memória) e devolve o mais próximo acima de
+    `threshold`. A tabela é limitada a `max_entries`, removendo as entradas
+    usadas há mais tempo.
+    """
+
+    def __init__(
+        self,
+        db_file: str,
+        model: str,
+        max_entries: int = 1000,
+        threshold: float = 0.97,
+    ):
+        self.db_file = db_file
+        self.model = model
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0
+        self._lock = threading.Lock()
+        self._ids: List[int] = []
+        self._vectors: List[np.ndarray] = []
+        self._matrix: Optional[np.ndarray] = None
+
+        directory = os.path.dirname(os.path.abspath(db_file))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS answer_cache (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    model TEXT NOT NULL,
+                    prompt TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    response TEXT NOT NULL,
+                    generation INTEGER NOT NULL,
+                    chunk_rowids TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS answer_cache_last_used "
+                "ON answer_cache(model, last_used)"
+            )
+        for row in self._conn.execute(
+            "SELECT id, vector FROM answer_cache WHERE model = ? ORDER BY id",
+            (model,),
+        ):
+            self._ids.append(row["id"])
+            self._vectors.append(np.frombuffer(row["vector"], dtype=np.float32))
+
+    def _similarities(self, vector: np.ndarray) -> np.ndarray:
+        if self._matrix is None:
+            self._matrix = np.vstack(self._vectors)
+        return self._matrix @ vector
+
+    def lookup(self, vector: List[float]) -> Optional[CachedAnswer]:
+        """
+        Procura a resposta cujo prompt é mais parecido com o vetor informado.
+
+        Args:
+            vector: Embedding do prompt novo
+
+        Returns:
+            CachedAnswer com similaridade >= threshold, ou None
+        """
+        query = _normalize(vector)
+        with self._lock:
+            if not self._ids:
+                self.misses += 1
+                return None
+            similarities = self._similarities(query)
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            if similarity < self.threshold:
+                self.misses += 1
+                return None
+
+            entry_id = self._ids[best]
+            row = self._conn.execute(
+                "SELECT * FROM answer_cache WHERE id = ?", (entry_id,)
+            ).fetchone()
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE answer_cache SET last_used = ? WHERE id = ?",
+                    (time.time(), entry_id),
+                )
+            self.hits += 1
+        return CachedAnswer(
+            id=row["id"],
+            prompt=row["prompt"],
+            response=row["response"],
+            generation=row["generation"],
+            chunk_rowids=json.loads(row["chunk_rowids"]),
+            similarity=similarity,
+        )
+
+    def put(
+        self,
+        prompt: str,
+        vector: List[float],
+        response: str,
+        generation: int,
+        chunk_rowids: List[int],
+    ) -> int:
+        normalized = _normalize(vector)
+        now = time.time()
+        with self._lock, self._conn:
+            entry_id = self._conn.execute(
+                """
+                INSERT INTO answer_cache(
+                    model, prompt, vector, response, generation, chunk_rowids,
+                    created_at, last_used
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    self.model,
+                    prompt,
+                    normalized.tobytes(),
+                    response,
+                    generation,
+                    json.dumps(chunk_rowids),
+                    now,
+                    now,
+                ),
+            ).lastrowid
+            self._ids.append(entry_id)
+            self._vectors.append(normalized)
+            self._matrix = None
+
+            excess = len(self._ids) - self.max_entries
+            if excess > 0:
+                evicted = [
+                    row[0]
+                    for row in self._conn.execute(
+                        "SELECT id FROM answer_cache WHERE model = ? "
+                        "ORDER BY last_used LIMIT ?",
+                        (self.model, excess),
+                    )
+                ]
+                self._remove(evicted)
+        return entry_id
+
+    def _remove(self, entry_ids: List[int]):
+        placeholders = ",".join("?" * len(entry_ids))
+        self._conn.execute(
+            f"DELETE FROM answer_cache WHERE id IN ({placeholders})", entry_ids
+        )
+        removed = set(entry_ids)
+        keep = [i for i, entry_id in enumerate(self._ids) if entry_id not in removed]
+        self._ids = [self._ids[i] for i in keep]
+        self._vectors = [self._vectors[i] for i in keep]
+        self._matrix = None
+
+    def refresh(self, entry_id: int, generation: int):
+        """Confirma a entrada como válida para a geração atual do índice."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE answer_cache SET generation = ? WHERE id = ?",
+                (generation, entry_id),
+            )
+
+    def invalidate(self, entry_id: int):
+        with self._lock, self._conn:
+            self._remove([entry_id])
+            self.invalidated += 1
+            self.hits -= 1
+            self.misses += 1
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidated": self.invalidated,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._ids),
+            "threshold": self.threshold,
+        }
+
+
+def default_answer_cache_path(db_file: str, filename: str = "answer_cache.db") -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(db_file)), filename)
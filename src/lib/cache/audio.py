@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+
+def audio_cache_key(text: str, **params) -> str:
+    """sha256 do texto junto com os parâmetros que alteram o áudio gerado."""
+    payload = json.dumps([text, sorted(params.items())], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    """
+    Cache em disco do áudio final do TTS.
+
+    Cada entrada é um arquivo em `directory`, nomeado pela chave de
+    audio_cache_key; um índice SQLite no mesmo diretório guarda o tamanho e
+    o último uso. Quando o total passa de `max_bytes`, os arquivos usados há
+    mais tempo são removidos (LRU por bytes).
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.evicted = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(
+            os.path.join(directory, "index.db"), check_same_thread=False
+        )
+        with self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS audio_cache (
+                    key TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS audio_cache_last_used "
+                "ON audio_cache(last_used)"
+            )
+        self.total_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM audio_cache"
+        ).fetchone()[0]
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.audio")
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size FROM audio_cache WHERE key = ?", (key,)
+            ).fetchone()
+            audio = None
+            if row is not None:
+                try:
+                    with open(self._path(key), "rb") as file:
+                        audio = file.read()
+                except FileNotFoundError:
+                    # Arquivo apagado por fora: descarta a entrada do índice
+                    with self._conn:
+                        self._remove([(key, row[0])])
+
+            if audio is None:
+                self.misses += 1
+                return None
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE audio_cache SET last_used = ? WHERE key = ?",
+                    (time.time(), key),
+                )
+            self.hits += 1
+            self.bytes_saved += len(audio)
+        return audio
+
+    def put(self, key: str, audio: bytes):
+        size = len(audio)
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        path = self._path(key)
+        with self._lock:
+            temporary = f"{path}.{os.getpid()}.tmp"
+            with open(temporary, "wb") as file:
+                file.write(audio)
+            os.replace(temporary, path)
+
+            with self._conn:
+                previous = self._conn.execute(
+                    "SELECT size FROM audio_cache WHERE key = ?", (key,)
+                ).fetchone()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO audio_cache"
+                    "(key, size, created_at, last_used) VALUES (?, ?, ?, ?)",
+                    (key, size, now, now),
+                )
+                self.total_bytes += size - (previous[0] if previous else 0)
+
+                if self.total_bytes > self.max_bytes:
+                    evicted = []
+                    excess = self.total_bytes - self.max_bytes
+                    for old_key, old_size in self._conn.execute(
+                        "SELECT key, size FROM audio_cache WHERE key != ? "
+                        "ORDER BY last_used",
+                        (key,),
+                    ):
+                        if excess <= 0:
+                            break
+                        evicted.append((old_key, old_size))
+                        excess -= old_size
+                    self._remove(evicted)
+                    self.evicted += len(evicted)
+
+    def _remove(self, entries):
+        for key, size in entries:
+            self._conn.execute("DELETE FROM audio_cache WHERE key = ?", (key,))
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+            self.total_bytes -= size
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        with self._lock:
+            (entries,) = self._conn.execute(
+                "SELECT COUNT(*) FROM audio_cache"
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "bytes_saved": self.bytes_saved,
+            "evicted": self.evicted,
+            "entries": entries,
+            "total_bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+def default_audio_cache_dir(db_file: str, dirname: str = "audio_cache") -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(db_file)), dirname)
@@ -0,0 +1,290 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+from src.lib.batching import EmbeddingScheduler
+
+# O last_used das leituras fica em memória e vai para o disco em lotes:
+# ao juntar LAST_USED_FLUSH_ITEMS chaves, após LAST_USED_FLUSH_SECONDS ou
+# antes de uma gravação (que é quando a remoção por idade acontece).
+LAST_USED_FLUSH_ITEMS = 1024
+LAST_USED_FLUSH_SECONDS = 60.0
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _pack(vector: List[float]) -> bytes:
+    return array("f", vector).tobytes()
+
+
+def _unpack(blob: bytes) -> List[float]:
+    values = array("f")
+    values.frombytes(blob)
+    return values.tolist()
+
+
+class EmbeddingCache:
+    """
+    Cache persistente de embeddings endereçado por conteúdo.
+
+    As chaves são (modelo, sha256(texto)). Há um nível quente em memória
+    (LRU) na frente de uma tabela SQLite limitada a `max_entries` linhas;
+    ao ultrapassar o limite, as entradas usadas há mais tempo são removidas.
+    """
+
+    def __init__(
+        self,
+        db_file: str,
+        memory_items: int = 2048,
+        max_entries: int = 200_000,
+    ):
+        self.db_file = db_file
+        self.memory_items = memory_items
+        self.max_entries = max_entries
+        self.hits = 0
+        self.memory_hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+        self._touched: Dict[Tuple[str, str], float] = {}
+        self._flushed_at = time.monotonic()
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(db_file))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embedding_cache (
+                model TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, hash)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS embedding_cache_last_used "
+            "ON embedding_cache(last_used)"
+        )
+        self._conn.commit()
+        self._entries = self._conn.execute(
+            "SELECT count(*) FROM embedding_cache"
+        ).fetchone()[0]
+
+    def _remember(self, key: Tuple[str, str], vector: List[float]):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _flush_last_used(self):
+        """Grava o last_used pendente; a confirmação fica com quem chama."""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE embedding_cache SET last_used = ? WHERE model = ? AND hash = ?",
+                [(used, model, h) for (model, h), used in self._touched.items()],
+            )
+            self._touched.clear()
+        self._flushed_at = time.monotonic()
+
+    def flush(self):
+        """Grava no disco o last_used das leituras ainda pendentes."""
+        with self._lock:
+            self._flush_last_used()
+            self._conn.commit()
+
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        pending: List[str] = []
+        now = time.time()
+        with self._lock:
+            for h in hashes:
+                key = (model, h)
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[h] = self._memory[key]
+                    self._touched[key] = now
+                    self.memory_hits += 1
+                else:
+                    pending.append(h)
+
+            for start in range(0, len(pending), 500):
+                batch = pending[start : start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT hash, vector FROM embedding_cache "
+                    f"WHERE model = ? AND hash IN ({placeholders})",
+                    [model, *batch],
+                ).fetchall()
+                for h, blob in rows:
+                    vector = _unpack(blob)
+                    found[h] = vector
+                    self._remember((model, h), vector)
+                    self._touched[(model, h)] = now
+
+            if (
+                len(self._touched) >= LAST_USED_FLUSH_ITEMS
+                or time.monotonic() - self._flushed_at >= LAST_USED_FLUSH_SECONDS
+            ):
+                self._flush_last_used()
+                self._conn.commit()
+
+            self.hits += len(found)
+            self.misses += len(hashes) - len(found)
+        return found
+
+    def put_many(
+        self, model: str, items: Dict[str, List[float]]
+    ) -> Dict[str, List[float]]:
+        """Grava os vetores e os devolve em float32, como lidos do disco."""
+        if not items:
+            return {}
+        now = time.time()
+        packed = {h: _pack(vector) for h, vector in items.items()}
+        stored = {h: _unpack(blob) for h, blob in packed.items()}
+        with self._lock:
+            for h, vector in stored.items():
+                self._remember((model, h), vector)
+            self._flush_last_used()
+            cursor = self._conn.executemany(
+                "INSERT OR IGNORE INTO embedding_cache(model, hash, vector, last_used) "
+                "VALUES (?, ?, ?, ?)",
+                [(model, h, blob, now) for h, blob in packed.items()],
+            )
+            self._entries += max(cursor.rowcount, 0)
+            if self._entries > self.max_entries:
+                excess = self._entries - self.max_entries
+                self._conn.execute(
+                    "DELETE FROM embedding_cache WHERE rowid IN ("
+                    "SELECT rowid FROM embedding_cache ORDER BY last_used LIMIT ?)",
+                    (excess,),
+                )
+                self._entries -= excess
+            self._conn.commit()
+        return stored
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "memory_hits": self.memory_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "memory_items": len(self._memory),
+            "entries": self._entries,
+        }
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings que consultam o EmbeddingCache antes de chamar o provedor.
+
+    Usado tanto na indexação (embed_documents) quanto na busca (embed_query);
+    apenas os textos ausentes do cache são enviados ao provedor. Na versão
+    assíncrona, os ausentes entram na fila do EmbeddingScheduler e são
+    agrupados com os de outras chamadas simultâneas.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model: str,
+        cache: EmbeddingCache,
+        scheduler: Optional[EmbeddingScheduler] = None,
+    ):
+        self.embeddings = embeddings
+        self.model = model
+        self.cache = cache
+        self.scheduler = scheduler or EmbeddingScheduler(embeddings, model)
+
+    def _lookup(
+        self, texts: List[str]
+    ) -> Tuple[List[str], Dict[str, List[float]], Dict[str, str]]:
+        hashes = [text_hash(text) for text in texts]
+        found = self.cache.get_many(self.model, list(dict.fromkeys(hashes)))
+
+        missing: Dict[str, str] = {}
+        for h, text in zip(hashes, texts):
+            if h not in found and h not in missing:
+                missing[h] = text
+        return hashes, found, missing
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        hashes, found, missing = self._lookup(texts)
+
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            found.update(self.cache.put_many(self.model, computed))
+
+        return [found[h] for h in hashes]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        hashes, found, missing = await asyncio.to_thread(self._lookup, texts)
+
+        if missing:
+            vectors = await self.scheduler.embed(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            found.update(
+                await asyncio.to_thread(self.cache.put_many, self.model, computed)
+            )
+
+        return [found[h] for h in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        h = text_hash(text)
+        found = self.cache.get_many(self.model, [h])
+        if h in found:
+            return found[h]
+        vector = self.embeddings.embed_query(text)
+        return self.cache.put_many(self.model, {h: vector})[h]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        h = text_hash(text)
+        found = await asyncio.to_thread(self.cache.get_many, self.model, [h])
+        if h in found:
+            return found[h]
+        # Direto no provedor, sem a espera da fila de lotes da indexação; o
+        # modelo local agrupa as consultas simultâneas por conta própria.
+        vector = await self.embeddings.aembed_query(text)
+        stored = await asyncio.to_thread(self.cache.put_many, self.model, {h: vector})
+        return stored[h]
+
+    def stats(self) -> Dict[str, float]:
+        return {**self.cache.stats(), **self.scheduler.stats()}
+
+
+def default_cache_path(db_file: str, filename: str = "embeddings_cache.db") -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(db_file)), filename)
+
+
+def build_cached_embeddings(
+    embeddings: Embeddings,
+    model: str,
+    db_file: str,
+    cache_file: Optional[str] = None,
+    memory_items: int = 2048,
+    max_entries: int = 200_000,
+    scheduler: Optional[EmbeddingScheduler] = None,
+) -> CachedEmbeddings:
+    cache = EmbeddingCache(
+        cache_file or default_cache_path(db_file),
+        memory_items=memory_items,
+        max_entries=max_entries,
+    )
+    return CachedEmbeddings(embeddings, model, cache, scheduler=scheduler)
@@ -0,0 +1,73 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    return _WHITESPACE.sub(" ", query).strip().lower()
+
+
+class ResultCache:
+    """
+    Cache em memória com TTL e despejo LRU, amarrado à geração do índice.
+
+    Cada entrada guarda a geração em que foi calculada; se a geração atual
+    for outra, o corpus mudou e a entrada é descartada na leitura. O uso de
+    memória é estimado pelo tamanho informado em put (bytes do JSON).
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0
+        self.memory_bytes = 0
+        self._entries: "OrderedDict[Hashable, Tuple[int, float, int, Any]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def _drop(self, key: Hashable):
+        _, _, size, _ = self._entries.pop(key)
+        self.memory_bytes -= size
+
+    def get(self, key: Hashable, generation: int) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry_generation, expires_at, _, value = entry
+                if entry_generation == generation and expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._drop(key)
+                self.invalidated += 1
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, generation: int, value: Any, size: int):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (generation, time.monotonic() + self.ttl, size, value)
+            self.memory_bytes += size
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidated": self.invalidated,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "memory_bytes": self.memory_bytes,
+        }
@@ -0,0 +1,141 @@
+import asyncio
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class _HostSlot:
+    def __init__(self, concurrency: int):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.lock = asyncio.Lock()
+        self.last_start = 0.0
+        self.resume_at = 0.0
+
+
+class AsyncFetcher:
+    """
+    Cliente HTTP assíncrono para scraping em lote.
+
+    Mantém um pool de conexões keep-alive, limita a concorrência global
+    e aplica limites de cortesia por host (concorrência e intervalo mínimo
+    entre requisições), com timeout e retentativas por URL. A vaga global
+    só é ocupada durante a requisição: quem espera a vez de um host não
+    bloqueia os demais. Em 429/503 o Retry-After do servidor define a pausa
+    do host (até `max_retry_after`; acima disso a URL é abandonada).
+    """
+
+    def __init__(
+        self,
+        headers: Optional[Dict[str, str]] = None,
+        concurrency: int = 10,
+        per_host_concurrency: int = 2,
+        per_host_delay: float = 0.2,
+        timeout: float = 20.0,
+        retries: int = 2,
+        backoff: float = 0.5,
+        max_retry_after: float = 60.0,
+    ):
+        self.headers = headers or {}
+        self.per_host_concurrency = max(1, per_host_concurrency)
+        self.per_host_delay = per_host_delay
+        self.timeout = timeout
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self.max_retry_after = max_retry_after
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+        self._hosts: Dict[str, _HostSlot] = {}
+        self._client = httpx.AsyncClient(
+            headers=self.headers,
+            timeout=timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=max(1, concurrency),
+                max_keepalive_connections=max(1, concurrency),
+            ),
+        )
+
+    async def __aenter__(self) -> "AsyncFetcher":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+    def _host_slot(self, url: str) -> _HostSlot:
+        host = urlsplit(url).netloc.lower()
+        slot = self._hosts.get(host)
+        if slot is None:
+            slot = _HostSlot(self.per_host_concurrency)
+            self._hosts[host] = slot
+        return slot
+
+    async def _wait_turn(self, slot: _HostSlot) -> None:
+        async with slot.lock:
+            start = max(slot.last_start + self.per_host_delay, slot.resume_at)
+            wait = start - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            slot.last_start = time.monotonic()
+
+    @staticmethod
+    def _retry_after(response: httpx.Response) -> Optional[float]:
+        """Segundos pedidos no Retry-After (número ou data HTTP), se houver."""
+        value = response.headers.get("retry-after", "").strip()
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    async def fetch_text(self, url: str) -> str:
+        """
+        Baixa o conteúdo de uma URL respeitando os limites configurados.
+
+        Args:
+            url: Endereço a ser baixado
+
+        Returns:
+            Corpo da resposta como texto, ou string vazia em caso de falha
+        """
+        slot = self._host_slot(url)
+        for attempt in range(self.retries + 1):
+            delay = self.backoff * (2**attempt)
+            async with slot.semaphore:
+                await self._wait_turn(slot)
+                async with self._semaphore:
+                    try:
+                        r = await self._client.get(url)
+                        if r.status_code not in RETRY_STATUS:
+                            r.raise_for_status()
+                            return r.text
+                    except (httpx.HTTPStatusError, httpx.InvalidURL):
+                        return ""
+                    except httpx.TransportError:
+                        pass
+                    except httpx.HTTPError:
+                        return ""
+                    else:
+                        retry_after = self._retry_after(r)
+                        if retry_after is not None:
+                            if retry_after > self.max_retry_after:
+                                return ""
+                            delay = retry_after
+                            # Vale para todas as URLs do host, não só esta
+                            slot.resume_at = max(
+                                slot.resume_at, time.monotonic() + retry_after
+                            )
+            if attempt < self.retries:
+                await asyncio.sleep(delay)
+        return ""
@@ -1,60 +1,1008 @@
-from typing import List
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
 
 from langchain_community.vectorstores import SQLiteVec
-from langchain_openai import OpenAIEmbeddings
+from langchain_community.vectorstores.sqlitevec import serialize_f32
+from langchain_core.documents import Document
 
 from src.config import settings
+from src.lib.batching import EmbeddingScheduler
+from src.lib.cache.embeddings import build_cached_embeddings
+from src.lib.embedders import build_embedding_provider, embedding_model_name
+from src.lib.store_manager import get_store_manager
+from src.lib.vector_engines import VectorEngine, default_vector_dir, get_vector_engine
+
+CHUNK_COLUMNS = {
+    "filename": "TEXT",
+    "document_name": "TEXT",
+    "file_type": "TEXT",
+    "chunk_index": "INTEGER",
+    "chunk_total": "INTEGER",
+    "start_offset": "INTEGER",
+    "end_offset": "INTEGER",
+}
+
+STAGING_TTL = 24 * 60 * 60
+
+# Remoções mantidas no registro lido pelos engines de vetores; um engine que
+# ficar mais atrasado que isso compara a tabela inteira
+DELETION_LOG_ROWS = 100_000
+
+# Tipo da coluna do sqlite-vec para cada settings.vector_quantization
+VECTOR_COLUMN_TYPES = {"float32": "float", "int8": "int8", "binary": "bit"}
+
+# Limite do sqlite-vec para o k de uma consulta KNN
+VEC_MAX_K = 4096
+
+# Termos da consulta para o FTS5; o resto (pontuação, operadores) é ignorado
+_FTS_TERM = re.compile(r"\w+", re.UNICODE)
+
+LEGACY_HEADER_FIELDS = {
+    "Arquivo:": "filename",
+    "Nome:": "document_name",
+    "Tipo:": "file_type",
+    "Chunk:": "chunk",
+}
+
+
+def parse_legacy_chunk(text: str) -> Dict[str, Any]:
+    """
+    Separa o cabeçalho "Arquivo:/Nome:/Tipo:/Chunk:/Caracteres:" dos chunks
+    gravados antes das colunas estruturadas.
+
+    Args:
+        text: Texto completo armazenado na tabela de documentos
+
+    Returns:
+        Dicionário com as colunas encontradas e o corpo do chunk em "text"
+    """
+    lines = text.split("\n")
+    fields: Dict[str, Any] = {}
+    for line in lines[:7]:
+        for prefix, column in LEGACY_HEADER_FIELDS.items():
+            if line.startswith(prefix):
+                fields[column] = line.replace(prefix, "").strip()
+
+    content_start = 0
+    for j, line in enumerate(lines):
+        if line.strip() == "" and j > 4:
+            content_start = j + 1
+            break
+    fields["text"] = "\n".join(lines[content_start:]) if content_start > 0 else text
+
+    chunk = fields.pop("chunk", "")
+    index, _, total = chunk.partition("/")
+    if index.isdigit():
+        fields["chunk_index"] = int(index)
+    if total.isdigit():
+        fields["chunk_total"] = int(total)
+    return fields
+
+
+def quantize_sql(expression: str, quantization: str) -> str:
+    """
+    Expressão SQL que converte um vetor float32 para a coluna do sqlite-vec.
+
+    Args:
+        expression: Expressão ou parâmetro com o vetor float32
+        quantization: float32, int8 ou binary
+
+    Returns:
+        Expressão SQL com o vetor no formato da coluna
+    """
+    if quantization == "int8":
+        # Os embeddings são normalizados, então os componentes ficam em [-1, 1]
+        return f"vec_quantize_int8({expression}, 'unit')"
+    if quantization == "binary":
+        return f"vec_quantize_binary({expression})"
+    return expression
 
 
 class LangChainClient:
     def __init__(self, db_file: str = settings.path_db_file, table: str = "documents"):
         self.db_file = db_file
         self.table = table
-        self.embedding = OpenAIEmbeddings(
-            model="text-embedding-3-small", api_key=settings.openai_api_key
+        self.manifest_table = f"{table}_manifest"
+        self.staging_table = f"{table}_staging"
+        self.meta_table = f"{table}_meta"
+        self.deleted_table = f"{table}_deleted"
+        self.fts_table = f"{table}_fts"
+        self.info_table = f"{table}_embedding_info"
+        self.embedding_model = embedding_model_name()
+        provider = build_embedding_provider()
+        self.embedding = build_cached_embeddings(
+            provider,
+            model=self.embedding_model,
+            db_file=db_file,
+            cache_file=settings.embedding_cache_file,
+            memory_items=settings.embedding_cache_memory_items,
+            max_entries=settings.embedding_cache_max_entries,
+            scheduler=EmbeddingScheduler(
+                provider,
+                self.embedding_model,
+                max_tokens=settings.embedding_batch_tokens,
+                max_items=settings.embedding_batch_size,
+                concurrency=settings.embedding_concurrency,
+                max_wait=settings.embedding_batch_wait,
+            ),
         )
+        self.store = get_store_manager(db_file)
+        self.vector_engine: Optional[VectorEngine] = None
         self._db = None
+        self._ready = False
+        self._init_lock = threading.Lock()
 
     def init_db(self):
+        """
+        Cria e migra as tabelas do índice (uma vez por cliente).
+
+        O esquema é preparado em uma conexão própria; depois disso as buscas
+        usam o pool de leitura e as gravações, a thread escritora do
+        StoreManager compartilhado.
+        """
+        with self._init_lock:
+            if self._ready:
+                return
+            if self._db is None:
+                self._db = SQLiteVec(
+                    table=self.table,
+                    connection=self.store.connect(),
+                    embedding=self.embedding,
+                    db_file=self.db_file,
+                )
+            self._create_tables()
+            self._ready = True
+
+    def _create_tables(self):
+        self._migrate_chunk_columns()
+        self._configure_vector_storage()
+        self._create_fts_table()
+        self._create_manifest_table()
+        self._create_staging_table()
+        self._create_meta_table()
+        self._create_deletion_log()
+        self._check_embedding_info()
+        if settings.vector_engine != "sqlite":
+            self._open_vector_engine()
+
+    def _open_vector_engine(self):
+        """
+        Abre o engine de vetores em memória configurado e o sincroniza com a
+        tabela; o sqlite-vec continua recebendo as gravações.
+        """
+        self.vector_engine = get_vector_engine(
+            settings.vector_engine,
+            settings.vector_engine_dir or default_vector_dir(self.db_file, self.table),
+            model=self.embedding_model,
+            dimension=self._vector_dimension(),
+            hnsw_m=settings.hnsw_m,
+            hnsw_ef_construction=settings.hnsw_ef_construction,
+            hnsw_ef_search=settings.hnsw_ef_search,
+        )
+        conn = self._db._connection
+        self.vector_engine.sync(conn, self.table, self._generation(conn))
+
+    def _migrate_chunk_columns(self):
+        """
+        Garante as colunas estruturadas dos chunks e migra linhas antigas.
+
+        Bancos criados antes das colunas guardavam os metadados num cabeçalho
+        embutido no texto (ou no JSON de metadata); esses valores são movidos
+        para as colunas e o cabeçalho é removido do texto. Os vetores antigos
+        são mantidos; reenviar o arquivo gera embeddings só do corpo.
+        """
+        conn = self._db._connection
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({self.table})")}
+        with conn:
+            for column, column_type in CHUNK_COLUMNS.items():
+                if column not in existing:
+                    conn.execute(
+                        f"ALTER TABLE {self.table} ADD COLUMN {column} {column_type}"
+                    )
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.table}_filename "
+                f"ON {self.table}(filename)"
+            )
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.table}_file_type "
+                f"ON {self.table}(file_type)"
+            )
+
+            conn.execute(
+                f"""
+                UPDATE {self.table}
+                SET filename = json_extract(metadata, '$.filename')
+                WHERE filename IS NULL
+                  AND json_valid(metadata)
+                  AND json_extract(metadata, '$.filename') IS NOT NULL
+                """
+            )
+            legacy = conn.execute(
+                f"SELECT rowid, text FROM {self.table} "
+                "WHERE filename IS NULL AND text LIKE 'Arquivo:%'"
+            ).fetchall()
+            for row in legacy:
+                fields = parse_legacy_chunk(row[1])
+                assignments = ", ".join(f"{column} = ?" for column in fields)
+                conn.execute(
+                    f"UPDATE {self.table} SET {assignments} WHERE rowid = ?",
+                    [*fields.values(), row[0]],
+                )
+
+    def _create_fts_table(self):
+        """
+        Índice FTS5 (BM25) sobre o texto dos chunks.
+
+        É uma tabela de conteúdo externo: guarda só o índice invertido e lê o
+        texto da tabela de documentos. Triggers mantêm o índice em dia em
+        inserções, remoções e atualizações de texto; na criação o índice é
+        reconstruído a partir dos chunks existentes.
+        """
+        conn = self._db._connection
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = ?", (self.fts_table,)
+        ).fetchone()
+        with conn:
+            conn.execute(
+                f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS {self.fts_table} USING fts5(
+                    text,
+                    content='{self.table}',
+                    content_rowid='rowid',
+                    tokenize='unicode61 remove_diacritics 2'
+                )
+                """
+            )
+            conn.execute(
+                f"""
+                CREATE TRIGGER IF NOT EXISTS {self.fts_table}_insert
+                AFTER INSERT ON {self.table} BEGIN
+                    INSERT INTO {self.fts_table}(rowid, text)
+                    VALUES (new.rowid, new.text);
+                END
+                """
+            )
+            conn.execute(
+                f"""
+                CREATE TRIGGER IF NOT EXISTS {self.fts_table}_delete
+                AFTER DELETE ON {self.table} BEGIN
+                    INSERT INTO {self.fts_table}({self.fts_table}, rowid, text)
+                    VALUES ('delete', old.rowid, old.text);
+                END
+                """
+            )
+            conn.execute(
+                f"""
+                CREATE TRIGGER IF NOT EXISTS {self.fts_table}_update
+                AFTER UPDATE OF text ON {self.table} BEGIN
+                    INSERT INTO {self.fts_table}({self.fts_table}, rowid, text)
+                    VALUES ('delete', old.rowid, old.text);
+                    INSERT INTO {self.fts_table}(rowid, text)
+                    VALUES (new.rowid, new.text);
+                END
+                """
+            )
+            if not exists:
+                conn.execute(
+                    f"INSERT INTO {self.fts_table}({self.fts_table}) VALUES ('rebuild')"
+                )
+
+    def _create_staging_table(self):
+        conn = self._db._connection
+        columns = ",\n".join(
+            f"                {column} {column_type}"
+            for column, column_type in CHUNK_COLUMNS.items()
+        )
+        with conn:
+            conn.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {self.staging_table} (
+                    token TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    text TEXT,
+                    metadata BLOB,
+                    text_embedding BLOB,
+{columns}
+                )
+                """
+            )
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.staging_table}_token "
+                f"ON {self.staging_table}(token)"
+            )
+            # Sobras de ingestões interrompidas
+            conn.execute(
+                f"DELETE FROM {self.staging_table} WHERE created_at < ?",
+                (time.time() - STAGING_TTL,),
+            )
+
+    def _create_meta_table(self):
+        conn = self._db._connection
+        with conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.meta_table} "
+                f"(key TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+            )
+            conn.execute(
+                f"INSERT OR IGNORE INTO {self.meta_table}(key, value) "
+                f"VALUES ('generation', 0)"
+            )
+
+    def _create_deletion_log(self):
+        """
+        Registro dos rowids removidos da tabela de documentos, preenchido por
+        trigger; a VectorMatrix aplica só as remoções posteriores à última
+        que leu, sem comparar a tabela inteira.
+        """
+        conn = self._db._connection
+        with conn:
+            conn.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {self.deleted_table} (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    doc_rowid INTEGER NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                f"""
+                CREATE TRIGGER IF NOT EXISTS {self.deleted_table}_log
+                AFTER DELETE ON {self.table}
+                BEGIN
+                    INSERT INTO {self.deleted_table}(doc_rowid) VALUES (old.rowid);
+                END
+                """
+            )
+
+    def _vector_column(self) -> Optional[re.Match]:
+        row = self._db._connection.execute(
+            "SELECT sql FROM sqlite_master WHERE name = ?", (f"{self.table}_vec",)
+        ).fetchone()
+        return re.search(r"\b(float|int8|bit)\[(\d+)\]", row[0]) if row else None
+
+    def _vector_dimension(self) -> Optional[int]:
+        column = self._vector_column()
+        return int(column.group(2)) if column else None
+
+    def _configure_vector_storage(self):
+        """
+        Ajusta a tabela do sqlite-vec a settings.vector_quantization.
+
+        Com int8 ou binary, a tabela do sqlite-vec guarda só a versão
+        quantizada dos vetores (4x e 32x menor) e serve para a passada
+        grossa da busca; o vetor float32 continua na tabela de documentos e é
+        usado para reordenar os candidatos. Quando a configuração muda, a
+        tabela e o trigger que a alimenta são recriados a partir dos vetores
+        float32, em uma única transação.
+        """
+        column = self._vector_column()
+        quantization = settings.vector_quantization
+        column_type = VECTOR_COLUMN_TYPES[quantization]
+        if column is None or column.group(1) == column_type:
+            return
+
+        dimension = int(column.group(2))
+        if quantization == "binary" and dimension % 8:
+            raise Exception(
+                f"A quantização binary exige uma dimensão múltipla de 8 "
+                f"(o índice tem {dimension})"
+            )
+        conn = self._db._connection
+        # No modo legado do sqlite3 cada DDL é confirmada sozinha; o BEGIN
+        # explícito deixa DROP, CREATE e a cópia na mesma transação
+        conn.execute("BEGIN IMMEDIATE")
         try:
-            self._db = SQLiteVec(
-                table=self.table,
-                embedding=self.embedding,
-                db_file=self.db_file,
+            conn.execute(f"DROP TRIGGER IF EXISTS {self.table}_embed_text")
+            conn.execute(f"DROP TABLE {self.table}_vec")
+            conn.execute(
+                f"""
+                CREATE VIRTUAL TABLE {self.table}_vec USING vec0(
+                    rowid INTEGER PRIMARY KEY,
+                    text_embedding {column_type}[{dimension}]
+                )
+                """
+            )
+            conn.execute(
+                f"""
+                INSERT INTO {self.table}_vec(rowid, text_embedding)
+                SELECT rowid, {quantize_sql("text_embedding", quantization)}
+                FROM {self.table}
+                WHERE text_embedding IS NOT NULL
+                """
+            )
+            conn.execute(
+                f"""
+                CREATE TRIGGER {self.table}_embed_text
+                AFTER INSERT ON {self.table} BEGIN
+                    INSERT INTO {self.table}_vec(rowid, text_embedding)
+                    VALUES (
+                        new.rowid,
+                        {quantize_sql("new.text_embedding", quantization)}
+                    );
+                END
+                """
             )
         except Exception:
-            self._db = SQLiteVec.from_texts(
-                texts=[],
-                embedding=self.embedding,
-                table=self.table,
-                db_file=self.db_file,
-            )
-
-    def _ensure_db(self, texts: List[str]):
-        self._db = SQLiteVec.from_texts(
-            texts=texts,
-            embedding=self.embedding,
-            table=self.table,
-            db_file=self.db_file,
+            conn.rollback()
+            raise
+        conn.commit()
+
+    def _check_embedding_info(self):
+        """
+        Registra o modelo e a dimensão dos embeddings do índice e impede que
+        ele seja aberto com outro modelo.
+
+        Bancos anteriores ao registro são adotados pelo modelo atual, desde
+        que o manifesto e a tabela de vetores não indiquem outro.
+        """
+        conn = self._db._connection
+        dimension = self._vector_dimension()
+        with conn:
+            conn.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {self.info_table} (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    backend TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    dimension INTEGER NOT NULL,
+                    created_at TEXT NOT NULL
+                )
+                """
+            )
+            row = conn.execute(
+                f"SELECT backend, model, dimension FROM {self.info_table}"
+            ).fetchone()
+            if row is None:
+                models = [
+                    model
+                    for (model,) in conn.execute(
+                        f"SELECT DISTINCT embedding_model FROM {self.manifest_table}"
+                    )
+                ]
+                row = {
+                    "backend": settings.embedding_backend,
+                    "model": models[0] if len(models) == 1 else self.embedding_model,
+                    "dimension": dimension,
+                }
+                conn.execute(
+                    f"INSERT INTO {self.info_table}"
+                    "(id, backend, model, dimension, created_at) VALUES (1, ?, ?, ?, ?)",
+                    (
+                        row["backend"],
+                        row["model"],
+                        row["dimension"],
+                        datetime.now().isoformat(),
+                    ),
+                )
+
+        # O vetor de teste do SQLiteVec já está no cache de embeddings
+        current = self._db.get_dimensionality()
+        if row["model"] != self.embedding_model or row["dimension"] != current:
+            raise Exception(
+                f"O índice {self.db_file} foi criado com o modelo de embeddings "
+                f"{row['model']} ({row['dimension']} dimensões), mas a configuração "
+                f"atual usa {self.embedding_model} ({current} dimensões). "
+                "Use outro PATH_DB_FILE ou reindexe os documentos em um banco novo."
+            )
+
+    def _bump_generation(self, conn: sqlite3.Connection):
+        conn.execute(
+            f"UPDATE {self.meta_table} SET value = value + 1 WHERE key = 'generation'"
+        )
+
+    def _generation(self, conn: sqlite3.Connection) -> int:
+        row = conn.execute(
+            f"SELECT value FROM {self.meta_table} WHERE key = 'generation'"
+        ).fetchone()
+        return row[0] if row else 0
+
+    def index_generation(self) -> int:
+        """
+        Versão do índice, incrementada a cada inclusão ou remoção de chunks.
+
+        Fica no banco, então é compartilhada por todas as instâncias (e
+        processos) que usam o mesmo arquivo.
+        """
+        self.init_db()
+        return self.store.read(self._generation)
+
+    async def aindex_generation(self) -> int:
+        """index_generation lido no executor de leitura, fora do event loop."""
+        return await self.store.run_read(self.index_generation)
+
+    def _create_manifest_table(self):
+        conn = self._db._connection
+        conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {self.manifest_table} (
+                filename TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                embedding_model TEXT NOT NULL,
+                chunk_size INTEGER NOT NULL,
+                chunk_overlap INTEGER NOT NULL,
+                chunk_count INTEGER NOT NULL,
+                characters INTEGER NOT NULL,
+                document_name TEXT,
+                file_type TEXT,
+                preview TEXT,
+                indexed_at TEXT NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS {self.manifest_table}_hash "
+            f"ON {self.manifest_table}(content_hash)"
         )
+        conn.commit()
+
+    def get_manifest(self, filename: str) -> Optional[Dict[str, Any]]:
+        self.init_db()
+        with self.store.reader() as conn:
+            row = conn.execute(
+                f"SELECT * FROM {self.manifest_table} WHERE filename = ?", (filename,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def chunks_exist(self, rowids: List[int]) -> bool:
+        """Indica se todos os chunks ainda estão no índice (rowids não são reusados)."""
+        if not rowids:
+            return True
+        self.init_db()
+        found = 0
+        with self.store.reader() as conn:
+            for start in range(0, len(rowids), 500):
+                batch = rowids[start : start + 500]
+                placeholders = ",".join("?" * len(batch))
+                found += conn.execute(
+                    f"SELECT count(*) FROM {self.table} WHERE rowid IN ({placeholders})",
+                    batch,
+                ).fetchone()[0]
+        return found == len(set(rowids))
+
+    def _document_rowids(self, conn: sqlite3.Connection, filename: str) -> List[int]:
+        rows = conn.execute(
+            f"SELECT rowid FROM {self.table} WHERE filename = ?", (filename,)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.embedding.aembed_documents(texts)
+
+    async def aembed_query(self, query: str) -> List[float]:
+        return await self.embedding.aembed_query(query)
+
+    async def stage_chunks(
+        self,
+        token: str,
+        texts: List[str],
+        metadatas: List[dict],
+        embeddings: List[List[float]],
+    ) -> int:
+        """
+        Grava uma janela de chunks já vetorizados na área de preparação.
+
+        Os chunks só passam a valer para a busca em commit_staged, de modo
+        que um arquivo grande pode ser gravado em várias transações curtas
+        sem que uma versão parcial fique visível. Janelas de uploads
+        simultâneos são confirmadas juntas pela thread escritora.
+
+        Args:
+            token: Identificador da ingestão em andamento
+            texts: Chunks da janela
+            metadatas: Colunas de cada chunk (ver CHUNK_COLUMNS); chaves
+                desconhecidas vão para o JSON de metadata
+            embeddings: Vetores de cada chunk
+
+        Returns:
+            Quantidade de chunks gravados
+        """
+        chunk_columns = ", ".join(CHUNK_COLUMNS)
+        chunk_placeholders = ", ".join("?" * len(CHUNK_COLUMNS))
+        rows = []
+        for text, metadata, embed in zip(texts, metadatas, embeddings):
+            extra = {k: v for k, v in metadata.items() if k not in CHUNK_COLUMNS}
+            rows.append(
+                (
+                    token,
+                    time.time(),
+                    text,
+                    json.dumps(extra),
+                    serialize_f32(embed),
+                    *(metadata.get(column) for column in CHUNK_COLUMNS),
+                )
+            )
+
+        def stage(conn: sqlite3.Connection):
+            conn.executemany(
+                f"INSERT INTO {self.staging_table}"
+                f"(token, created_at, text, metadata, text_embedding, {chunk_columns}) "
+                f"VALUES (?, ?, ?, ?, ?, {chunk_placeholders})",
+                rows,
+            )
+
+        self.init_db()
+        await self.store.awrite(stage)
+        return len(rows)
+
+    async def commit_staged(
+        self, token: str, filename: str, manifest: Dict[str, Any]
+    ) -> int:
+        """
+        Substitui atomicamente os chunks de um arquivo pelos chunks preparados.
+
+        Em uma única transação os chunks antigos do arquivo são removidos, os
+        preparados sob `token` são copiados para a tabela de documentos (o
+        trigger do sqlite-vec indexa os vetores) e o manifesto é atualizado.
+
+        Args:
+            token: Identificador usado em stage_chunks
+            filename: Nome do arquivo indexado
+            manifest: Campos do manifesto (hash, modelo, parâmetros de chunking)
+
+        Returns:
+            Quantidade de chunks publicados
+        """
+        chunk_columns = ", ".join(CHUNK_COLUMNS)
+
+        def publish(conn: sqlite3.Connection) -> int:
+            old_rowids = self._document_rowids(conn, filename)
+            for start in range(0, len(old_rowids), 500):
+                batch = old_rowids[start : start + 500]
+                placeholders = ",".join("?" * len(batch))
+                conn.execute(
+                    f"DELETE FROM {self.table}_vec WHERE rowid IN ({placeholders})",
+                    batch,
+                )
+                conn.execute(
+                    f"DELETE FROM {self.table} WHERE rowid IN ({placeholders})",
+                    batch,
+                )
+            if old_rowids:
+                conn.execute(
+                    f"DELETE FROM {self.deleted_table} WHERE seq <= "
+                    f"(SELECT max(seq) FROM {self.deleted_table}) - ?",
+                    (DELETION_LOG_ROWS,),
+                )
+
+            written = conn.execute(
+                f"""
+                INSERT INTO {self.table}(text, metadata, text_embedding, {chunk_columns})
+                SELECT text, metadata, text_embedding, {chunk_columns}
+                FROM {self.staging_table}
+                WHERE token = ?
+                ORDER BY rowid
+                """,
+                (token,),
+            ).rowcount
+            conn.execute(f"DELETE FROM {self.staging_table} WHERE token = ?", (token,))
+
+            row = {
+                **manifest,
+                "filename": filename,
+                "chunk_count": written,
+                "indexed_at": datetime.now().isoformat(),
+            }
+            columns = ", ".join(row.keys())
+            placeholders = ", ".join("?" * len(row))
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.manifest_table}({columns}) "
+                f"VALUES ({placeholders})",
+                list(row.values()),
+            )
+            self._bump_generation(conn)
+            return written
+
+        self.init_db()
+        return await self.store.awrite(publish)
+
+    async def discard_staged(self, token: str):
+        def discard(conn: sqlite3.Connection):
+            conn.execute(f"DELETE FROM {self.staging_table} WHERE token = ?", (token,))
+
+        self.init_db()
+        await self.store.awrite(discard)
 
     def add_texts(self, texts: List[str]):
         if not texts:
             return
-        if self._db is None:
-            self._ensure_db(texts)
-        else:
-            self._db.add_texts(texts)
+        self.init_db()
+        rows = [
+            (text, "{}", serialize_f32(embed))
+            for text, embed in zip(texts, self.embedding.embed_documents(texts))
+        ]
 
-    def similarity_search(self, query: str, k: int = 4):
-        if self._db is None:
-            self.init_db()
+        def insert(conn: sqlite3.Connection):
+            conn.executemany(
+                f"INSERT INTO {self.table}(text, metadata, text_embedding) "
+                "VALUES (?, ?, ?)",
+                rows,
+            )
+            self._bump_generation(conn)
 
-        if self._db is None:
-            return []
+        self.store.write(insert)
 
+    def similarity_search(
+        self, query: str, k: int = 4, filters: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
         try:
-            results = self._db.similarity_search(query, k=k)
-            return results
+            self.init_db()
+            embedding = self.embedding.embed_query(query)
+            return self.similarity_search_by_vector(embedding, k=k, filters=filters)
         except Exception:
             return []
+
+    def _filter_sql(
+        self, filters: Optional[Dict[str, Any]]
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Condições SQL dos filtros da busca sobre a tabela de documentos
+        (alias e); todas usam índices: filename e file_type nas colunas dos
+        chunks, o intervalo de datas no indexed_at do manifesto.
+
+        Args:
+            filters: filename, file_type, indexed_after e indexed_before;
+                valores None são ignorados
+
+        Returns:
+            Condições combinadas com AND ("" sem filtros) e seus parâmetros
+        """
+        conditions = []
+        params: Dict[str, Any] = {}
+        for column in ("filename", "file_type"):
+            value = (filters or {}).get(column)
+            if value is not None:
+                conditions.append(f"e.{column} = :{column}")
+                params[column] = value
+
+        dates = []
+        for name, operator in (("indexed_after", ">="), ("indexed_before", "<=")):
+            value = (filters or {}).get(name)
+            if value is None:
+                continue
+            if isinstance(value, datetime):
+                # O manifesto guarda datetime.now() local, sem fuso
+                if value.tzinfo is not None:
+                    value = value.astimezone().replace(tzinfo=None)
+                value = value.isoformat()
+            dates.append(f"indexed_at {operator} :{name}")
+            params[name] = value
+        if dates:
+            conditions.append(
+                f"e.filename IN (SELECT filename FROM {self.manifest_table} "
+                f"WHERE {' AND '.join(dates)})"
+            )
+        return " AND ".join(conditions), params
+
+    def lexical_search(
+        self, query: str, k: int = 4, filters: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        """
+        Busca por termos no índice FTS5, ordenada por BM25. Não usa a rede.
+
+        Cada palavra da consulta vira um termo entre aspas e os termos são
+        combinados com OR, então chunks com mais termos (e termos mais raros)
+        ficam na frente.
+
+        Args:
+            query: Texto de busca
+            k: Quantidade de resultados
+            filters: Filtros de metadados (ver _filter_sql)
+
+        Returns:
+            Lista de Documents com as colunas do chunk, rowid e bm25 (menor é
+            melhor) em metadata
+        """
+        terms = _FTS_TERM.findall(query)
+        if not terms:
+            return []
+        match = " OR ".join(f'"{term}"' for term in terms)
+        columns = ", ".join(f"e.{column}" for column in CHUNK_COLUMNS)
+        where, params = self._filter_sql(filters)
+        self.init_db()
+        with self.store.reader() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT e.rowid AS rowid, e.text AS text, {columns},
+                       bm25({self.fts_table}) AS bm25
+                FROM {self.fts_table}
+                INNER JOIN {self.table} AS e ON e.rowid = {self.fts_table}.rowid
+                WHERE {self.fts_table} MATCH :match {"AND " + where if where else ""}
+                ORDER BY bm25
+                LIMIT :k
+                """,
+                {**params, "match": match, "k": k},
+            ).fetchall()
+        return [
+            Document(
+                page_content=row["text"],
+                metadata={
+                    "rowid": row["rowid"],
+                    "bm25": row["bm25"],
+                    **{column: row[column] for column in CHUNK_COLUMNS},
+                },
+            )
+            for row in rows
+        ]
+
+    def _engine_search(
+        self,
+        conn: sqlite3.Connection,
+        embedding: List[float],
+        k: int,
+        where: str,
+        params: Dict[str, Any],
+    ) -> List[Document]:
+        self.vector_engine.sync(conn, self.table, self._generation(conn))
+        rowids = None
+        if where:
+            rowids = [
+                row[0]
+                for row in conn.execute(
+                    f"SELECT e.rowid FROM {self.table} AS e WHERE {where} "
+                    "ORDER BY e.rowid",
+                    params,
+                )
+            ]
+        hits = self.vector_engine.search(embedding, k, rowids=rowids)
+        if not hits:
+            return []
+
+        columns = ", ".join(CHUNK_COLUMNS)
+        placeholders = ",".join("?" * len(hits))
+        rows = {
+            row["rowid"]: row
+            for row in conn.execute(
+                f"SELECT rowid, text, {columns} FROM {self.table} "
+                f"WHERE rowid IN ({placeholders})",
+                [rowid for rowid, _ in hits],
+            )
+        }
+        return [
+            Document(
+                page_content=rows[rowid]["text"],
+                metadata={
+                    "rowid": rowid,
+                    "distance": distance,
+                    **{column: rows[rowid][column] for column in CHUNK_COLUMNS},
+                },
+            )
+            for rowid, distance in hits
+            if rowid in rows
+        ]
+
+    def _is_selective(
+        self, conn: sqlite3.Connection, where: str, params: Dict[str, Any]
+    ) -> bool:
+        """Indica se o filtro casa com até settings.search_filter_scan_rows chunks."""
+        (count,) = conn.execute(
+            f"SELECT count(*) FROM (SELECT 1 FROM {self.table} AS e "
+            f"WHERE {where} LIMIT :scan_rows)",
+            {**params, "scan_rows": settings.search_filter_scan_rows + 1},
+        ).fetchone()
+        return count <= settings.search_filter_scan_rows
+
+    def similarity_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[Document]:
+        """
+        Busca KNN retornando os metadados direto das colunas.
+
+        Usa o engine em memória configurado em settings.vector_engine
+        (exact ou hnsw) ou, por padrão, o sqlite-vec. Com vetores
+        quantizados, o sqlite-vec seleciona k * settings.vector_rerank_factor
+        candidatos e eles são reordenados pela distância L2 dos vetores
+        float32.
+
+        Os filtros entram antes do KNN, nunca depois: se casam com poucos
+        chunks (settings.search_filter_scan_rows), só esses chunks são
+        comparados, pelos índices das colunas, e o custo é proporcional a
+        eles; senão, o KNN do sqlite-vec é restrito aos rowids do filtro.
+
+        Args:
+            embedding: Vetor da consulta
+            k: Quantidade de resultados
+            filters: Filtros de metadados (ver _filter_sql)
+
+        Returns:
+            Lista de Documents com as colunas do chunk, rowid e distance
+            em metadata
+        """
+        self.init_db()
+        where, params = self._filter_sql(filters)
+        with self.store.reader() as conn:
+            return self._vector_search(conn, embedding, k, where, params)
+
+    def _vector_search(
+        self,
+        conn: sqlite3.Connection,
+        embedding: List[float],
+        k: int,
+        where: str,
+        params: Dict[str, Any],
+    ) -> List[Document]:
+        if self.vector_engine is not None:
+            return self._engine_search(conn, embedding, k, where, params)
+
+        columns = ", ".join(f"e.{column}" for column in CHUNK_COLUMNS)
+        quantization = settings.vector_quantization
+        in_filter = ""
+        if where:
+            in_filter = f"IN (SELECT e.rowid FROM {self.table} AS e WHERE {where})"
+        if where and self._is_selective(conn, where, params):
+            query = f"""
+                SELECT e.rowid AS rowid, e.text AS text, {columns},
+                       vec_distance_l2(e.text_embedding, :query) AS distance
+                FROM {self.table} AS e
+                WHERE {where} AND e.text_embedding IS NOT NULL
+                ORDER BY distance
+                LIMIT :k
+                """
+        elif quantization == "float32":
+            query = f"""
+                SELECT e.rowid AS rowid, e.text AS text, {columns}, v.distance
+                FROM {self.table}_vec AS v
+                INNER JOIN {self.table} AS e ON e.rowid = v.rowid
+                WHERE v.text_embedding MATCH :query AND k = :k
+                  {"AND v.rowid " + in_filter if in_filter else ""}
+                ORDER BY v.distance
+                """
+        else:
+            query = f"""
+                SELECT e.rowid AS rowid, e.text AS text, {columns},
+                       vec_distance_l2(e.text_embedding, :query) AS distance
+                FROM (
+                    SELECT rowid FROM {self.table}_vec
+                    WHERE text_embedding MATCH {quantize_sql(":query", quantization)}
+                      AND k = :candidates {"AND rowid " + in_filter if in_filter else ""}
+                ) AS v
+                INNER JOIN {self.table} AS e ON e.rowid = v.rowid
+                ORDER BY distance
+                LIMIT :k
+                """
+        rows = conn.execute(
+            query,
+            {
+                **params,
+                "query": serialize_f32(embedding),
+                "k": k,
+                "candidates": min(k * settings.vector_rerank_factor, VEC_MAX_K),
+            },
+        ).fetchall()
+        return [
+            Document(
+                page_content=row["text"],
+                metadata={
+                    "rowid": row["rowid"],
+                    "distance": row["distance"],
+                    **{column: row[column] for column in CHUNK_COLUMNS},
+                },
+            )
+            for row in rows
+        ]
+
+
+_clients: Dict[str, LangChainClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_langchain_client(db_file: str = settings.path_db_file) -> LangChainClient:
+    """
+    Cliente compartilhado pelo processo para o banco informado: um só
+    provedor de embeddings, cache e StoreManager para todos os serviços.
+    """
+    key = os.path.abspath(db_file)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = LangChainClient(db_file=db_file)
+            _clients[key] = client
+    return client
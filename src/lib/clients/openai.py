@@ -1,11 +1,24 @@
 import base64
-from typing import List
+from typing import AsyncIterator, Dict, List, Optional
 
 import pydantic
 from langchain_openai import OpenAIEmbeddings
 from openai import AsyncOpenAI
 
 from src.config import settings
+from src.lib.ffmpeg import audio_options, get_transcoder
+
+# Saídas do ffmpeg (codec, formato) que o TTS já entrega prontas
+TTS_NATIVE_FORMATS = {
+    ("libopus", "opus"): "opus",
+    ("libopus", "ogg"): "opus",
+    ("libmp3lame", "mp3"): "mp3",
+    ("aac", "adts"): "aac",
+    ("flac", "flac"): "flac",
+}
+
+# Modelos de TTS que aplicam o parâmetro `speed` (o gpt-4o-mini-tts o ignora)
+TTS_SPEED_MODELS = {"tts-1", "tts-1-hd"}
 
 
 class AudioResponse(pydantic.BaseModel):
@@ -13,11 +26,18 @@ class AudioResponse(pydantic.BaseModel):
     audio_base64: str
 
 
+class AnswerChunk(pydantic.BaseModel):
+    content: str = ""
+    usage: Optional[Dict[str, int]] = None
+
+
 class OpenAIClient:
     def __init__(self):
         self.client = AsyncOpenAI(api_key=settings.openai_api_key)
         self.embeddings = OpenAIEmbeddings(
-            model="text-embedding-3-small", api_key=settings.openai_api_key
+            model=settings.embedding_model,
+            dimensions=settings.embedding_dimensions,
+            api_key=settings.openai_api_key,
         )
 
     async def create_answer(self, data: str) -> str:
@@ -27,11 +47,97 @@ class OpenAIClient:
         answer = response.choices[0].message.content
         return answer
 
-    async def create_audio(self, data: str) -> str:
+    async def stream_answer(self, data: str) -> AsyncIterator[AnswerChunk]:
+        """
+        Gera a resposta em streaming, trecho a trecho.
+
+        Args:
+            data: Prompt completo
+
+        Returns:
+            Iterador de AnswerChunk; o último traz o uso de tokens em `usage`
+        """
+        stream = await self.client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[{"role": "user", "content": data}],
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield AnswerChunk(content=chunk.choices[0].delta.content)
+            if chunk.usage:
+                yield AnswerChunk(
+                    usage={
+                        "prompt_tokens": chunk.usage.prompt_tokens,
+                        "completion_tokens": chunk.usage.completion_tokens,
+                        "total_tokens": chunk.usage.total_tokens,
+                    }
+                )
+
+    def native_audio_format(self) -> Optional[str]:
+        """
+        Formato do TTS que já corresponde à saída configurada (caminho rápido).
+
+        Só é usado quando o TTS aplica a velocidade exatamente como o atempo
+        do ffmpeg: velocidade 1 ou um modelo com `speed` (tts-1, tts-1-hd).
+        O bitrate do caminho rápido é o do TTS; audio_bitrate vale só para o
+        ffmpeg.
+
+        Returns:
+            `response_format` a pedir ao TTS, ou None quando o áudio precisa
+            passar pelo ffmpeg: caminho rápido desativado, codec/formato que o
+            TTS não gera, ou velocidade diferente de 1 com um modelo que não
+            aplica `speed`
+        """
+        if not settings.tts_native_audio:
+            return None
+        response_format = TTS_NATIVE_FORMATS.get(
+            (settings.audio_codec, settings.audio_format)
+        )
+        if response_format is None:
+            return None
+        if settings.audio_speed != 1 and settings.tts_model not in TTS_SPEED_MODELS:
+            return None
+        return response_format
+
+    async def create_audio_bytes(
+        self, data: str, response_format: str = "mp3", speed: Optional[float] = None
+    ) -> bytes:
         speech = await self.client.audio.speech.create(
-            model="gpt-4o-mini-tts", voice="ash", input=data
+            model=settings.tts_model,
+            voice=settings.tts_voice,
+            input=data,
+            response_format=response_format,
+            **({"speed": speed} if speed is not None else {}),
         )
-        audio_bytes = speech.read()
+        return speech.read()
+
+    async def synthesize_audio(self, data: str) -> bytes:
+        """
+        Gera o áudio final (velocidade, codec e formato de Settings).
+
+        No caminho rápido o TTS já devolve o formato e a velocidade finais e
+        o ffmpeg não é usado. Caso contrário o TTS gera mp3 e o Transcoder
+        aplica velocidade e compressão. O bitrate só é respeitado pelo
+        ffmpeg; no caminho rápido vale o do TTS.
+
+        Args:
+            data: Texto a ser falado
+
+        Returns:
+            Bytes do áudio final
+        """
+        response_format = self.native_audio_format()
+        if response_format is not None:
+            return await self.create_audio_bytes(
+                data, response_format=response_format, speed=settings.audio_speed
+            )
+        audio = await self.create_audio_bytes(data)
+        return await get_transcoder().transcode(audio, **audio_options())
+
+    async def create_audio(self, data: str) -> str:
+        audio_bytes = await self.synthesize_audio(data)
         audio_base64 = base64.b64encode(audio_bytes).decode("utf-8")
         return audio_base64
 
@@ -50,8 +156,11 @@ class OpenAIClient:
         Returns:
             Lista de floats representando o vetor embedding
         """
+        options = {}
+        if settings.embedding_dimensions:
+            options["dimensions"] = settings.embedding_dimensions
         response = await self.client.embeddings.create(
-            model="text-embedding-3-small", input=text.strip()
+            model=settings.embedding_model, input=text.strip(), **options
         )
         return response.data[0].embedding
 
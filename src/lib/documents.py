@@ -0,0 +1,299 @@
+import codecs
+import json
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+import PyPDF2
+from docx import Document
+
+from src.schemas.store_schema import DocsType
+
+SEPARATOR = "\n\n"
+READ_BLOCK = 1 << 20
+
+
+def iter_pdf_text(path: str) -> Iterator[str]:
+    """Gera o texto do PDF página a página, sem montar o texto completo."""
+    try:
+        with open(path, "rb") as pdf_file:
+            pdf_reader = PyPDF2.PdfReader(pdf_file)
+
+            if len(pdf_reader.pages) == 0:
+                raise Exception("PDF está vazio ou corrompido")
+
+            found = False
+            for page_num, page in enumerate(pdf_reader.pages, 1):
+                try:
+                    page_text = page.extract_text()
+                    if not page_text.strip():
+                        continue
+                    part = f"--- Página {page_num} ---\n{page_text}"
+                except Exception as e:
+                    part = (
+                        f"--- Página {page_num} ---\n[Erro ao extrair texto: {str(e)}]"
+                    )
+                yield (SEPARATOR if found else "") + part
+                found = True
+
+            if not found:
+                raise Exception(
+                    "Não foi possível extrair texto de nenhuma página do PDF"
+                )
+
+    except Exception as e:
+        raise Exception(f"Erro ao processar PDF: {str(e)}")
+
+
+def iter_docx_text(path: str) -> Iterator[str]:
+    try:
+        doc = Document(path)
+
+        def parts() -> Iterator[str]:
+            for para in doc.paragraphs:
+                if para.text.strip():
+                    yield para.text
+
+            for table in doc.tables:
+                for row in table.rows:
+                    row_text = []
+                    for cell in row.cells:
+                        if cell.text.strip():
+                            row_text.append(cell.text.strip())
+                    if row_text:
+                        yield " | ".join(row_text)
+
+        found = False
+        for part in parts():
+            yield (SEPARATOR if found else "") + part
+            found = True
+
+        if not found:
+            raise Exception("Documento DOCX está vazio")
+
+    except Exception as e:
+        raise Exception(f"Erro ao processar DOCX: {str(e)}")
+
+
+def _iter_decoded(path: str, encoding: str, errors: str = "strict") -> Iterator[str]:
+    decoder = codecs.getincrementaldecoder(encoding)(errors=errors)
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(READ_BLOCK)
+            if not block:
+                break
+            yield decoder.decode(block)
+    yield decoder.decode(b"", final=True)
+
+
+def _is_readable(path: str, encoding: str) -> bool:
+    has_content = False
+    try:
+        for text in _iter_decoded(path, encoding):
+            if "\ufffd" in text or "\x00" in text:
+                return False
+            has_content = has_content or bool(text.strip())
+    except (UnicodeDecodeError, UnicodeError):
+        return False
+    return has_content
+
+
+def iter_plain_text(path: str) -> Iterator[str]:
+    encodings = ["utf-8", "latin-1", "cp1252", "iso-8859-1"]
+    for encoding in encodings:
+        if _is_readable(path, encoding):
+            yield from _iter_decoded(path, encoding)
+            return
+
+    yield from _iter_decoded(path, "utf-8", errors="ignore")
+
+
+def iter_text_from_file(path: str, file_format: DocsType) -> Iterator[str]:
+    """
+    Gera o texto do arquivo em blocos, na ordem em que aparece no documento.
+
+    Args:
+        path: Caminho do arquivo em disco
+        file_format: Formato do arquivo
+
+    Returns:
+        Iterador de trechos cuja concatenação é o texto completo
+    """
+    if file_format == DocsType.PDF:
+        return iter_pdf_text(path)
+    elif file_format == DocsType.DOCX:
+        return iter_docx_text(path)
+    elif file_format in [DocsType.TXT, DocsType.HTML, DocsType.MD]:
+        return iter_plain_text(path)
+    raise Exception(f"Tipo de arquivo não suportado: {file_format}")
+
+
+def _iter_splits(segments: Iterable[str], separator: str) -> Iterator[Tuple[str, int]]:
+    """
+    Pedaços não vazios entre separadores, com o offset de cada um.
+
+    O pedaço ainda sem separador fica em partes e só o trecho novo (mais os
+    últimos len(separator) - 1 caracteres, onde um separador pode começar)
+    é examinado, então o custo é linear no tamanho do texto. Um pedaço sem
+    separador é mantido inteiro, como no CharacterTextSplitter.
+    """
+    keep = len(separator) - 1
+    parts: List[str] = []
+    size = 0
+    tail = ""
+    start = 0
+    for segment in segments:
+        text = tail + segment
+        found = text.find(separator)
+        if found < 0:
+            parts.append(segment)
+            size += len(segment)
+            tail = text[-keep:] if keep else ""
+            continue
+
+        buffer = "".join(parts) + segment
+        position = 0
+        end = size - len(tail) + found
+        while end >= 0:
+            piece = buffer[position:end]
+            if piece:
+                yield piece, start
+            start += len(piece) + len(separator)
+            position = end + len(separator)
+            end = buffer.find(separator, position)
+        rest = buffer[position:]
+        parts = [rest] if rest else []
+        size = len(rest)
+        tail = rest[-keep:] if keep else ""
+    if parts:
+        yield "".join(parts), start
+
+
+def iter_chunks(
+    segments: Iterable[str],
+    chunk_size: int,
+    chunk_overlap: int,
+    separator: str = SEPARATOR,
+) -> Iterator[Tuple[str, int]]:
+    """
+    Versão incremental do CharacterTextSplitter.
+
+    Aplica a mesma regra de junção e sobreposição do splitter do LangChain,
+    mas consome o texto em trechos e mantém em memória apenas os pedaços do
+    chunk corrente. Um pedaço sem separador maior que chunk_size vira um
+    chunk só, como no splitter do LangChain, e fica inteiro em memória.
+
+    Args:
+        segments: Trechos do texto completo, em ordem
+        chunk_size: Tamanho máximo do chunk em caracteres
+        chunk_overlap: Sobreposição entre chunks consecutivos
+        separator: Separador usado para quebrar o texto
+
+    Returns:
+        Iterador de (chunk, offset inicial no texto completo)
+    """
+    separator_len = len(separator)
+    current: List[Tuple[str, int]] = []
+    total = 0
+
+    def join() -> Tuple[str, int]:
+        text = separator.join(piece for piece, _ in current).strip()
+        start = current[0][1]
+        for piece, offset in current:
+            if piece.strip():
+                start = offset + len(piece) - len(piece.lstrip())
+                break
+        return text, start
+
+    for piece, offset in _iter_splits(segments, separator):
+        length = len(piece)
+        if total + length + (separator_len if current else 0) > chunk_size:
+            if current:
+                chunk, start = join()
+                if chunk:
+                    yield chunk, start
+                while total > chunk_overlap or (
+                    total + length + (separator_len if current else 0) > chunk_size
+                    and total > 0
+                ):
+                    total -= len(current[0][0]) + (
+                        separator_len if len(current) > 1 else 0
+                    )
+                    current = current[1:]
+        current.append((piece, offset))
+        total += length + (separator_len if len(current) > 1 else 0)
+
+    if current:
+        chunk, start = join()
+        if chunk:
+            yield chunk, start
+
+
+def spool_chunks(
+    path: str,
+    file_format: DocsType,
+    filename: str,
+    chunk_size: int,
+    chunk_overlap: int,
+    out_path: str,
+    preview_length: int = 300,
+) -> Dict[str, object]:
+    """
+    Extrai e divide o arquivo em chunks gravando-os em JSON Lines.
+
+    Roda no pool de processos de extração. O texto nunca é montado por
+    inteiro: cada trecho passa direto pelo splitter incremental e cada chunk
+    vai para `out_path` assim que fica pronto.
+
+    Args:
+        path: Arquivo enviado, já gravado em disco
+        file_format: Formato do arquivo
+        filename: Nome original, usado nas mensagens de erro
+        chunk_size: Tamanho máximo do chunk
+        chunk_overlap: Sobreposição entre chunks
+        out_path: Arquivo JSON Lines de saída
+        preview_length: Quantidade de caracteres guardados para o preview
+
+    Returns:
+        Dicionário com chunks, characters e preview
+    """
+    stats = {"chunks": 0, "characters": 0, "preview": ""}
+    has_content = False
+
+    def counted(segments: Iterable[str]) -> Iterator[str]:
+        nonlocal has_content
+        for segment in segments:
+            stats["characters"] += len(segment)
+            has_content = has_content or bool(segment.strip())
+            if len(stats["preview"]) <= preview_length:
+                stats["preview"] += segment[: preview_length + 1]
+            yield segment
+
+    try:
+        segments = counted(iter_text_from_file(path, file_format))
+        with open(out_path, "w", encoding="utf-8") as out:
+            for chunk, start in iter_chunks(segments, chunk_size, chunk_overlap):
+                out.write(json.dumps({"text": chunk, "start": start}) + "\n")
+                stats["chunks"] += 1
+    except Exception as e:
+        raise Exception(f"Erro ao processar arquivo {filename}: {str(e)}")
+
+    if not has_content:
+        raise Exception("Não foi possível extrair conteúdo legível do arquivo")
+
+    preview = stats["preview"].strip()
+    stats["preview"] = (
+        preview[:preview_length] + "..." if len(preview) > preview_length else preview
+    )
+    return stats
+
+
+def iter_spooled_chunks(path: str, window: int) -> Iterator[List[Dict[str, object]]]:
+    """Lê o arquivo gerado por spool_chunks em janelas de `window` chunks."""
+    batch: List[Dict[str, object]] = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            batch.append(json.loads(line))
+            if len(batch) >= window:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,200 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+
+from src.config import settings
+
+
+class LocalEmbeddings(Embeddings):
+    """
+    Embeddings calculados localmente com sentence-transformers.
+
+    O modelo é carregado na primeira chamada (ou em warmup) e roda em uma
+    única thread dedicada, com o número de threads do torch limitado a
+    `threads`. Chamadas assíncronas simultâneas são agrupadas: a primeira
+    espera até `max_wait` segundos por outras e todas seguem no mesmo lote
+    de até `batch_size` textos. Com `dimensions`, os vetores são truncados
+    para essa dimensão antes da normalização.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        device: str = "cpu",
+        threads: int = 4,
+        batch_size: int = 32,
+        max_wait: float = 0.005,
+        dimensions: Optional[int] = None,
+    ):
+        self.model_name = model_name
+        self.dimensions = dimensions
+        self.device = device
+        self.threads = max(1, threads)
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait
+        self.batches = 0
+        self.requests = 0
+        self.texts = 0
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._encode_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="local-embeddings"
+        )
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def _load(self):
+        with self._load_lock:
+            if self._model is None:
+                import torch
+                from sentence_transformers import SentenceTransformer
+
+                torch.set_num_threads(self.threads)
+                self._model = SentenceTransformer(
+                    self.model_name, device=self.device, truncate_dim=self.dimensions
+                )
+        return self._model
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        model = self._load()
+        with self._encode_lock:
+            vectors = model.encode(
+                texts,
+                batch_size=self.batch_size,
+                normalize_embeddings=True,
+                convert_to_numpy=True,
+                show_progress_bar=False,
+            )
+            self.batches += 1
+            self.texts += len(texts)
+        return vectors.tolist()
+
+    def warmup(self) -> int:
+        """Carrega o modelo e executa um lote; retorna a dimensão dos vetores."""
+        return len(self._encode(["aquecimento do modelo de embeddings"])[0])
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        self.requests += 1
+        return self._encode(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._drain())
+        future = loop.create_future()
+        self.requests += 1
+        await self._queue.put((texts, future))
+        return await future
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+    async def _next_batch(self) -> List[Tuple[List[str], asyncio.Future]]:
+        pending = [await self._queue.get()]
+        size = len(pending[0][0])
+        deadline = self._loop.time() + self.max_wait
+        while size < self.batch_size:
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            pending.append(item)
+            size += len(item[0])
+        return pending
+
+    async def _drain(self):
+        while True:
+            pending = await self._next_batch()
+            texts = [text for item_texts, _ in pending for text in item_texts]
+            try:
+                vectors = await self._loop.run_in_executor(
+                    self._executor, self._encode, texts
+                )
+            except Exception as e:
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            offset = 0
+            for item_texts, future in pending:
+                if not future.done():
+                    future.set_result(vectors[offset : offset + len(item_texts)])
+                offset += len(item_texts)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "model": self.model_name,
+            "loaded": self._model is not None,
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch_size": self.texts / self.batches if self.batches else 0.0,
+        }
+
+
+_local_embeddings: Optional[LocalEmbeddings] = None
+
+
+def get_local_embeddings() -> LocalEmbeddings:
+    """Modelo local compartilhado pelo processo da API."""
+    global _local_embeddings
+    if _local_embeddings is None:
+        _local_embeddings = LocalEmbeddings(
+            settings.local_embedding_model,
+            device=settings.local_embedding_device,
+            threads=settings.local_embedding_threads,
+            batch_size=settings.local_embedding_batch_size,
+            max_wait=settings.local_embedding_max_wait,
+            dimensions=settings.embedding_dimensions,
+        )
+    return _local_embeddings
+
+
+def embedding_model_name() -> str:
+    """
+    Nome do modelo de embeddings do backend configurado, com o sufixo
+    `@<dimensões>` quando settings.embedding_dimensions reduz os vetores
+    (vetores de dimensões diferentes não podem dividir cache nem índice).
+    """
+    if settings.embedding_backend == "local":
+        model = settings.local_embedding_model
+    else:
+        model = settings.embedding_model
+    if settings.embedding_dimensions:
+        return f"{model}@{settings.embedding_dimensions}"
+    return model
+
+
+def build_embedding_provider() -> Embeddings:
+    """Provedor de embeddings do backend configurado em Settings."""
+    if settings.embedding_backend == "local":
+        return get_local_embeddings()
+    return OpenAIEmbeddings(
+        model=settings.embedding_model,
+        dimensions=settings.embedding_dimensions,
+        api_key=settings.openai_api_key,
+    )
+
+
+async def warmup_embeddings():
+    """Carrega o modelo local antes da primeira requisição (no-op para openai)."""
+    if settings.embedding_backend == "local":
+        await asyncio.to_thread(get_local_embeddings().warmup)
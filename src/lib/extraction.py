@@ -0,0 +1,57 @@
+from typing import Tuple
+
+import trafilatura
+from lxml.html import HtmlElement
+
+
+def _meta_content(tree: HtmlElement, xpath: str) -> str:
+    for value in tree.xpath(xpath):
+        if str(value).strip():
+            return str(value).strip()
+    return ""
+
+
+def extract_title(tree: HtmlElement) -> str:
+    title = _meta_content(tree, "//meta[@property='og:title']/@content")
+    if title:
+        return title
+    title = _meta_content(tree, "//meta[@name='title']/@content")
+    if title:
+        return title
+    head_title = tree.find(".//title")
+    if head_title is not None and head_title.text and head_title.text.strip():
+        return head_title.text.strip()
+    h1 = tree.find(".//h1")
+    return h1.text_content().strip() if h1 is not None else ""
+
+
+def extract_article(html: str) -> Tuple[str, str]:
+    """
+    Extrai título e texto principal de uma página HTML com um único parse.
+
+    A árvore lxml é construída uma vez e reaproveitada tanto para o título
+    (og:title, meta title, <title> ou <h1>) quanto para o trafilatura.
+    Roda em processos do pool de workers, então não deve depender de estado
+    da aplicação.
+
+    Args:
+        html: Conteúdo HTML bruto
+
+    Returns:
+        Tupla com (titulo, texto), strings vazias quando não encontrados
+    """
+    if not html:
+        return "", ""
+    try:
+        tree = trafilatura.load_html(html)
+    except Exception:
+        return "", ""
+    if tree is None:
+        return "", ""
+
+    title = extract_title(tree)
+    try:
+        text = trafilatura.extract(tree, include_comments=False, include_tables=False)
+    except Exception:
+        text = ""
+    return title, str(text or "").strip()
@@ -1,24 +1,164 @@
+import asyncio
+import time
 from base64 import b64decode, b64encode
+from typing import Dict, List, Optional
 
 import ffmpeg
 
+from src.config import settings
+from src.lib.metrics import LatencyRecorder
+
+
+def _speed_and_compress(speed=1.25, codec="libopus", bitrate="64k", fmt="opus"):
+    return ffmpeg.input("pipe:0").output(
+        "pipe:1",
+        **{"filter:a": f"atempo={speed}"},
+        acodec=codec,
+        **({"b:a": bitrate} if codec != "libmp3lame" else {"q:a": 4}),
+        f=fmt,
+        vn=None,
+    )
+
 
 def speed_and_compress_b64(
     b64_in: str, speed=1.25, codec="libopus", bitrate="64k", fmt="opus"
 ) -> str:
     audio = b64decode(b64_in)
 
-    proc = (
-        ffmpeg.input("pipe:0")
-        .output(
-            "pipe:1",
-            **{"filter:a": f"atempo={speed}"},
-            acodec=codec,
-            **({"b:a": bitrate} if codec != "libmp3lame" else {"q:a": 4}),
-            f=fmt,
-            vn=None,
-        )
-        .run(capture_stdout=True, capture_stderr=True, input=audio)
+    proc = _speed_and_compress(speed, codec, bitrate, fmt).run(
+        capture_stdout=True, capture_stderr=True, input=audio
     )
     out_bytes, _ = proc
     return b64encode(out_bytes).decode()
+
+
+def audio_options() -> Dict[str, object]:
+    """Parâmetros de saída configurados em Settings (audio_*)."""
+    return {
+        "speed": settings.audio_speed,
+        "codec": settings.audio_codec,
+        "bitrate": settings.audio_bitrate,
+        "fmt": settings.audio_format,
+    }
+
+
+class TranscodeError(Exception):
+    pass
+
+
+class Transcoder:
+    """
+    Transcodificação com ffmpeg em subprocessos assíncronos.
+
+    No máximo `concurrency` processos rodam ao mesmo tempo; os demais
+    pedidos esperam na fila sem bloquear o event loop. Cada processo tem
+    `timeout` segundos para terminar, senão é encerrado. Os parâmetros de
+    áudio são os mesmos de speed_and_compress_b64.
+    """
+
+    def __init__(self, concurrency: int = 2, timeout: float = 30.0):
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.latencies = LatencyRecorder()
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def transcode(
+        self,
+        audio: bytes,
+        speed=1.25,
+        codec="libopus",
+        bitrate="64k",
+        fmt="opus",
+    ) -> bytes:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.concurrency)
+
+        queued = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+
+        started = time.perf_counter()
+        self.latencies.record("queue_wait", (started - queued) * 1000)
+        self.running += 1
+        try:
+            output = await self._run(
+                _speed_and_compress(speed, codec, bitrate, fmt).compile(), audio
+            )
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.running -= 1
+            self._slots.release()
+
+        self.completed += 1
+        self.latencies.record("transcode", (time.perf_counter() - started) * 1000)
+        return output
+
+    async def _run(self, args: List[str], audio: bytes) -> bytes:
+        proc = await asyncio.create_subprocess_exec(
+            *args,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            out, err = await asyncio.wait_for(
+                proc.communicate(input=audio), timeout=self.timeout
+            )
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            proc.kill()
+            await proc.wait()
+            raise TranscodeError(
+                f"Tempo limite de {self.timeout:g}s excedido na transcodificação"
+            )
+        except asyncio.CancelledError:
+            proc.kill()
+            await proc.wait()
+            raise
+
+        if proc.returncode != 0:
+            detail = err.decode(errors="ignore").strip().splitlines()[-1:] or [""]
+            raise TranscodeError(
+                f"ffmpeg terminou com código {proc.returncode}: {detail[0]}"
+            )
+        return out
+
+    async def speed_and_compress_b64(self, b64_in: str, **kwargs) -> str:
+        """Versão assíncrona de speed_and_compress_b64."""
+        out = await self.transcode(b64decode(b64_in), **kwargs)
+        return b64encode(out).decode()
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "concurrency": self.concurrency,
+            "queue_depth": self.waiting,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "latencies": self.latencies.summary(),
+        }
+
+
+_transcoder: Optional[Transcoder] = None
+
+
+def get_transcoder() -> Transcoder:
+    """Transcoder compartilhado pelo processo da API."""
+    global _transcoder
+    if _transcoder is None:
+        _transcoder = Transcoder(
+            concurrency=settings.transcode_concurrency,
+            timeout=settings.transcode_timeout,
+        )
+    return _transcoder
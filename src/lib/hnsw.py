@@ -0,0 +1,389 @@
+import heapq
+import json
+import math
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import hnswlib
+except ImportError:  # sem o índice compilado: só o grafo em Python puro
+    hnswlib = None
+
+_EMPTY = np.zeros(0, dtype=np.int32)
+
+
+class HNSWGraph:
+    """
+    Grafo HNSW (Hierarchical Navigable Small World) para busca aproximada
+    por distância L2, em Python puro.
+
+    Os vetores não ficam no grafo: cada nó é a posição de uma linha da
+    matriz passada a add/search, e os nós são inseridos na ordem das
+    posições. A camada 0 guarda até 2 * m vizinhos por nó; as camadas
+    superiores, até m.
+
+    Uma thread pode inserir enquanto outras buscam: as buscas só enxergam
+    as primeiras `count` linhas, fixadas por publish, e ignoram ligações
+    para nós inseridos depois. Cada lista de vizinhos é trocada inteira,
+    então uma busca nunca lê uma lista pela metade.
+    """
+
+    FILE = "hnsw.npz"
+    backend = "python"
+    # Inserções podem rodar junto com buscas (ver docstring)
+    concurrent_insert = True
+
+    def __init__(self, m: int = 16, ef_construction: int = 100, seed: int = 0):
+        self.m = m
+        self.m0 = 2 * m
+        self.ef_construction = ef_construction
+        self.ml = 1 / math.log(m)
+        self.size = 0
+        self.count = 0
+        self.entry = -1
+        self.max_level = -1
+        self.levels = np.zeros(0, dtype=np.int8)
+        self.links0 = np.full((0, self.m0), -1, dtype=np.int32)
+        self.upper: Dict[int, Dict[int, np.ndarray]] = {}
+        # (count, entry, max_level) vistos pelas buscas
+        self._published: Tuple[int, int, int] = (0, -1, -1)
+        self._rng = np.random.default_rng(seed)
+
+    def reserve(self, size: int):
+        """Garante espaço para `size` nós (a capacidade dobra)."""
+        if size <= len(self.levels):
+            return
+        capacity = max(size, 2 * len(self.levels), 1024)
+        levels = np.zeros(capacity, dtype=np.int8)
+        levels[: self.size] = self.levels[: self.size]
+        links = np.full((capacity, self.m0), -1, dtype=np.int32)
+        links[: self.size] = self.links0[: self.size]
+        self.levels, self.links0 = levels, links
+
+    def _neighbors(self, node: int, level: int) -> List[int]:
+        # tolist copia a linha de uma vez, sem ver uma escrita pela metade
+        if level == 0:
+            return [n for n in self.links0[node].tolist() if n >= 0]
+        return self.upper[level].get(node, _EMPTY).tolist()
+
+    def _set_neighbors(self, node: int, level: int, neighbors: np.ndarray):
+        if level == 0:
+            row = np.full(self.m0, -1, dtype=np.int32)
+            row[: len(neighbors)] = neighbors
+            self.links0[node] = row
+        else:
+            self.upper.setdefault(level, {})[node] = neighbors.astype(np.int32)
+
+    @staticmethod
+    def _distances(vectors: np.ndarray, query: np.ndarray, ids) -> np.ndarray:
+        diff = vectors[ids] - query
+        return np.einsum("ij,ij->i", diff, diff)
+
+    def _search_layer(
+        self,
+        vectors: np.ndarray,
+        query: np.ndarray,
+        entry_points: List[Tuple[float, int]],
+        ef: int,
+        level: int,
+        limit: int,
+    ) -> List[Tuple[float, int]]:
+        visited = {node for _, node in entry_points}
+        candidates = list(entry_points)
+        heapq.heapify(candidates)
+        results = [(-distance, node) for distance, node in entry_points]
+        heapq.heapify(results)
+
+        while candidates:
+            distance, node = heapq.heappop(candidates)
+            if len(results) >= ef and distance > -results[0][0]:
+                break
+            neighbors = [
+                n
+                for n in self._neighbors(node, level)
+                if n < limit and n not in visited
+            ]
+            if not neighbors:
+                continue
+            visited.update(neighbors)
+            distances = self._distances(vectors, query, neighbors).tolist()
+            for neighbor, neighbor_distance in zip(neighbors, distances):
+                if len(results) < ef or neighbor_distance < -results[0][0]:
+                    heapq.heappush(candidates, (neighbor_distance, neighbor))
+                    heapq.heappush(results, (-neighbor_distance, neighbor))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+        return sorted((-distance, node) for distance, node in results)
+
+    def _select(
+        self, vectors: np.ndarray, candidates: List[Tuple[float, int]], m: int
+    ) -> np.ndarray:
+        """
+        Heurística de seleção de vizinhos do HNSW: um candidato é descartado
+        se estiver mais perto de um vizinho já escolhido do que do nó, o que
+        mantém ligações em direções diferentes. As vagas que sobrarem são
+        preenchidas com os descartados mais próximos.
+        """
+        if len(candidates) <= m:
+            return np.array([node for _, node in candidates], dtype=np.int32)
+        nodes = [node for _, node in candidates]
+        block = vectors[nodes]
+        norms = np.einsum("ij,ij->i", block, block)
+        pairwise = (norms[:, None] + norms[None, :] - 2 * block @ block.T).tolist()
+
+        selected: List[int] = []
+        pruned: List[int] = []
+        for i, (distance, _) in enumerate(candidates):
+            row = pairwise[i]
+            if any(row[j] < distance for j in selected):
+                pruned.append(i)
+                continue
+            selected.append(i)
+            if len(selected) == m:
+                break
+        selected.extend(pruned[: m - len(selected)])
+        return np.array([nodes[i] for i in selected], dtype=np.int32)
+
+    def add(self, vectors: np.ndarray, position: int):
+        """
+        Insere a linha `position` (sempre a próxima, igual a size); ela só
+        aparece nas buscas depois de publish.
+        """
+        if position != self.size:
+            raise Exception(
+                f"Posição {position} fora de ordem; o grafo espera {self.size}"
+            )
+        self.reserve(position + 1)
+        query = np.asarray(vectors[position], dtype=np.float32)
+        level = int(-math.log(1.0 - self._rng.random()) * self.ml)
+        self.levels[position] = level
+        self.size += 1
+        limit = self.size
+
+        if self.entry < 0:
+            for layer in range(1, level + 1):
+                self._set_neighbors(position, layer, _EMPTY)
+            self.entry, self.max_level = position, level
+            return
+
+        entry = [(float(self._distances(vectors, query, [self.entry])[0]), self.entry)]
+        for layer in range(self.max_level, level, -1):
+            entry = self._search_layer(vectors, query, entry, 1, layer, limit)[:1]
+
+        for layer in range(min(level, self.max_level), -1, -1):
+            found = self._search_layer(
+                vectors, query, entry, self.ef_construction, layer, limit
+            )
+            limit_links = self.m0 if layer == 0 else self.m
+            neighbors = self._select(vectors, found, self.m)
+            self._set_neighbors(position, layer, neighbors)
+            for neighbor in neighbors.tolist():
+                links = np.array(
+                    self._neighbors(neighbor, layer) + [position], dtype=np.int32
+                )
+                if len(links) > limit_links:
+                    distances = self._distances(vectors, vectors[neighbor], links)
+                    order = np.argsort(distances)
+                    links = self._select(
+                        vectors,
+                        list(zip(distances[order].tolist(), links[order].tolist())),
+                        limit_links,
+                    )
+                self._set_neighbors(neighbor, layer, links)
+            entry = found
+
+        for layer in range(self.max_level + 1, level + 1):
+            self._set_neighbors(position, layer, _EMPTY)
+        if level > self.max_level:
+            self.entry, self.max_level = position, level
+
+    def extend(self, vectors: np.ndarray, end: int):
+        """Insere as linhas de size até `end` e as publica."""
+        for position in range(self.size, end):
+            self.add(vectors, position)
+        self.publish()
+
+    def publish(self):
+        """Torna visíveis às buscas os nós inseridos até aqui."""
+        self._published = (self.size, self.entry, self.max_level)
+        self.count = self.size
+
+    def search(
+        self, vectors: np.ndarray, query: np.ndarray, k: int, ef: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Busca os vizinhos aproximados de `query` entre os nós publicados.
+
+        Returns:
+            Posições e distâncias L2 ao quadrado dos até max(ef, k) nós
+            encontrados, em ordem crescente de distância
+        """
+        count, entry_point, max_level = self._published
+        if entry_point < 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        entry = [
+            (float(self._distances(vectors, query, [entry_point])[0]), entry_point)
+        ]
+        for layer in range(max_level, 0, -1):
+            entry = self._search_layer(vectors, query, entry, 1, layer, count)[:1]
+        found = self._search_layer(vectors, query, entry, max(ef, k), 0, count)
+        return (
+            np.array([node for _, node in found], dtype=np.int64),
+            np.array([distance for distance, _ in found], dtype=np.float32),
+        )
+
+    def save(self, path: str, epoch: int):
+        """
+        Grava os nós publicados; ligações para nós ainda não publicados são
+        descartadas.
+        """
+        count, entry, max_level = self._published
+        links0 = self.links0[:count].copy()
+        links0[links0 >= count] = -1
+        arrays = {
+            "params": np.array(
+                [self.m, self.ef_construction, count, entry, max_level, epoch],
+                dtype=np.int64,
+            ),
+            "levels": self.levels[:count],
+            "links0": links0,
+        }
+        for level in range(1, max_level + 1):
+            nodes = self.upper.get(level, {})
+            ids = np.array(sorted(n for n in list(nodes) if n < count), dtype=np.int32)
+            links = np.full((len(ids), self.m), -1, dtype=np.int32)
+            for i, node in enumerate(ids.tolist()):
+                row = nodes[node][nodes[node] < count]
+                links[i, : len(row)] = row
+            arrays[f"nodes_{level}"] = ids
+            arrays[f"links_{level}"] = links
+
+        temporary = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(temporary, **arrays)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: str, dimension: int) -> Tuple["HNSWGraph", int]:
+        """Lê um grafo salvo por save; retorna o grafo e a época gravada."""
+        with np.load(path) as data:
+            m, ef_construction, count, entry, max_level, epoch = data["params"].tolist()
+            graph = cls(m=m, ef_construction=ef_construction)
+            graph.reserve(count)
+            graph.size, graph.entry, graph.max_level = count, entry, max_level
+            graph.levels[:count] = data["levels"]
+            graph.links0[:count] = data["links0"]
+            for level in range(1, max_level + 1):
+                nodes: Dict[int, np.ndarray] = {}
+                for node, row in zip(
+                    data[f"nodes_{level}"].tolist(), data[f"links_{level}"]
+                ):
+                    nodes[node] = row[row >= 0]
+                graph.upper[level] = nodes
+        graph.publish()
+        return graph, epoch
+
+
+class CompiledHNSWGraph:
+    """
+    Mesma interface do HNSWGraph sobre o índice compilado do hnswlib, que
+    guarda uma cópia dos vetores e insere na ordem de milhares de linhas
+    por segundo.
+
+    O hnswlib não permite inserir durante uma busca: extend e reserve devem
+    rodar com o mesmo lock das buscas.
+    """
+
+    FILE = "hnswlib.bin"
+    backend = "hnswlib"
+    concurrent_insert = False
+
+    def __init__(
+        self, dimension: int, m: int = 16, ef_construction: int = 100, seed: int = 0
+    ):
+        self.m = m
+        self.ef_construction = ef_construction
+        self.dimension = dimension
+        self.count = 0
+        self.index = hnswlib.Index(space="l2", dim=dimension)
+        self.index.init_index(
+            max_elements=1024, M=m, ef_construction=ef_construction, random_seed=seed
+        )
+
+    @property
+    def size(self) -> int:
+        return self.count
+
+    def reserve(self, size: int):
+        capacity = self.index.get_max_elements()
+        if size > capacity:
+            self.index.resize_index(max(size, 2 * capacity))
+
+    def extend(self, vectors: np.ndarray, end: int):
+        start = self.count
+        if end <= start:
+            return
+        self.reserve(end)
+        self.index.add_items(
+            np.ascontiguousarray(vectors[start:end]), np.arange(start, end)
+        )
+        self.count = end
+
+    def search(
+        self, vectors: np.ndarray, query: np.ndarray, k: int, ef: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        if self.count == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        k = min(max(ef, k), self.count)
+        self.index.set_ef(max(ef, k))
+        labels, distances = self.index.knn_query(query, k=k)
+        return labels[0].astype(np.int64), distances[0].astype(np.float32)
+
+    def save(self, path: str, epoch: int):
+        temporary = f"{path}.{os.getpid()}.tmp"
+        self.index.save_index(temporary)
+        os.replace(temporary, path)
+        meta = {
+            "m": self.m,
+            "ef_construction": self.ef_construction,
+            "dimension": self.dimension,
+            "count": self.count,
+            "epoch": epoch,
+        }
+        with open(f"{temporary}.json", "w") as file:
+            json.dump(meta, file)
+        os.replace(f"{temporary}.json", f"{path}.json")
+
+    @classmethod
+    def load(cls, path: str, dimension: int) -> Tuple["CompiledHNSWGraph", int]:
+        with open(f"{path}.json") as file:
+            meta = json.load(file)
+        if meta["dimension"] != dimension:
+            raise Exception(f"Índice {path} tem dimensão {meta['dimension']}")
+        graph = cls(dimension, m=meta["m"], ef_construction=meta["ef_construction"])
+        # Índice novo: load_index num índice já iniciado só o descarta
+        graph.index = hnswlib.Index(space="l2", dim=dimension)
+        graph.index.load_index(path, max_elements=max(meta["count"], 1024))
+        if graph.index.get_current_count() != meta["count"]:
+            raise Exception(f"Índice {path} incompleto")
+        graph.count = meta["count"]
+        return graph, meta["epoch"]
+
+
+def new_graph(
+    dimension: int, m: int, ef_construction: int, compiled: Optional[bool] = None
+):
+    """
+    Grafo vazio: o do hnswlib, se instalado (ou se `compiled` pedir), senão
+    o em Python puro.
+    """
+    if compiled is None:
+        compiled = hnswlib is not None
+    if compiled and hnswlib is None:
+        raise Exception(
+            "O backend hnswlib foi pedido, mas o hnswlib não está instalado"
+        )
+    if compiled:
+        return CompiledHNSWGraph(dimension, m=m, ef_construction=ef_construction)
+    return HNSWGraph(m=m, ef_construction=ef_construction)
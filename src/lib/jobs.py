@@ -0,0 +1,240 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+JOB_QUEUED = "queued"
+JOB_PROCESSING = "processing"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+FINISHED_STATUSES = (JOB_COMPLETED, JOB_FAILED)
+
+
+class JobStore:
+    """
+    Fila persistente de jobs de indexação.
+
+    Cada job tem um arquivo por linha em indexing_job_files; os workers
+    reservam arquivos individualmente, de modo que um job grande é
+    processado por vários workers ao mesmo tempo. Arquivos que estavam em
+    processamento quando a API caiu voltam para a fila em requeue_interrupted.
+    """
+
+    def __init__(self, db_file: str):
+        self.db_file = db_file
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(db_file))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS indexing_jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS indexing_job_files (
+                    job_id TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    filename TEXT NOT NULL,
+                    file_type TEXT,
+                    path TEXT,
+                    content_hash TEXT,
+                    size INTEGER NOT NULL DEFAULT 0,
+                    status TEXT NOT NULL,
+                    chunks_total INTEGER NOT NULL DEFAULT 0,
+                    chunks_done INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    result TEXT,
+                    started_at REAL,
+                    finished_at REAL,
+                    PRIMARY KEY (job_id, position)
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS indexing_job_files_status "
+                "ON indexing_job_files(status)"
+            )
+
+    def create_job(self, files: List[Dict[str, Any]]) -> str:
+        """
+        Registra um job com seus arquivos.
+
+        Args:
+            files: Um dicionário por arquivo com filename e, para arquivos
+                aceitos, file_type, path, content_hash e size; arquivos com
+                "error" já entram como falhos
+
+        Returns:
+            Identificador do job
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        rows = [
+            (
+                job_id,
+                position,
+                file["filename"],
+                file.get("file_type"),
+                file.get("path"),
+                file.get("content_hash"),
+                file.get("size", 0),
+                JOB_FAILED if file.get("error") else JOB_QUEUED,
+                json.dumps(file["error"]) if file.get("error") else None,
+                now if file.get("error") else None,
+            )
+            for position, file in enumerate(files)
+        ]
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO indexing_jobs(id, status, created_at) VALUES (?, ?, ?)",
+                (job_id, JOB_QUEUED, now),
+            )
+            self._conn.executemany(
+                """
+                INSERT INTO indexing_job_files(
+                    job_id, position, filename, file_type, path, content_hash,
+                    size, status, error, finished_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                rows,
+            )
+            self._finish_job_if_done(job_id)
+        return job_id
+
+    def claim_next(self) -> Optional[sqlite3.Row]:
+        """Reserva o próximo arquivo da fila, do job mais antigo primeiro."""
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                """
+                SELECT f.* FROM indexing_job_files f
+                JOIN indexing_jobs j ON j.id = f.job_id
+                WHERE f.status = ?
+                ORDER BY j.created_at, f.position
+                LIMIT 1
+                """,
+                (JOB_QUEUED,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE indexing_job_files SET status = ?, started_at = ?, "
+                "chunks_done = 0 WHERE job_id = ? AND position = ?",
+                (JOB_PROCESSING, now, row["job_id"], row["position"]),
+            )
+            self._conn.execute(
+                "UPDATE indexing_jobs SET status = ?, "
+                "started_at = COALESCE(started_at, ?) WHERE id = ?",
+                (JOB_PROCESSING, now, row["job_id"]),
+            )
+        return row
+
+    def update_progress(
+        self,
+        job_id: str,
+        position: int,
+        chunks_done: Optional[int] = None,
+        chunks_total: Optional[int] = None,
+    ):
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                UPDATE indexing_job_files
+                SET chunks_done = COALESCE(?, chunks_done),
+                    chunks_total = COALESCE(?, chunks_total)
+                WHERE job_id = ? AND position = ?
+                """,
+                (chunks_done, chunks_total, job_id, position),
+            )
+
+    def finish_file(
+        self,
+        job_id: str,
+        position: int,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[Dict[str, Any]] = None,
+    ):
+        """Marca o arquivo como concluído ou falho e fecha o job se for o último."""
+        with self._lock, self._conn:
+            if error is None:
+                self._conn.execute(
+                    """
+                    UPDATE indexing_job_files
+                    SET status = ?, result = ?, finished_at = ?,
+                        chunks_total = ?, chunks_done = ?
+                    WHERE job_id = ? AND position = ?
+                    """,
+                    (
+                        JOB_COMPLETED,
+                        json.dumps(result),
+                        time.time(),
+                        result["chunks_created"],
+                        result["chunks_created"],
+                        job_id,
+                        position,
+                    ),
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE indexing_job_files SET status = ?, error = ?, "
+                    "finished_at = ? WHERE job_id = ? AND position = ?",
+                    (JOB_FAILED, json.dumps(error), time.time(), job_id, position),
+                )
+            self._finish_job_if_done(job_id)
+
+    def _finish_job_if_done(self, job_id: str):
+        counts = dict(
+            self._conn.execute(
+                "SELECT status, count(*) FROM indexing_job_files "
+                "WHERE job_id = ? GROUP BY status",
+                (job_id,),
+            ).fetchall()
+        )
+        if counts.get(JOB_QUEUED) or counts.get(JOB_PROCESSING):
+            return
+        status = JOB_COMPLETED if counts.get(JOB_COMPLETED) else JOB_FAILED
+        self._conn.execute(
+            "UPDATE indexing_jobs SET status = ?, finished_at = ? WHERE id = ?",
+            (status, time.time(), job_id),
+        )
+
+    def requeue_interrupted(self) -> int:
+        """Devolve à fila os arquivos que estavam em processamento."""
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "UPDATE indexing_job_files SET status = ?, started_at = NULL, "
+                "chunks_done = 0 WHERE status = ?",
+                (JOB_QUEUED, JOB_PROCESSING),
+            ).rowcount
+
+    def get_job(self, job_id: str) -> Optional[Tuple[sqlite3.Row, List[sqlite3.Row]]]:
+        with self._lock:
+            job = self._conn.execute(
+                "SELECT * FROM indexing_jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if job is None:
+                return None
+            files = self._conn.execute(
+                "SELECT * FROM indexing_job_files WHERE job_id = ? ORDER BY position",
+                (job_id,),
+            ).fetchall()
+        return job, files
+
+
+def default_jobs_path(db_file: str, filename: str = "indexing_jobs.db") -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(db_file)), filename)
@@ -0,0 +1,39 @@
+import threading
+from collections import deque
+from typing import Deque, Dict
+
+import numpy as np
+
+
+class LatencyRecorder:
+    """Guarda as últimas `window` amostras de latência (ms) por nome."""
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, milliseconds: float):
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.window)
+            samples.append(milliseconds)
+            self._counts[name] = self._counts.get(name, 0) + 1
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            snapshot = {name: list(samples) for name, samples in self._samples.items()}
+            counts = dict(self._counts)
+        summary = {}
+        for name, samples in snapshot.items():
+            p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+            summary[name] = {
+                "count": counts[name],
+                "mean_ms": round(float(np.mean(samples)), 2),
+                "p50_ms": round(float(p50), 2),
+                "p95_ms": round(float(p95), 2),
+                "p99_ms": round(float(p99), 2),
+            }
+        return summary
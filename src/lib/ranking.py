@@ -0,0 +1,38 @@
+from typing import Callable, Dict, Hashable, List, Sequence, TypeVar
+
+T = TypeVar("T")
+
+RRF_K = 60
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[T]],
+    key: Callable[[T], Hashable],
+    limit: int,
+    k: int = RRF_K,
+) -> List[T]:
+    """
+    Combina listas ordenadas com Reciprocal Rank Fusion.
+
+    Cada item recebe a soma de 1 / (k + posição) nas listas em que aparece;
+    itens repetidos são identificados por `key` e mantêm a primeira
+    ocorrência.
+
+    Args:
+        rankings: Listas de candidatos, cada uma já ordenada por relevância
+        key: Identidade de um candidato (ex.: rowid do chunk)
+        limit: Quantidade de itens retornados
+        k: Constante de suavização do RRF
+
+    Returns:
+        Os `limit` itens de maior pontuação, em ordem decrescente
+    """
+    scores: Dict[Hashable, float] = {}
+    items: Dict[Hashable, T] = {}
+    for ranking in rankings:
+        for position, item in enumerate(ranking, 1):
+            item_key = key(item)
+            scores[item_key] = scores.get(item_key, 0.0) + 1.0 / (k + position)
+            items.setdefault(item_key, item)
+    ordered = sorted(scores, key=scores.get, reverse=True)
+    return [items[item_key] for item_key in ordered[:limit]]
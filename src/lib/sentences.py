@@ -0,0 +1,37 @@
+import re
+from typing import List
+
+# Fim de frase: pontuação final seguida de espaço, ou quebra de linha
+_BOUNDARY = re.compile(r"(?<=[.!?…])\s+|\n+")
+
+
+class SentenceSplitter:
+    """
+    Divide em frases um texto que chega aos poucos (streaming).
+
+    Frases com menos de `min_length` caracteres são juntadas à seguinte,
+    para não gerar chamadas de TTS para trechos como "Sim." ou "1.".
+    """
+
+    def __init__(self, min_length: int = 40):
+        self.min_length = min_length
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        """Acrescenta texto e retorna as frases que ficaram completas."""
+        self._buffer += text
+        sentences: List[str] = []
+        start = 0
+        for match in _BOUNDARY.finditer(self._buffer):
+            candidate = self._buffer[start : match.start()].strip()
+            if len(candidate) >= self.min_length:
+                sentences.append(candidate)
+                start = match.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self) -> List[str]:
+        """Retorna o que sobrou no buffer ao fim do stream."""
+        remainder = self._buffer.strip()
+        self._buffer = ""
+        return [remainder] if remainder else []
@@ -0,0 +1,267 @@
+import asyncio
+import os
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import sqlite_vec
+
+from src.config import settings
+
+Job = Callable[[sqlite3.Connection], Any]
+
+
+def connect(
+    db_file: str,
+    mmap_size: int = 0,
+    cache_size_kib: int = 2048,
+    busy_timeout: float = 30.0,
+) -> sqlite3.Connection:
+    """
+    Abre uma conexão com o sqlite-vec carregado, em modo WAL e com os
+    pragmas de desempenho.
+
+    Args:
+        db_file: Caminho do banco
+        mmap_size: Bytes do arquivo lidos por mapeamento em memória
+        cache_size_kib: Cache de páginas da conexão, em KiB
+        busy_timeout: Segundos de espera por um lock antes de falhar
+
+    Returns:
+        Conexão utilizável de qualquer thread (uma de cada vez)
+    """
+    conn = sqlite3.connect(db_file, timeout=busy_timeout, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.enable_load_extension(True)
+    sqlite_vec.load(conn)
+    conn.enable_load_extension(False)
+    # WAL: leitores não bloqueiam o escritor nem são bloqueados por ele
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA mmap_size={int(mmap_size)}")
+    conn.execute(f"PRAGMA cache_size={-int(cache_size_kib)}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+
+class StoreManager:
+    """
+    Acesso compartilhado ao banco do vector store dentro de um processo.
+
+    As buscas usam um pool de até `readers` conexões de leitura (e um
+    executor com o mesmo número de threads); todas as gravações passam por
+    uma única thread escritora. Ela junta as gravações que chegam enquanto
+    a anterior é confirmada e as grava em uma só transação (group commit),
+    cada uma dentro de um savepoint: a falha de uma não desfaz as outras.
+    """
+
+    def __init__(
+        self,
+        db_file: str,
+        readers: int = 4,
+        mmap_size: int = 0,
+        cache_size_kib: int = 2048,
+        busy_timeout: float = 30.0,
+        max_group: int = 64,
+    ):
+        self.db_file = db_file
+        self.readers = max(1, readers)
+        self.mmap_size = mmap_size
+        self.cache_size_kib = cache_size_kib
+        self.busy_timeout = busy_timeout
+        self.max_group = max(1, max_group)
+        self.read_executor = ThreadPoolExecutor(
+            max_workers=self.readers, thread_name_prefix="store-read"
+        )
+        self.reads = 0
+        self.writes = 0
+        self.commits = 0
+        self.failed_writes = 0
+        self.largest_group = 0
+
+        self._pool: queue.Queue = queue.Queue()
+        self._opened = 0
+        self._pool_lock = threading.Lock()
+        self._writes: queue.Queue = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+
+    def connect(self) -> sqlite3.Connection:
+        """Conexão nova, fora do pool, com as mesmas configurações."""
+        return connect(
+            self.db_file,
+            mmap_size=self.mmap_size,
+            cache_size_kib=self.cache_size_kib,
+            busy_timeout=self.busy_timeout,
+        )
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """Empresta uma conexão de leitura; espera se todas estiverem em uso."""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            with self._pool_lock:
+                create = self._opened < self.readers
+                if create:
+                    self._opened += 1
+            conn = self.connect() if create else self._pool.get()
+        try:
+            self.reads += 1
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._pool.put(conn)
+
+    def read(self, job: Job) -> Any:
+        with self.reader() as conn:
+            return job(conn)
+
+    async def run_read(self, function: Callable[..., Any], *args) -> Any:
+        """Executa `function` no executor de leitura, fora do event loop."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.read_executor, function, *args)
+
+    def submit(self, job: Job) -> Future:
+        """
+        Enfileira uma gravação; `job` recebe a conexão do escritor.
+
+        O retorno de `job` é entregue a outra thread: não devolva cursores
+        nem outros objetos presos à conexão, que continua em uso pelo escritor.
+        """
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(
+                    target=self._write_loop, name="store-writer", daemon=True
+                )
+                self._writer.start()
+        future: Future = Future()
+        self._writes.put((job, future))
+        return future
+
+    def write(self, job: Job) -> Any:
+        return self.submit(job).result()
+
+    async def awrite(self, job: Job) -> Any:
+        return await asyncio.wrap_future(self.submit(job))
+
+    def _write_loop(self):
+        conn = self.connect()
+        # Transações explícitas: o escritor controla BEGIN e COMMIT
+        conn.isolation_level = None
+        try:
+            while True:
+                item = self._writes.get()
+                if item is None:
+                    break
+                group = [item]
+                while len(group) < self.max_group:
+                    try:
+                        item = self._writes.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        self._writes.put(None)
+                        break
+                    group.append(item)
+                self._commit_group(conn, group)
+        finally:
+            conn.close()
+
+    def _commit_group(self, conn: sqlite3.Connection, group: List[Tuple]):
+        outcomes: List[Tuple[Future, bool, Any]] = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for job, future in group:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                conn.execute("SAVEPOINT store_write")
+                try:
+                    result = job(conn)
+                except Exception as e:
+                    conn.execute("ROLLBACK TO store_write")
+                    conn.execute("RELEASE store_write")
+                    outcomes.append((future, False, e))
+                else:
+                    conn.execute("RELEASE store_write")
+                    outcomes.append((future, True, result))
+            conn.execute("COMMIT")
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            self.failed_writes += len(group)
+            for _, future in group:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.commits += 1
+        self.writes += len(outcomes)
+        self.largest_group = max(self.largest_group, len(outcomes))
+        for future, ok, value in outcomes:
+            if ok:
+                future.set_result(value)
+            else:
+                self.failed_writes += 1
+                future.set_exception(value)
+
+    def close(self):
+        with self._writer_lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._writes.put(None)
+            writer.join()
+        self.read_executor.shutdown(wait=True)
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "readers": self.readers,
+            "open_readers": self._opened,
+            "reads": self.reads,
+            "writes": self.writes,
+            "commits": self.commits,
+            "mean_group_size": self.writes / self.commits if self.commits else 0.0,
+            "largest_group": self.largest_group,
+            "failed_writes": self.failed_writes,
+            "pending_writes": self._writes.qsize(),
+        }
+
+
+_managers: Dict[str, StoreManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_store_manager(db_file: str = settings.path_db_file) -> StoreManager:
+    """Gerenciador compartilhado pelo processo para o banco informado."""
+    key = os.path.abspath(db_file)
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = StoreManager(
+                db_file,
+                readers=settings.store_read_connections,
+                mmap_size=settings.sqlite_mmap_size,
+                cache_size_kib=settings.sqlite_cache_size_kib,
+                busy_timeout=settings.sqlite_busy_timeout,
+                max_group=settings.store_write_group_max,
+            )
+            _managers[key] = manager
+    return manager
+
+
+def close_store_managers():
+    """Fecha as conexões e a thread escritora (shutdown da aplicação)."""
+    with _managers_lock:
+        managers = list(_managers.values())
+        _managers.clear()
+    for manager in managers:
+        manager.close()
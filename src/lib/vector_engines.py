@@ -0,0 +1,579 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.lib.hnsw import new_graph
+from src.lib.metrics import LatencyRecorder
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava entre processos
+    fcntl = None
+
+# Fração de linhas removidas a partir da qual a matriz é compactada
+COMPACT_RATIO = 0.2
+
+SYNC_FETCH_ROWS = 4096
+HNSW_PUBLISH_EVERY = 4096
+HNSW_LOCKED_STEP = 32
+HNSW_SAVE_EVERY = 50_000
+
+
+class VectorMatrix:
+    """
+    Cópia dos vetores da tabela de documentos em arquivos float32 mapeados
+    em memória.
+
+    A tabela SQLite continua sendo a fonte da verdade: sync acrescenta as
+    linhas com rowid maior que o último conhecido (rowids não são reusados)
+    e marca como removidas as registradas em `<tabela>_deleted` (seq,
+    doc_rowid) depois da última seq aplicada. Se essa seq não estiver mais
+    no registro, a tabela inteira é comparada com a cópia.
+
+    Os arquivos ficam em `directory` (vectors.f32, rowids.i64, alive.u8 e
+    meta.json) e podem ser compartilhados por vários processos: toda
+    gravação acontece com a trava do arquivo `lock` e relê antes o que os
+    outros processos gravaram. Se o modelo ou a dimensão gravados forem
+    outros, a cópia é refeita do zero. A `epoch` muda sempre que as
+    posições das linhas mudam (reset ou compact).
+    """
+
+    FILES = ("vectors.f32", "rowids.i64", "alive.u8")
+
+    def __init__(self, directory: str, model: str, dimension: int):
+        self.directory = directory
+        self.model = model
+        self.dimension = dimension
+        self.epoch = 0
+        self.deleted_seq: Optional[int] = None
+        self.size = 0
+        os.makedirs(directory, exist_ok=True)
+        with self._locked():
+            self._load()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with open(self._path("lock"), "a") as file:
+            if fcntl is not None:
+                fcntl.flock(file, fcntl.LOCK_EX)
+            yield
+
+    def _read_meta(self) -> Dict[str, Any]:
+        if not os.path.exists(self._path("meta.json")):
+            return {}
+        with open(self._path("meta.json")) as file:
+            return json.load(file)
+
+    def _write_meta(self):
+        temporary = self._path("meta.json.tmp")
+        with open(temporary, "w") as file:
+            json.dump(
+                {
+                    "model": self.model,
+                    "dimension": self.dimension,
+                    "epoch": self.epoch,
+                    "deleted_seq": self.deleted_seq,
+                },
+                file,
+            )
+        os.replace(temporary, self._path("meta.json"))
+
+    def _load(self):
+        meta = self._read_meta()
+        if (
+            meta.get("model") != self.model
+            or meta.get("dimension") != self.dimension
+            or not all(os.path.exists(self._path(name)) for name in self.FILES)
+        ):
+            self._reset(meta.get("epoch", 0) + 1)
+            return
+
+        self.epoch = meta["epoch"]
+        self.deleted_seq = meta.get("deleted_seq")
+        # Uma gravação interrompida pode deixar um arquivo mais longo que os
+        # outros; vale o menor e o excedente é descartado.
+        row_bytes = (4 * self.dimension, 8, 1)
+        size = min(
+            os.path.getsize(self._path(name)) // width
+            for name, width in zip(self.FILES, row_bytes)
+        )
+        for name, width in zip(self.FILES, row_bytes):
+            os.truncate(self._path(name), size * width)
+        self._map(size)
+
+    def _reset(self, epoch: int):
+        for name in self.FILES:
+            open(self._path(name), "wb").close()
+        self.epoch = epoch
+        self.deleted_seq = None
+        self._write_meta()
+        self._map(0)
+
+    def _map(self, size: int):
+        self.size = size
+        if size == 0:
+            self.vectors = np.zeros((0, self.dimension), dtype=np.float32)
+            self.rowids = np.zeros(0, dtype=np.int64)
+            self.alive = np.zeros(0, dtype=bool)
+        else:
+            # ndarray comum sobre o mapeamento: evita o custo da subclasse
+            # memmap a cada indexação
+            self.vectors = np.asarray(
+                np.memmap(
+                    self._path("vectors.f32"),
+                    dtype=np.float32,
+                    mode="r",
+                    shape=(size, self.dimension),
+                )
+            )
+            self.rowids = np.fromfile(self._path("rowids.i64"), np.int64, count=size)
+            self.alive = np.fromfile(self._path("alive.u8"), np.uint8, count=size) > 0
+        self.dead = int(size - self.alive.sum())
+
+    def _reload(self):
+        """Relê os arquivos se outro processo os alterou desde o último mapeamento."""
+        meta = self._read_meta()
+        size = (
+            os.path.getsize(self._path("rowids.i64")) // 8
+            if os.path.exists(self._path("rowids.i64"))
+            else -1
+        )
+        if (meta.get("epoch"), meta.get("deleted_seq"), size) != (
+            self.epoch,
+            self.deleted_seq,
+            self.size,
+        ):
+            self._load()
+
+    def sync(self, conn: sqlite3.Connection, table: str) -> Tuple[int, int]:
+        """
+        Aplica na cópia as inclusões e remoções feitas na tabela e compacta
+        os arquivos quando as linhas removidas passam de COMPACT_RATIO.
+
+        Returns:
+            Quantidade de linhas acrescentadas e removidas
+        """
+        with self._locked():
+            self._reload()
+            removed = self._remove(conn, table)
+            added = self._append(conn, table)
+            if self.dead > COMPACT_RATIO * max(self.size, 1):
+                self._compact()
+            self._write_meta()
+        return added, removed
+
+    def _remove(self, conn: sqlite3.Connection, table: str) -> int:
+        log = f"{table}_deleted"
+        try:
+            first, last = conn.execute(
+                f"SELECT min(seq), max(seq) FROM {log}"
+            ).fetchone()
+            has_log = True
+        except sqlite3.OperationalError:
+            # Tabela sem registro de remoções: só a comparação completa
+            first, last, has_log = None, None, False
+        last = last or 0
+
+        if self.size == 0:
+            gone = np.zeros(0, dtype=np.int64)
+        elif (
+            not has_log
+            or self.deleted_seq is None
+            or last < self.deleted_seq
+            or (first is not None and first > self.deleted_seq + 1)
+        ):
+            gone = self._scan_removed(conn, table)
+        else:
+            rowids = np.fromiter(
+                (
+                    row[0]
+                    for row in conn.execute(
+                        f"SELECT doc_rowid FROM {log} WHERE seq > ?",
+                        (self.deleted_seq,),
+                    )
+                ),
+                dtype=np.int64,
+            )
+            positions = np.searchsorted(self.rowids, rowids)
+            inside = positions < self.size
+            positions, rowids = positions[inside], rowids[inside]
+            gone = positions[self.rowids[positions] == rowids]
+            gone = gone[self.alive[gone]]
+        self.deleted_seq = last if has_log else None
+
+        if gone.size:
+            flags = np.memmap(self._path("alive.u8"), dtype=np.uint8, mode="r+")
+            flags[gone] = 0
+            flags.flush()
+            del flags
+            self.alive[gone] = False
+            self.dead += int(gone.size)
+        return int(gone.size)
+
+    def _scan_removed(self, conn: sqlite3.Connection, table: str) -> np.ndarray:
+        db_rowids = np.fromiter(
+            (row[0] for row in conn.execute(f"SELECT rowid FROM {table}")),
+            dtype=np.int64,
+        )
+        alive_positions = np.flatnonzero(self.alive)
+        return alive_positions[~np.isin(self.rowids[alive_positions], db_rowids)]
+
+    def _append(self, conn: sqlite3.Connection, table: str) -> int:
+        last = int(self.rowids[-1]) if self.size else 0
+        cursor = conn.execute(
+            f"SELECT rowid, text_embedding FROM {table} "
+            "WHERE rowid > ? AND text_embedding IS NOT NULL ORDER BY rowid",
+            (last,),
+        )
+        added = 0
+        row_bytes = 4 * self.dimension
+        with (
+            open(self._path("vectors.f32"), "ab") as vectors,
+            open(self._path("rowids.i64"), "ab") as rowids,
+            open(self._path("alive.u8"), "ab") as alive,
+        ):
+            while True:
+                rows = cursor.fetchmany(SYNC_FETCH_ROWS)
+                if not rows:
+                    break
+                if any(len(row[1]) != row_bytes for row in rows):
+                    raise Exception(
+                        f"Vetor com dimensão diferente de {self.dimension} na "
+                        f"tabela {table}"
+                    )
+                vectors.write(b"".join(row[1] for row in rows))
+                rowids.write(np.array([row[0] for row in rows], np.int64).tobytes())
+                alive.write(b"\x01" * len(rows))
+                added += len(rows)
+        if added:
+            self._map(self.size + added)
+        return added
+
+    def _compact(self):
+        """Reescreve os arquivos só com as linhas vivas (muda a epoch)."""
+        keep = np.flatnonzero(self.alive)
+        with open(self._path("vectors.f32.tmp"), "wb") as file:
+            for start in range(0, len(keep), 65536):
+                file.write(
+                    np.ascontiguousarray(
+                        self.vectors[keep[start : start + 65536]]
+                    ).tobytes()
+                )
+        self.rowids[keep].tofile(self._path("rowids.i64.tmp"))
+        np.ones(len(keep), dtype=np.uint8).tofile(self._path("alive.u8.tmp"))
+        for name in self.FILES:
+            os.replace(self._path(f"{name}.tmp"), self._path(name))
+        self.epoch += 1
+        self._write_meta()
+        self._map(len(keep))
+
+
+def _top_k(
+    positions: np.ndarray, distances: np.ndarray, k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    if len(distances) > k:
+        top = np.argpartition(distances, k - 1)[:k]
+        positions, distances = positions[top], distances[top]
+    order = np.argsort(distances, kind="stable")
+    return positions[order], distances[order]
+
+
+class VectorEngine:
+    """
+    Busca KNN (distância L2, como o sqlite-vec) sobre uma VectorMatrix.
+
+    sync deixa a matriz em dia com a tabela quando a geração do índice
+    muda; as subclasses implementam _search e, se mantêm estruturas
+    auxiliares, _refresh.
+    """
+
+    name = "base"
+
+    def __init__(self, matrix: VectorMatrix):
+        self.matrix = matrix
+        self.generation: Optional[int] = None
+        self.latencies = LatencyRecorder()
+        self._lock = threading.RLock()
+
+    def sync(self, conn: sqlite3.Connection, table: str, generation: int):
+        with self._lock:
+            if generation == self.generation:
+                return
+            epoch = self.matrix.epoch
+            self.matrix.sync(conn, table)
+            self._refresh(rebuilt=self.matrix.epoch != epoch)
+            self.generation = generation
+
+    def _refresh(self, rebuilt: bool):
+        pass
+
+    def _search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        raise NotImplementedError
+
+    def _search_subset(
+        self, query: np.ndarray, rowids: np.ndarray, k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        # Os rowids da matriz são crescentes (acréscimos em ordem de rowid)
+        positions = np.searchsorted(self.matrix.rowids, rowids)
+        inside = positions < self.matrix.size
+        positions, rowids = positions[inside], rowids[inside]
+        positions = positions[self.matrix.rowids[positions] == rowids]
+        positions = positions[self.matrix.alive[positions]]
+        if not len(positions):
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        diff = self.matrix.vectors[positions] - query
+        distances = np.einsum("ij,ij->i", diff, diff)
+        return _top_k(positions, distances, min(k, len(positions)))
+
+    def search(
+        self, query: List[float], k: int, rowids: Optional[Sequence[int]] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Args:
+            query: Vetor da consulta
+            k: Quantidade de resultados
+            rowids: Restringe a busca a essas linhas (busca filtrada); o
+                custo é proporcional à quantidade de linhas, com comparação
+                exata em qualquer engine
+
+        Returns:
+            Lista de (rowid, distância L2), da mais próxima para a mais distante
+        """
+        started = time.perf_counter()
+        vector = np.asarray(query, dtype=np.float32)
+        with self._lock:
+            if self.matrix.size == 0 or k <= 0:
+                return []
+            if rowids is None:
+                positions, distances = self._search(vector, k)
+            else:
+                positions, distances = self._search_subset(
+                    vector, np.asarray(rowids, dtype=np.int64), k
+                )
+            found = self.matrix.rowids[positions]
+        self.latencies.record(
+            "search" if rowids is None else "filtered_search",
+            (time.perf_counter() - started) * 1000,
+        )
+        return list(zip(found.tolist(), np.sqrt(np.maximum(distances, 0)).tolist()))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "engine": self.name,
+            "vectors": self.matrix.size - self.matrix.dead,
+            "deleted": self.matrix.dead,
+            "dimension": self.matrix.dimension,
+            "latencies": self.latencies.summary(),
+        }
+
+
+class ExactEngine(VectorEngine):
+    """
+    Busca exata: uma multiplicação matriz-vetor (BLAS) sobre a matriz
+    mapeada, usando ||x - q||² = ||x||² - 2 x·q + ||q||² com as normas das
+    linhas pré-calculadas.
+    """
+
+    name = "exact"
+
+    def __init__(self, matrix: VectorMatrix):
+        super().__init__(matrix)
+        self._norms = np.zeros(0, dtype=np.float32)
+        self._refresh(rebuilt=True)
+
+    def _refresh(self, rebuilt: bool):
+        start = 0 if rebuilt else len(self._norms)
+        parts = [] if rebuilt else [self._norms]
+        for offset in range(start, self.matrix.size, 65536):
+            block = np.asarray(self.matrix.vectors[offset : offset + 65536])
+            parts.append(np.einsum("ij,ij->i", block, block))
+        self._norms = np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+
+    def _search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        distances = self._norms - 2.0 * (self.matrix.vectors @ query)
+        distances += float(query @ query)
+        distances[~self.matrix.alive] = np.inf
+        k = min(k, self.matrix.size - self.matrix.dead)
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        return _top_k(np.arange(self.matrix.size), distances, k)
+
+
+class HNSWEngine(VectorEngine):
+    """
+    Busca aproximada com um grafo HNSW (src/lib/hnsw.py) persistido ao lado
+    da matriz: o índice compilado do hnswlib, se instalado, ou o grafo em
+    Python puro.
+
+    Linhas novas entram no grafo em uma thread de segundo plano; enquanto
+    isso, as linhas ainda fora do grafo são comparadas de forma exata e
+    combinadas ao resultado. O grafo em Python puro recebe as inserções sem
+    o lock das buscas e as publica a cada HNSW_PUBLISH_EVERY linhas, mas
+    insere só centenas de linhas por segundo. O hnswlib insere milhares,
+    mas não durante uma busca, então insere em passos de HNSW_LOCKED_STEP
+    linhas com o lock. Linhas removidas continuam no grafo (servem de
+    caminho) e são filtradas; quando a matriz é compactada, o grafo é
+    refeito.
+    """
+
+    name = "hnsw"
+
+    def __init__(
+        self,
+        matrix: VectorMatrix,
+        m: int = 16,
+        ef_construction: int = 100,
+        ef_search: int = 64,
+        compiled: Optional[bool] = None,
+    ):
+        super().__init__(matrix)
+        self.ef_search = ef_search
+        self.graph = new_graph(matrix.dimension, m, ef_construction, compiled)
+        self.graph_path = matrix._path(self.graph.FILE)
+        self.graph = self._load_graph(self.graph)
+        self._builder: Optional[threading.Thread] = None
+        # Serializa as inserções do builder e as gravações do grafo
+        self._write_lock = threading.Lock()
+        self._refresh(rebuilt=False)
+
+    def _load_graph(self, empty):
+        if os.path.exists(self.graph_path):
+            try:
+                graph, epoch = type(empty).load(self.graph_path, self.matrix.dimension)
+                if (
+                    epoch == self.matrix.epoch
+                    and graph.count <= self.matrix.size
+                    and (graph.m, graph.ef_construction)
+                    == (empty.m, empty.ef_construction)
+                ):
+                    return graph
+            except Exception:
+                pass
+        return empty
+
+    def _refresh(self, rebuilt: bool):
+        if rebuilt:
+            self.graph = new_graph(
+                self.matrix.dimension,
+                self.graph.m,
+                self.graph.ef_construction,
+                compiled=self.graph.backend == "hnswlib",
+            )
+        if self.graph.count < self.matrix.size and self._builder is None:
+            self._builder = threading.Thread(
+                target=self._build, name="hnsw-builder", daemon=True
+            )
+            self._builder.start()
+
+    def _build(self):
+        inserted = 0
+        try:
+            while True:
+                with self._write_lock:
+                    with self._lock:
+                        # Um grafo trocado (matriz compactada) é retomado aqui
+                        graph = self.graph
+                        vectors, size = self.matrix.vectors, self.matrix.size
+                        start = graph.count
+                        if start >= size:
+                            self._builder = None
+                            break
+                        if not graph.concurrent_insert:
+                            end = min(start + HNSW_LOCKED_STEP, size)
+                            graph.extend(vectors, end)
+                    if graph.concurrent_insert:
+                        end = min(start + HNSW_PUBLISH_EVERY, size)
+                        graph.extend(vectors, end)
+                inserted += end - start
+                # Intervalo proporcional ao grafo: o total gravado durante a
+                # construção fica proporcional ao tamanho final
+                if inserted >= max(HNSW_SAVE_EVERY, graph.count // 2):
+                    self.save()
+                    inserted = 0
+        except Exception:
+            with self._lock:
+                self._builder = None
+            raise
+        self.save()
+
+    def save(self):
+        with self._write_lock:
+            with self._lock:
+                graph, epoch = self.graph, self.matrix.epoch
+            graph.save(self.graph_path, epoch=epoch)
+
+    def _search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        vectors = self.matrix.vectors
+        alive = self.matrix.alive
+        graph = self.graph
+        # Nós publicados depois desta leitura ficam só na parte exata
+        count = graph.count
+        positions, distances = graph.search(vectors, query, k, max(self.ef_search, k))
+        keep = positions < count
+        keep[keep] = alive[positions[keep]]
+        positions, distances = positions[keep], distances[keep]
+
+        if count < self.matrix.size:
+            tail = np.arange(count, self.matrix.size)
+            tail = tail[alive[tail]]
+            diff = vectors[tail] - query
+            positions = np.concatenate([positions, tail])
+            distances = np.concatenate([distances, np.einsum("ij,ij->i", diff, diff)])
+
+        if not len(positions):
+            return positions, distances
+        return _top_k(positions, distances, min(k, len(positions)))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **super().stats(),
+            "indexed": self.graph.count,
+            "backend": self.graph.backend,
+            "building": self._builder is not None,
+            "ef_search": self.ef_search,
+        }
+
+
+_engines: Dict[str, VectorEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_vector_engine(
+    name: str,
+    directory: str,
+    model: str,
+    dimension: int,
+    hnsw_m: int = 16,
+    hnsw_ef_construction: int = 100,
+    hnsw_ef_search: int = 64,
+) -> VectorEngine:
+    """Engine compartilhado pelo processo para o diretório informado."""
+    key = os.path.abspath(directory)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None or engine.name != name:
+            matrix = VectorMatrix(directory, model, dimension)
+            if name == "hnsw":
+                engine = HNSWEngine(
+                    matrix,
+                    m=hnsw_m,
+                    ef_construction=hnsw_ef_construction,
+                    ef_search=hnsw_ef_search,
+                )
+            else:
+                engine = ExactEngine(matrix)
+            _engines[key] = engine
+    return engine
+
+
+def default_vector_dir(db_file: str, table: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(db_file)), f"{table}_vectors")
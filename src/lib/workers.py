@@ -0,0 +1,137 @@
+import asyncio
+import multiprocessing
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+# Folga do lado da API além do prazo aplicado dentro do worker; só é
+# atingida se o worker não atender o alarme (ex.: preso em código C).
+DEADLINE_GRACE_SECONDS = 10.0
+
+_pools: Dict[str, ProcessPoolExecutor] = {}
+_slots: Dict[str, asyncio.Semaphore] = {}
+
+
+def process_pool(name: str, max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """
+    Retorna o pool de processos nomeado, criando-o na primeira chamada.
+
+    Args:
+        name: Identificador do pool (ex.: "scraping")
+        max_workers: Quantidade de processos; padrão é o número de núcleos
+
+    Returns:
+        ProcessPoolExecutor compartilhado pelo processo da API
+    """
+    pool = _pools.get(name)
+    if pool is None:
+        pool = ProcessPoolExecutor(
+            max_workers=max_workers or os.cpu_count() or 1,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        _pools[name] = pool
+    return pool
+
+
+def _call_with_deadline(function: Callable[..., Any], timeout: float, *args) -> Any:
+    """
+    Executa `function` dentro do worker, interrompendo-a com TimeoutError
+    após `timeout` segundos de execução (o tempo na fila não conta).
+    """
+    if not timeout or not hasattr(signal, "setitimer"):
+        return function(*args)
+
+    def expire(signum, frame):
+        raise TimeoutError(f"Tempo limite de {timeout:g}s excedido")
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return function(*args)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+async def run_in_pool(
+    name: str,
+    function: Callable[..., Any],
+    *args,
+    timeout: Optional[float] = None,
+    max_workers: Optional[int] = None,
+) -> Any:
+    """
+    Executa `function` no pool nomeado, com no máximo um job por processo.
+
+    As chamadas excedentes esperam aqui, antes de entrar no pool, então o
+    prazo conta só a execução. Se o worker não encerrar o job até o prazo
+    mais DEADLINE_GRACE_SECONDS, o pool é recriado e seus processos mortos;
+    os outros jobs que rodavam nele são reenviados uma vez ao pool novo.
+
+    Args:
+        name: Identificador do pool
+        function: Função de módulo (precisa ser serializável)
+        timeout: Segundos de execução permitidos ao job; None não limita
+        max_workers: Quantidade de processos, se o pool ainda não existir
+
+    Returns:
+        O retorno de `function`; TimeoutError se o prazo for excedido
+    """
+    pool = process_pool(name, max_workers)
+    slots = _slots.get(name)
+    if slots is None:
+        slots = _slots[name] = asyncio.Semaphore(pool._max_workers)
+    async with slots:
+        for attempt in range(2):
+            try:
+                return await _run(name, pool, function, timeout, args)
+            except BrokenProcessPool:
+                if _pools.get(name) is pool:
+                    # O pool quebrou sozinho (ex.: worker morto pelo sistema):
+                    # descarta para o próximo uso criar outro.
+                    recycle_pool(name)
+                    raise
+                # Outro job reciclou o pool por prazo; este não tem culpa
+                if attempt:
+                    raise
+                pool = process_pool(name, max_workers)
+
+
+async def _run(
+    name: str,
+    pool: ProcessPoolExecutor,
+    function: Callable[..., Any],
+    timeout: Optional[float],
+    args: tuple,
+) -> Any:
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(pool, _call_with_deadline, function, timeout, *args)
+    if not timeout:
+        return await future
+    # asyncio.wait em vez de wait_for: o TimeoutError do próprio job
+    # (alarme no worker) não deve derrubar o pool.
+    done, _ = await asyncio.wait({future}, timeout=timeout + DEADLINE_GRACE_SECONDS)
+    if not done:
+        future.cancel()
+        recycle_pool(name)
+        raise TimeoutError(f"Tempo limite de {timeout:g}s excedido")
+    return future.result()
+
+
+def recycle_pool(name: str):
+    """Descarta o pool nomeado matando seus processos; o próximo uso cria outro."""
+    pool = _pools.pop(name, None)
+    if pool is None:
+        return
+    for process in list((pool._processes or {}).values()):
+        process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_pools():
+    _slots.clear()
+    while _pools:
+        _, pool = _pools.popitem()
+        pool.shutdown(wait=True, cancel_futures=True)
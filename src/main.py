@@ -2,7 +2,11 @@ from fastapi import FastAPI
 from fastapi.responses import RedirectResponse
 
 from src.api import router
-from src.lib.clients.langchain import LangChainClient
+from src.api.http.store import indexing_jobs
+from src.lib.clients.langchain import get_langchain_client
+from src.lib.embedders import warmup_embeddings
+from src.lib.store_manager import close_store_managers
+from src.lib.workers import shutdown_pools
 
 app = FastAPI(title="Veritas", version="0.1.0")
 
@@ -14,7 +18,17 @@ async def root():
 
 @app.on_event("startup")
 async def startup_event():
-    LangChainClient().init_db()
+    await warmup_embeddings()
+    get_langchain_client().init_db()
+    indexing_jobs.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await indexing_jobs.stop()
+    shutdown_pools()
+    get_langchain_client().embedding.cache.flush()
+    close_store_managers()
 
 
 app.include_router(router)
@@ -1,6 +1,47 @@
+from typing import Dict, Literal, Optional
+
 from pydantic import BaseModel
 
 
 class AgentResponse(BaseModel):
     text: str
     audio_base64: str
+
+
+class AgentTextFrame(BaseModel):
+    type: Literal["text"] = "text"
+    index: int
+    text: str
+
+
+class AgentAudioFrame(BaseModel):
+    type: Literal["audio"] = "audio"
+    index: int
+    audio_base64: str
+
+
+class AgentAudioHeader(BaseModel):
+    """Precede um frame binário com `size` bytes de áudio no modo binário."""
+
+    type: Literal["audio"] = "audio"
+    index: int
+    format: str
+    size: int
+
+
+class AudioCacheStats(BaseModel):
+    enabled: bool
+    stats: Dict[str, float]
+
+
+class AgentErrorFrame(BaseModel):
+    type: Literal["error"] = "error"
+    index: Optional[int] = None
+    detail: str
+
+
+class AgentDoneFrame(BaseModel):
+    type: Literal["done"] = "done"
+    text: str
+    sentences: int
+    timings: Dict[str, float]
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -27,6 +27,26 @@ class ChatResponse(BaseModel):
     total_tokens_estimated: Optional[int] = Field(
         None, description="Estimativa de tokens utilizados"
     )
+    token_usage: Optional[Dict[str, int]] = Field(
+        None, description="Uso real de tokens informado pelo modelo na resposta"
+    )
     expanded_query: Optional[str] = Field(
         None, description="Query expandida usada na busca vetorial"
     )
+    cached: bool = Field(False, description="Resposta reaproveitada do cache semântico")
+    expansion_strategy: Optional[str] = Field(
+        None, description="Estratégia de expansão de query usada na busca"
+    )
+    timings: Optional[Dict[str, float]] = Field(
+        None, description="Latência das etapas da requisição, em ms"
+    )
+
+
+class AnswerCacheStats(BaseModel):
+    enabled: bool
+    stats: Dict[str, float]
+
+
+class ChatMetrics(BaseModel):
+    expansion_strategy: str
+    latencies: Dict[str, Dict[str, float]]
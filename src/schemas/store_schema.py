@@ -1,5 +1,6 @@
+from datetime import datetime
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Union
 
 from pydantic import BaseModel
 
@@ -12,8 +13,22 @@ class DocsType(str, Enum):
     MD = "md"
 
 
+class SearchMode(str, Enum):
+    VECTOR = "vector"
+    LEXICAL = "lexical"
+    HYBRID = "hybrid"
+
+
+class SearchFilters(BaseModel):
+    filename: Optional[str] = None
+    file_type: Optional[DocsType] = None
+    indexed_after: Optional[datetime] = None
+    indexed_before: Optional[datetime] = None
+
+
 class DocumentIndexResult(BaseModel):
     message: str
+    status: str = "indexed"
     filename: str
     document_name: str
     file_type: str
@@ -31,6 +46,51 @@ class DocsIndexingResponse(BaseModel):
     errors: Optional[List[str]] = None
 
 
+class IndexingJobCreatedResponse(BaseModel):
+    job_id: str
+    status: str
+    total_files: int
+    rejected_files: int
+    status_url: str
+
+
+class IndexingJobError(BaseModel):
+    status: int
+    detail: Union[str, Dict[str, Any]]
+
+
+class IndexingJobFile(BaseModel):
+    filename: str
+    status: str
+    size_bytes: int
+    chunks_total: int
+    chunks_done: int
+    progress: float
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    chunks_per_second: Optional[float] = None
+    error: Optional[IndexingJobError] = None
+    result: Optional[DocumentIndexResult] = None
+
+
+class IndexingJobResponse(BaseModel):
+    job_id: str
+    status: str
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    total_files: int
+    queued_files: int
+    processing_files: int
+    completed_files: int
+    failed_files: int
+    total_chunks: int
+    total_bytes: int
+    chunks_per_second: Optional[float] = None
+    bytes_per_second: Optional[float] = None
+    files: List[IndexingJobFile]
+
+
 class SearchDocResult(BaseModel):
     rank: int
     content: str
@@ -59,3 +119,15 @@ class SearchDocsWithContextResponse(BaseModel):
     results: List[SearchDocResult]
     context: str
     context_stats: ContextStats
+
+
+class VectorEngineStats(BaseModel):
+    engine: str
+    stats: Dict[str, Any]
+
+
+class StoreCacheStats(BaseModel):
+    index_generation: int
+    search_results: Dict[str, float]
+    embeddings: Dict[str, float]
+    database: Dict[str, float]
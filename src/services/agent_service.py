@@ -0,0 +1,169 @@
+import asyncio
+import time
+from base64 import b64encode
+from typing import AsyncIterator, List, Optional, Tuple, Union
+
+from pydantic import BaseModel
+
+from src.config import settings
+from src.lib.cache.audio import AudioCache, audio_cache_key, default_audio_cache_dir
+from src.lib.clients.openai import OpenAIClient
+from src.lib.ffmpeg import audio_options
+from src.lib.sentences import SentenceSplitter
+from src.schemas.agent_schema import (
+    AgentDoneFrame,
+    AgentErrorFrame,
+    AgentResponse,
+    AgentTextFrame,
+    AudioCacheStats,
+)
+
+AUDIO_FORMAT = settings.audio_format
+
+
+class SentenceAudio(BaseModel):
+    """Áudio final de uma frase, em bytes."""
+
+    index: int
+    audio: bytes
+
+
+AgentFrame = Union[AgentTextFrame, SentenceAudio, AgentErrorFrame, AgentDoneFrame]
+
+
+class AgentService:
+    def __init__(
+        self,
+        client: Optional[OpenAIClient] = None,
+        db_file: str = settings.path_db_file,
+    ):
+        self.client = client or OpenAIClient()
+        self.audio_cache = (
+            AudioCache(
+                settings.audio_cache_dir or default_audio_cache_dir(db_file),
+                max_bytes=settings.audio_cache_max_bytes,
+            )
+            if settings.audio_cache_enabled
+            else None
+        )
+        self._tts_slots: Optional[asyncio.Semaphore] = None
+
+    def audio_cache_stats(self) -> AudioCacheStats:
+        return AudioCacheStats(
+            enabled=self.audio_cache is not None,
+            stats=self.audio_cache.stats() if self.audio_cache else {},
+        )
+
+    def _audio_key(self, text: str) -> str:
+        return audio_cache_key(
+            text,
+            model=settings.tts_model,
+            voice=settings.tts_voice,
+            native=self.client.native_audio_format() is not None,
+            **audio_options(),
+        )
+
+    async def _cached_audio(self, text: str, slots: Optional[asyncio.Semaphore]):
+        """
+        Áudio final do texto, do cache em disco quando possível.
+
+        Args:
+            text: Texto a ser falado
+            slots: Semáforo que limita as chamadas de TTS (None para não limitar)
+
+        Returns:
+            Bytes do áudio final
+        """
+        key = None
+        if self.audio_cache is not None:
+            key = self._audio_key(text)
+            audio = await asyncio.to_thread(self.audio_cache.get, key)
+            if audio is not None:
+                return audio
+
+        if slots is None:
+            audio = await self.client.synthesize_audio(text)
+        else:
+            async with slots:
+                audio = await self.client.synthesize_audio(text)
+
+        if key is not None:
+            await asyncio.to_thread(self.audio_cache.put, key, audio)
+        return audio
+
+    async def respond_audio(self, data: str) -> Tuple[str, bytes]:
+        """Resposta completa: texto e áudio final, sem base64."""
+        answer = await self.client.create_answer(data)
+        return answer, await self._cached_audio(answer, None)
+
+    async def respond(self, data: str) -> AgentResponse:
+        """Resposta completa em uma única mensagem (modo original do /ws/agent)."""
+        answer, audio = await self.respond_audio(data)
+        return AgentResponse(text=answer, audio_base64=b64encode(audio).decode())
+
+    async def _synthesize(self, sentence: str) -> bytes:
+        if self._tts_slots is None:
+            self._tts_slots = asyncio.Semaphore(settings.agent_tts_concurrency)
+        return await self._cached_audio(sentence, self._tts_slots)
+
+    async def stream(self, data: str) -> AsyncIterator[AgentFrame]:
+        """
+        Resposta em pipeline, frase a frase.
+
+        A resposta do modelo chega em streaming e é dividida em frases; cada
+        frase sai como AgentTextFrame assim que fica completa e já segue para
+        TTS (e transcodificação, fora do caminho rápido) enquanto as próximas
+        são geradas. Os áudios (SentenceAudio) saem na ordem das frases,
+        assim que cada um fica pronto; cabe ao chamador enviá-los em JSON ou
+        binário. O último frame é um AgentDoneFrame com o texto completo, como
+        o modelo o gerou, e as latências (first_text_ms, first_audio_ms,
+        total_ms).
+        """
+        started = time.perf_counter()
+        timings = {}
+        splitter = SentenceSplitter(settings.agent_sentence_min_chars)
+        pending: List[Tuple[int, asyncio.Task]] = []
+        sentences: List[str] = []
+        parts: List[str] = []
+
+        def elapsed() -> float:
+            return round((time.perf_counter() - started) * 1000, 2)
+
+        def start(sentence: str) -> AgentTextFrame:
+            index = len(sentences)
+            sentences.append(sentence)
+            pending.append((index, asyncio.create_task(self._synthesize(sentence))))
+            timings.setdefault("first_text_ms", elapsed())
+            return AgentTextFrame(index=index, text=sentence)
+
+        def audio_frame(index: int, task: asyncio.Task) -> AgentFrame:
+            if task.exception() is not None:
+                return AgentErrorFrame(
+                    index=index,
+                    detail=f"Erro ao gerar áudio: {str(task.exception())}",
+                )
+            timings.setdefault("first_audio_ms", elapsed())
+            return SentenceAudio(index=index, audio=task.result())
+
+        try:
+            async for chunk in self.client.stream_answer(data):
+                parts.append(chunk.content)
+                for sentence in splitter.feed(chunk.content):
+                    yield start(sentence)
+                while pending and pending[0][1].done():
+                    yield audio_frame(*pending.pop(0))
+
+            for sentence in splitter.flush():
+                yield start(sentence)
+            while pending:
+                index, task = pending.pop(0)
+                await asyncio.wait({task})
+                yield audio_frame(index, task)
+        finally:
+            for _, task in pending:
+                task.cancel()
+
+        timings["total_ms"] = elapsed()
+        yield AgentDoneFrame(
+            text="".join(parts), sentences=len(sentences), timings=timings
+        )
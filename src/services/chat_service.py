@@ -1,29 +1,250 @@
+import asyncio
+import re
+import time
 from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
+
+from pydantic import BaseModel
 
 from src.config import settings
+from src.lib.cache.answers import AnswerCache, default_answer_cache_path
+from src.lib.cache.results import ResultCache, normalize_query
 from src.lib.clients.openai import OpenAIClient
-from src.schemas.chat_schema import ChatRequest, ChatResponse, DocumentContext
+from src.lib.metrics import LatencyRecorder
+from src.schemas.chat_schema import (
+    AnswerCacheStats,
+    ChatMetrics,
+    ChatRequest,
+    ChatResponse,
+    DocumentContext,
+)
+from src.schemas.store_schema import SearchDocsWithContextResponse
 from src.services.store_service import StoreService
 
+# Palavras funcionais: sem nenhuma delas, o prompt é tratado como palavras-chave
+FUNCTION_WORDS = set(
+    "a o as os um uma de do da dos das em no na nos nas por para com que qual "
+    "quais como quando onde quem porque se e é há tem vai está estão ser foi".split()
+)
+
+
+NO_CONTEXT_ANSWER = (
+    "Não encontrei informações relevantes na base de conhecimento para "
+    "responder sua pergunta."
+)
+
+
+class ChatTurn(BaseModel):
+    """Estado de uma requisição de chat entre a busca e a geração."""
+
+    prompt: str
+    started: float
+    strategy: str
+    generation: int
+    prompt_embedding: Optional[List[float]]
+    search_response: SearchDocsWithContextResponse
+    expanded_query: Optional[str]
+    context_docs: List[DocumentContext]
+    full_prompt: str
+    timings: Dict[str, float]
+
 
 class ChatService:
     def __init__(self, db_file: str = settings.path_db_file):
         self.store_service = StoreService(db_file=db_file)
         self.openai_client = OpenAIClient()
+        self.answer_cache = (
+            AnswerCache(
+                settings.answer_cache_file or default_answer_cache_path(db_file),
+                model=self.store_service.llm_client.embedding_model,
+                max_entries=settings.answer_cache_max_entries,
+                threshold=settings.answer_cache_threshold,
+            )
+            if settings.answer_cache_enabled
+            else None
+        )
+        self.expansion_cache = ResultCache(
+            max_entries=settings.query_expansion_cache_max_entries,
+            ttl=settings.query_expansion_cache_ttl,
+        )
+        self.latencies = LatencyRecorder()
 
-    async def chat(self, request: ChatRequest) -> ChatResponse:
-        expanded_query, _ = await self.openai_client.vector_search_with_expansion(
-            request.prompt
+    async def _cached_response(
+        self, prompt_embedding: List[float]
+    ) -> Optional[ChatResponse]:
+        """
+        Procura uma resposta anterior para um prompt equivalente.
+
+        Se o índice mudou desde que a resposta foi gerada, ela só é mantida
+        quando todos os chunks usados como contexto continuam indexados;
+        caso contrário a entrada é descartada.
+        """
+        entry = await asyncio.to_thread(self.answer_cache.lookup, prompt_embedding)
+        if entry is None:
+            return None
+
+        llm_client = self.store_service.llm_client
+        generation = await llm_client.aindex_generation()
+        if entry.generation != generation:
+            exist = await llm_client.store.run_read(
+                llm_client.chunks_exist, entry.chunk_rowids
+            )
+            if not exist:
+                await asyncio.to_thread(self.answer_cache.invalidate, entry.id)
+                return None
+            await asyncio.to_thread(self.answer_cache.refresh, entry.id, generation)
+
+        response = ChatResponse.model_validate_json(entry.response)
+        response.timestamp = datetime.now()
+        response.cached = True
+        return response
+
+    def answer_cache_stats(self) -> AnswerCacheStats:
+        return AnswerCacheStats(
+            enabled=self.answer_cache is not None,
+            stats=self.answer_cache.stats() if self.answer_cache else {},
+        )
+
+    def metrics(self) -> ChatMetrics:
+        return ChatMetrics(
+            expansion_strategy=settings.query_expansion_strategy,
+            latencies=self.latencies.summary(),
         )
 
+    def _is_keyword_prompt(self, prompt: str) -> bool:
+        """
+        Prompts curtos ou só com palavras-chave (sem palavras funcionais nem
+        interrogação) ganham pouco com a expansão e vão direto para a busca.
+        """
+        words = re.findall(r"\w+", prompt.lower())
+        if len(words) <= settings.query_expansion_min_words:
+            return True
+        return "?" not in prompt and not FUNCTION_WORDS.intersection(words)
+
+    async def _embed_query(self, text: str) -> List[float]:
+        return await self.store_service.llm_client.aembed_query(text)
+
+    async def _expand(self, prompt: str, timings: Dict[str, float]):
+        started = time.perf_counter()
+        key = normalize_query(prompt)
+        expansion = None
+        if settings.query_expansion_strategy == "cache":
+            expansion = self.expansion_cache.get(key, 0)
+            timings["expansion_cache_hit"] = float(expansion is not None)
+        if expansion is None:
+            # O vetor vem do embedder do índice (e do cache de embeddings),
+            # não da API da OpenAI, para valer com qualquer backend.
+            expanded_query = await self.openai_client.semantic_search_query_expansion(
+                prompt
+            )
+            expansion = (expanded_query, await self._embed_query(expanded_query))
+            if settings.query_expansion_strategy == "cache":
+                self.expansion_cache.put(key, 0, expansion, len(expansion[0]))
+        elapsed = (time.perf_counter() - started) * 1000
+        timings["expansion_ms"] = round(elapsed, 2)
+        self.latencies.record("expansion", elapsed)
+        return expansion
+
+    async def _retrieve_expanded(
+        self, prompt: str, timings: Dict[str, float]
+    ) -> Tuple[SearchDocsWithContextResponse, Optional[str]]:
+        expanded_query, query_embedding = await self._expand(prompt, timings)
+
         search_response = await self.store_service.search_docs_with_context(
-            query=expanded_query, limit=5
+            query=expanded_query, limit=5, embedding=query_embedding
         )
 
-        if not search_response.results:
+        # Sem resultados para a query expandida, tenta o prompt original;
+        # se a expansão devolveu o próprio prompt, a busca seria a mesma.
+        if not search_response.results and prompt.strip() != expanded_query.strip():
             search_response = await self.store_service.search_docs_with_context(
-                query=request.prompt, limit=5
+                query=prompt, limit=5
             )
+        return search_response, expanded_query
+
+    async def _retrieve_speculative(
+        self, prompt: str, prompt_embedding: List[float], timings: Dict[str, float]
+    ) -> Tuple[SearchDocsWithContextResponse, Optional[str]]:
+        """
+        Busca pelo prompt original enquanto a expansão roda. Se a expansão
+        terminar dentro de settings.query_expansion_timeout, as duas listas
+        são combinadas por RRF; senão a resposta segue só com a busca crua.
+        """
+        expansion = asyncio.create_task(self._expand(prompt, timings))
+        raw = await self.store_service.search_docs(
+            prompt, limit=5, embedding=prompt_embedding
+        )
+
+        done, _ = await asyncio.wait(
+            {expansion}, timeout=settings.query_expansion_timeout
+        )
+        if not done or expansion.exception() is not None:
+            expansion.cancel()
+            timings["expansion_skipped"] = 1.0
+            return self.store_service.build_context(prompt, raw.results), None
+
+        expanded_query, query_embedding = expansion.result()
+        expanded = await self.store_service.search_docs(
+            expanded_query, limit=5, embedding=query_embedding
+        )
+        results = self.store_service.fuse_results(
+            [expanded.results, raw.results], limit=5
+        )
+        return self.store_service.build_context(expanded_query, results), expanded_query
+
+    async def _retrieve(
+        self,
+        prompt: str,
+        prompt_embedding: Optional[List[float]],
+        timings: Dict[str, float],
+    ) -> Tuple[SearchDocsWithContextResponse, Optional[str]]:
+        strategy = settings.query_expansion_strategy
+        if strategy == "adaptive" and self._is_keyword_prompt(prompt):
+            timings["expansion_skipped"] = 1.0
+            search_response = await self.store_service.search_docs_with_context(
+                query=prompt, limit=5, embedding=prompt_embedding
+            )
+            return search_response, None
+        if strategy == "speculative":
+            return await self._retrieve_speculative(prompt, prompt_embedding, timings)
+        return await self._retrieve_expanded(prompt, timings)
+
+    async def prepare_turn(self, request: ChatRequest) -> Union[ChatResponse, ChatTurn]:
+        """
+        Executa tudo o que vem antes da geração da resposta: cache
+        semântico, expansão e busca, e montagem do prompt.
+
+        Returns:
+            ChatResponse quando a resposta veio do cache; senão o ChatTurn
+            pronto para gerar a resposta
+        """
+        started = time.perf_counter()
+        strategy = settings.query_expansion_strategy
+        timings: Dict[str, float] = {}
+
+        llm_client = self.store_service.llm_client
+        generation = await llm_client.aindex_generation()
+        prompt_embedding = None
+        if self.answer_cache or strategy in ("adaptive", "speculative"):
+            # O vetor do prompt fica no cache de embeddings, então a busca
+            # pelo prompt original não chama o provedor de novo.
+            prompt_embedding = await self._embed_query(request.prompt)
+
+        if self.answer_cache:
+            cached = await self._cached_response(prompt_embedding)
+            if cached:
+                elapsed = (time.perf_counter() - started) * 1000
+                cached.timings = {"total_ms": round(elapsed, 2)}
+                self.latencies.record("answer_cache_hit", elapsed)
+                return cached
+
+        retrieval_started = time.perf_counter()
+        search_response, expanded_query = await self._retrieve(
+            request.prompt, prompt_embedding, timings
+        )
+        elapsed = (time.perf_counter() - retrieval_started) * 1000
+        timings["retrieval_ms"] = round(elapsed, 2)
+        self.latencies.record(f"retrieval.{strategy}", elapsed)
 
         context_docs = []
         for result in search_response.results:
@@ -55,23 +276,101 @@ INSTRUÇÃO: Analise todo o contexto acima e forneça uma resposta útil e prát
 
             full_prompt = f"{system_prompt}\n\n{user_message}"
         else:
-            full_prompt = f"Pergunta: {request.prompt}\n\nResposta: Não encontrei informações relevantes na base de conhecimento para responder sua pergunta."
+            full_prompt = f"Pergunta: {request.prompt}\n\nResposta: {NO_CONTEXT_ANSWER}"
 
-        if search_response.context:
-            output = await self.openai_client.create_answer(full_prompt)
-        else:
-            output = "Não encontrei informações relevantes na base de conhecimento para responder sua pergunta."
+        return ChatTurn(
+            prompt=request.prompt,
+            started=started,
+            strategy=strategy,
+            generation=generation,
+            prompt_embedding=prompt_embedding,
+            search_response=search_response,
+            expanded_query=expanded_query,
+            context_docs=context_docs,
+            full_prompt=full_prompt,
+            timings=timings,
+        )
 
+    async def finish_turn(
+        self,
+        turn: ChatTurn,
+        output: str,
+        token_usage: Optional[Dict[str, int]] = None,
+    ) -> ChatResponse:
+        has_context = bool(turn.search_response.context)
+        elapsed = (time.perf_counter() - turn.started) * 1000
+        turn.timings["total_ms"] = round(elapsed, 2)
+        self.latencies.record(f"total.{turn.strategy}", elapsed)
         estimated_tokens = (
-            len(full_prompt.split()) + len(output.split())
-            if search_response.context
-            else 0
+            len(turn.full_prompt.split()) + len(output.split()) if has_context else 0
         )
 
-        return ChatResponse(
+        response = ChatResponse(
             output=output,
             timestamp=datetime.now(),
-            context_used=context_docs,
+            context_used=turn.context_docs,
             total_tokens_estimated=estimated_tokens,
-            expanded_query=expanded_query,
+            token_usage=token_usage,
+            expanded_query=turn.expanded_query,
+            expansion_strategy=turn.strategy,
+            timings=turn.timings,
+        )
+
+        # Respostas sem contexto não são guardadas: um documento indexado
+        # depois pode passar a responder a pergunta.
+        if self.answer_cache and has_context:
+            await asyncio.to_thread(
+                self.answer_cache.put,
+                turn.prompt,
+                turn.prompt_embedding,
+                response.model_dump_json(),
+                turn.generation,
+                [result.metadata["rowid"] for result in turn.search_response.results],
+            )
+
+        return response
+
+    async def chat(self, request: ChatRequest) -> ChatResponse:
+        turn = await self.prepare_turn(request)
+        if isinstance(turn, ChatResponse):
+            return turn
+
+        if not turn.search_response.context:
+            return await self.finish_turn(turn, NO_CONTEXT_ANSWER)
+
+        generation_started = time.perf_counter()
+        output = await self.openai_client.create_answer(turn.full_prompt)
+        turn.timings["generation_ms"] = round(
+            (time.perf_counter() - generation_started) * 1000, 2
+        )
+        return await self.finish_turn(turn, output)
+
+    async def stream_turn(
+        self, turn: ChatTurn
+    ) -> AsyncIterator[Union[str, ChatResponse]]:
+        """
+        Gera a resposta em streaming: cada item é um trecho de texto e o
+        último é o ChatResponse final, com o uso real de tokens.
+        """
+        if not turn.search_response.context:
+            yield NO_CONTEXT_ANSWER
+            yield await self.finish_turn(turn, NO_CONTEXT_ANSWER)
+            return
+
+        generation_started = time.perf_counter()
+        parts: List[str] = []
+        usage = None
+        async for chunk in self.openai_client.stream_answer(turn.full_prompt):
+            if chunk.content:
+                if not parts:
+                    elapsed = (time.perf_counter() - generation_started) * 1000
+                    turn.timings["first_token_ms"] = round(elapsed, 2)
+                    self.latencies.record("first_token", elapsed)
+                parts.append(chunk.content)
+                yield chunk.content
+            if chunk.usage:
+                usage = chunk.usage
+        turn.timings["generation_ms"] = round(
+            (time.perf_counter() - generation_started) * 1000, 2
         )
+        yield await self.finish_turn(turn, "".join(parts), token_usage=usage)
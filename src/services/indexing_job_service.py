@@ -0,0 +1,268 @@
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException, UploadFile
+
+from src.api.exceptions.store_excpetions import JobNotFoundException
+from src.config import settings
+from src.lib.jobs import (
+    FINISHED_STATUSES,
+    JOB_COMPLETED,
+    JOB_FAILED,
+    JOB_PROCESSING,
+    JOB_QUEUED,
+    JobStore,
+    default_jobs_path,
+)
+from src.schemas.store_schema import (
+    DocsType,
+    DocumentIndexResult,
+    IndexingJobCreatedResponse,
+    IndexingJobError,
+    IndexingJobFile,
+    IndexingJobResponse,
+)
+from src.services.store_service import PreparedDocument, StoreService
+
+IDLE_POLL_SECONDS = 5.0
+
+
+def _timestamp(value: Optional[float]) -> Optional[datetime]:
+    return datetime.fromtimestamp(value) if value else None
+
+
+def _rate(amount: int, started_at: Optional[float], finished_at: Optional[float]):
+    if not started_at:
+        return None
+    elapsed = (finished_at or time.time()) - started_at
+    return round(amount / elapsed, 2) if elapsed > 0 else None
+
+
+def _job_error(exc: Exception, message: str = "") -> Dict[str, Any]:
+    """
+    Erro de um arquivo como {status, detail}, no formato das respostas HTTP.
+
+    Args:
+        exc: Exceção que rejeitou ou interrompeu o arquivo
+        message: Prefixo do detail quando a exceção não é uma HTTPException
+
+    Returns:
+        Dicionário gravado no JobStore e devolvido como IndexingJobError
+    """
+    if isinstance(exc, HTTPException):
+        return {"status": exc.status_code, "detail": exc.detail}
+    return {"status": 500, "detail": f"{message}{exc}"}
+
+
+def _stored_error(value: Optional[str]) -> Optional[IndexingJobError]:
+    if not value:
+        return None
+    try:
+        return IndexingJobError(**json.loads(value))
+    except ValueError:
+        # Jobs gravados antes do formato estruturado guardavam só o texto
+        return IndexingJobError(status=500, detail=value)
+
+
+class IndexingJobService:
+    """
+    Indexação em segundo plano.
+
+    Os arquivos são gravados em settings.indexing_jobs_dir e registrados no
+    JobStore; workers assíncronos consomem a fila arquivo a arquivo usando
+    o mesmo pipeline de StoreService.indexa_documentos.
+    """
+
+    def __init__(self, store_service: StoreService):
+        self.store_service = store_service
+        db_file = store_service.llm_client.db_file
+        self.jobs = JobStore(settings.indexing_jobs_file or default_jobs_path(db_file))
+        self.files_dir = settings.indexing_jobs_dir or os.path.join(
+            os.path.dirname(os.path.abspath(db_file)), "indexing_jobs"
+        )
+        os.makedirs(self.files_dir, exist_ok=True)
+        self._wakeup: Optional[asyncio.Event] = None
+        self._workers: List[asyncio.Task] = []
+
+    async def enqueue(self, files: List[UploadFile]) -> IndexingJobCreatedResponse:
+        if not files:
+            raise Exception("Nenhum arquivo fornecido")
+
+        entries = []
+        try:
+            for file in files:
+                try:
+                    file_format = self.store_service.get_file_format(file)
+                    path, content_hash, size = await self.store_service.spool_upload(
+                        file, self.files_dir
+                    )
+                except Exception as e:
+                    entries.append(
+                        {"filename": file.filename or "", "error": _job_error(e)}
+                    )
+                    continue
+                entries.append(
+                    {
+                        "filename": file.filename,
+                        "file_type": file_format.value,
+                        "path": path,
+                        "content_hash": content_hash,
+                        "size": size,
+                    }
+                )
+            job_id = self.jobs.create_job(entries)
+        except Exception:
+            for entry in entries:
+                if entry.get("path"):
+                    os.remove(entry["path"])
+            raise
+
+        if self._wakeup:
+            self._wakeup.set()
+
+        rejected = sum(1 for entry in entries if entry.get("error"))
+        return IndexingJobCreatedResponse(
+            job_id=job_id,
+            status=JOB_FAILED if rejected == len(entries) else JOB_QUEUED,
+            total_files=len(entries),
+            rejected_files=rejected,
+            status_url=f"/api/v1/store/docs/jobs/{job_id}",
+        )
+
+    def get_job(self, job_id: str) -> IndexingJobResponse:
+        found = self.jobs.get_job(job_id)
+        if found is None:
+            JobNotFoundException(job_id)
+        job, rows = found
+
+        files = []
+        for row in rows:
+            chunks_total = row["chunks_total"]
+            files.append(
+                IndexingJobFile(
+                    filename=row["filename"],
+                    status=row["status"],
+                    size_bytes=row["size"],
+                    chunks_total=chunks_total,
+                    chunks_done=row["chunks_done"],
+                    progress=(
+                        1.0
+                        if row["status"] in FINISHED_STATUSES
+                        else (
+                            round(row["chunks_done"] / chunks_total, 4)
+                            if chunks_total
+                            else 0.0
+                        )
+                    ),
+                    started_at=_timestamp(row["started_at"]),
+                    finished_at=_timestamp(row["finished_at"]),
+                    chunks_per_second=_rate(
+                        row["chunks_done"], row["started_at"], row["finished_at"]
+                    ),
+                    error=_stored_error(row["error"]),
+                    result=(
+                        DocumentIndexResult(**json.loads(row["result"]))
+                        if row["result"]
+                        else None
+                    ),
+                )
+            )
+
+        def count(status: str) -> int:
+            return sum(1 for file in files if file.status == status)
+
+        total_chunks = sum(file.chunks_done for file in files)
+        processed_bytes = sum(
+            file.size_bytes for file in files if file.status == JOB_COMPLETED
+        )
+        return IndexingJobResponse(
+            job_id=job["id"],
+            status=job["status"],
+            created_at=_timestamp(job["created_at"]),
+            started_at=_timestamp(job["started_at"]),
+            finished_at=_timestamp(job["finished_at"]),
+            total_files=len(files),
+            queued_files=count(JOB_QUEUED),
+            processing_files=count(JOB_PROCESSING),
+            completed_files=count(JOB_COMPLETED),
+            failed_files=count(JOB_FAILED),
+            total_chunks=total_chunks,
+            total_bytes=sum(file.size_bytes for file in files),
+            chunks_per_second=_rate(
+                total_chunks, job["started_at"], job["finished_at"]
+            ),
+            bytes_per_second=_rate(
+                processed_bytes, job["started_at"], job["finished_at"]
+            ),
+            files=files,
+        )
+
+    async def _process(self, row):
+        job_id, position = row["job_id"], row["position"]
+
+        def on_progress(chunks_done: int):
+            self.jobs.update_progress(job_id, position, chunks_done=chunks_done)
+
+        try:
+            prepared = await self.store_service.prepare_spooled(
+                row["filename"],
+                DocsType(row["file_type"]),
+                row["path"],
+                row["content_hash"],
+            )
+            if isinstance(prepared, PreparedDocument):
+                self.jobs.update_progress(
+                    job_id, position, chunks_total=prepared.result.chunks_created
+                )
+                await self.store_service.embed_and_write(prepared, on_progress)
+                result = prepared.result
+            else:
+                result = prepared
+        except Exception as e:
+            error = _job_error(e, f"Erro ao processar {row['filename']}: ")
+            print(f"Erro ao processar {row['filename']}: {e}")
+            self.jobs.finish_file(job_id, position, error=error)
+        else:
+            self.jobs.finish_file(job_id, position, result=result.model_dump())
+
+        if os.path.exists(row["path"]):
+            os.remove(row["path"])
+
+    async def _worker(self):
+        while True:
+            # Limpa antes de consultar a fila: um enqueue entre a consulta e
+            # a espera deixa o evento marcado e não é perdido.
+            self._wakeup.clear()
+            row = self.jobs.claim_next()
+            if row is None:
+                try:
+                    await asyncio.wait_for(
+                        self._wakeup.wait(), timeout=IDLE_POLL_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._process(row)
+
+    def start(self):
+        """Inicia os workers e retoma arquivos interrompidos por um restart."""
+        if self._workers:
+            return
+        requeued = self.jobs.requeue_interrupted()
+        if requeued:
+            print(f"{requeued} arquivo(s) de jobs interrompidos voltaram para a fila")
+        self._wakeup = asyncio.Event()
+        self._workers = [
+            asyncio.create_task(self._worker())
+            for _ in range(max(1, settings.indexing_job_workers))
+        ]
+
+    async def stop(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
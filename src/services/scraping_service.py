@@ -1,18 +1,18 @@
+import asyncio
 import csv
 import hashlib
 import os
 import re
-import time
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
-import requests
-import trafilatura
-from bs4 import BeautifulSoup
 from fastapi import HTTPException, UploadFile
 
 from src.config import settings
+from src.lib.clients.fetcher import AsyncFetcher
 from src.lib.clients.serpapi import SerpAPIClient
+from src.lib.extraction import extract_article
+from src.lib.workers import process_pool
 from src.schemas.scraping_schema import (DeleteFileResponse, EtlResponse,
                                          FileItem, ListFilesResponse,
                                          SearchLinksResponse)
@@ -52,38 +52,25 @@ class ScrapingService:
             writer.writerows(records)
         return file_path
 
-    def _fetch_html(self, url: str) -> str:
-        try:
-            r = requests.get(url, headers=self.headers, timeout=20)
-            r.raise_for_status()
-            return r.text
-        except requests.exceptions.RequestException:
-            return ""
-
-    def _extract_title(self, html: str) -> str:
-        if not html:
-            return ""
-        soup = BeautifulSoup(html, "html.parser")
-        og = soup.find("meta", property="og:title") or soup.find(
-            "meta", attrs={"name": "title"}
+    def _fetcher(self) -> AsyncFetcher:
+        return AsyncFetcher(
+            headers=self.headers,
+            concurrency=settings.scraping_concurrency,
+            per_host_concurrency=settings.scraping_per_host_concurrency,
+            per_host_delay=settings.scraping_per_host_delay,
+            timeout=settings.scraping_timeout,
+            retries=settings.scraping_retries,
         )
-        if og and og.get("content"):
-            return str(og["content"]).strip()
-        if soup.title and soup.title.string:
-            return soup.title.string.strip()
-        h1 = soup.find("h1")
-        return h1.get_text(strip=True) if h1 else ""
-
-    def _extract_text(self, html: str) -> str:
+
+    async def _fetch_html(self, fetcher: AsyncFetcher, url: str) -> str:
+        return await fetcher.fetch_text(url)
+
+    async def _extract_article(self, html: str) -> Tuple[str, str]:
         if not html:
-            return ""
-        try:
-            text = trafilatura.extract(
-                html, include_comments=False, include_tables=False
-            )
-            return str(text or "").strip()
-        except Exception:
-            return ""
+            return "", ""
+        loop = asyncio.get_running_loop()
+        pool = process_pool("scraping", settings.scraping_workers)
+        return await loop.run_in_executor(pool, extract_article, html)
 
     def _sanitize_filename(self, name: str, maxlen: int = 120) -> str:
         safe = "".join(
@@ -109,34 +96,35 @@ class ScrapingService:
                 }
             )
 
-    def _process_link(self, url: str, seen_titles: set):
-        html = self._fetch_html(url)
+    async def _process_link(self, fetcher: AsyncFetcher, url: str, seen_titles: set):
+        html = await self._fetch_html(fetcher, url)
         if not html:
             return
-        title = (
-            self._extract_title(html)
-            or f"artigo_{hashlib.sha1(url.encode('utf-8')).hexdigest()[:10]}"
-        )
+        title, content = await self._extract_article(html)
+        title = title or f"artigo_{hashlib.sha1(url.encode('utf-8')).hexdigest()[:10]}"
         key = title.lower().strip()
         if key in seen_titles:
             return
-        content = self._extract_text(html)
         if not content:
             return
         self._save_single_csv(title, url, content)
         seen_titles.add(key)
 
-    def _etl_one_file(self, input_file: str):
+    async def _process_links(self, links: List[str]):
+        seen = set()
+        async with self._fetcher() as fetcher:
+            await asyncio.gather(
+                *(self._process_link(fetcher, url, seen) for url in links)
+            )
+
+    async def _etl_one_file(self, input_file: str):
         try:
             with open(input_file, newline="", encoding="utf-8") as f:
                 reader = csv.DictReader(f)
                 links = [row["link"] for row in reader if row.get("link")]
         except Exception:
             return
-        seen = set()
-        for url in links:
-            self._process_link(url, seen)
-            time.sleep(0.2)
+        await self._process_links(links)
 
     def search_links(
         self,
@@ -220,10 +208,7 @@ class ScrapingService:
         if not links:
             raise HTTPException(status_code=400, detail="nenhum link encontrado no CSV")
 
-        seen = set()
-        for url in links:
-            self._process_link(url, seen)
-            time.sleep(0.2)
+        await self._process_links(links)
 
         return EtlResponse(
             filename=file.filename,
@@ -1,24 +1,54 @@
-import io
+import asyncio
+import hashlib
 import os
-from typing import List
+import tempfile
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
-import PyPDF2
-from docx import Document
 from fastapi import UploadFile
-from langchain_text_splitters import CharacterTextSplitter
+from langchain_core.documents import Document as LangChainDocument
+from pydantic import BaseModel
 
 from src.api.exceptions.store_excpetions import InvalidFormatException
 from src.config import settings
-from src.lib.clients.langchain import LangChainClient
-from src.schemas.store_schema import (ContextStats, DocsIndexingResponse,
-                                      DocsType, DocumentIndexResult,
-                                      SearchDocResult, SearchDocsResponse,
-                                      SearchDocsWithContextResponse)
+from src.lib.cache.results import ResultCache, normalize_query
+from src.lib.clients.langchain import get_langchain_client
+from src.lib.documents import iter_spooled_chunks, spool_chunks
+from src.lib.ranking import reciprocal_rank_fusion
+from src.lib.workers import run_in_pool
+from src.schemas.store_schema import (
+    ContextStats,
+    DocsIndexingResponse,
+    DocsType,
+    DocumentIndexResult,
+    SearchDocResult,
+    SearchDocsResponse,
+    SearchDocsWithContextResponse,
+    SearchFilters,
+    SearchMode,
+    StoreCacheStats,
+    VectorEngineStats,
+)
+
+UPLOAD_READ_BLOCK = 1 << 20
+
+
+class PreparedDocument(BaseModel):
+    filename: str
+    chunks_path: str
+    metadata: Dict[str, Any]
+    manifest: Dict[str, Any]
+    result: DocumentIndexResult
 
 
 class StoreService:
     def __init__(self, db_file: str = settings.path_db_file):
-        self.llm_client = LangChainClient(db_file=db_file)
+        # Serviços do mesmo processo dividem o cliente e o banco
+        self.llm_client = get_langchain_client(db_file)
+        self.results_cache = ResultCache(
+            max_entries=settings.search_cache_max_entries,
+            ttl=settings.search_cache_ttl,
+        )
         self.valid_extensions = {
             ".pdf": DocsType.PDF,
             ".docx": DocsType.DOCX,
@@ -30,7 +60,7 @@ class StoreService:
             ".markdown": DocsType.MD,
         }
 
-    def _get_file_format(self, file: UploadFile) -> DocsType:
+    def get_file_format(self, file: UploadFile) -> DocsType:
         if not file.filename:
             raise InvalidFormatException("Nome do arquivo não encontrado")
 
@@ -47,143 +77,261 @@ class StoreService:
         clean_name = name_without_ext.replace("_", " ").replace("-", " ")
         return clean_name.title().strip()
 
-    def _extract_text_from_pdf(self, content: bytes) -> str:
-        try:
-            pdf_file = io.BytesIO(content)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-
-            if len(pdf_reader.pages) == 0:
-                raise Exception("PDF está vazio ou corrompido")
-
-            text_parts = []
-            for page_num, page in enumerate(pdf_reader.pages, 1):
-                try:
-                    page_text = page.extract_text()
-                    if page_text.strip():
-                        text_parts.append(f"--- Página {page_num} ---\n{page_text}")
-                except Exception as e:
-                    text_parts.append(
-                        f"--- Página {page_num} ---\n[Erro ao extrair texto: {str(e)}]"
-                    )
-
-            if not text_parts:
-                raise Exception(
-                    "Não foi possível extrair texto de nenhuma página do PDF"
-                )
-
-            full_text = "\n\n".join(text_parts)
-            return full_text.strip()
-
-        except Exception as e:
-            raise Exception(f"Erro ao processar PDF: {str(e)}")
+    def _chunk_params(self, file_format: DocsType) -> Tuple[int, int]:
+        chunk_size = 1500 if file_format == DocsType.PDF else 1000
+        return chunk_size, 150
+
+    def _is_unchanged(
+        self,
+        manifest: Optional[dict],
+        content_hash: str,
+        chunk_size: int,
+        chunk_overlap: int,
+    ) -> bool:
+        return bool(
+            manifest
+            and manifest["content_hash"] == content_hash
+            and manifest["embedding_model"] == self.llm_client.embedding_model
+            and manifest["chunk_size"] == chunk_size
+            and manifest["chunk_overlap"] == chunk_overlap
+        )
 
-    def _extract_text_from_docx(self, content: bytes) -> str:
+    def _spool_path(self, suffix: str, directory: Optional[str] = None) -> str:
+        fd, path = tempfile.mkstemp(
+            suffix=suffix, dir=directory or settings.ingest_spool_dir
+        )
+        os.close(fd)
+        return path
+
+    async def spool_upload(
+        self, file: UploadFile, directory: Optional[str] = None
+    ) -> Tuple[str, str, int]:
+        """
+        Copia o upload para um arquivo temporário em blocos, calculando o
+        hash no caminho, sem manter o conteúdo inteiro em memória.
+
+        Args:
+            file: Arquivo recebido
+            directory: Diretório de destino; padrão é settings.ingest_spool_dir
+
+        Returns:
+            Caminho do arquivo gravado, sha256 do conteúdo e tamanho em bytes
+        """
+        path = self._spool_path(os.path.splitext(file.filename)[1], directory)
+        digest = hashlib.sha256()
+        size = 0
         try:
-            docx_file = io.BytesIO(content)
-            doc = Document(docx_file)
-
-            text_parts = []
-
-            for para in doc.paragraphs:
-                if para.text.strip():
-                    text_parts.append(para.text)
-
-            for table in doc.tables:
-                for row in table.rows:
-                    row_text = []
-                    for cell in row.cells:
-                        if cell.text.strip():
-                            row_text.append(cell.text.strip())
-                    if row_text:
-                        text_parts.append(" | ".join(row_text))
-
-            if not text_parts:
-                raise Exception("Documento DOCX está vazio")
-
-            full_text = "\n\n".join(text_parts)
-            return full_text.strip()
-
-        except Exception as e:
-            raise Exception(f"Erro ao processar DOCX: {str(e)}")
+            with open(path, "wb") as out:
+                while True:
+                    block = await file.read(UPLOAD_READ_BLOCK)
+                    if not block:
+                        break
+                    digest.update(block)
+                    size += len(block)
+                    out.write(block)
+        except Exception:
+            os.remove(path)
+            raise
+
+        if size == 0:
+            os.remove(path)
+            raise Exception("Arquivo está vazio")
 
-    def _extract_text_from_file(
-        self, content: bytes, file_format: DocsType, filename: str
-    ) -> str:
+        return path, digest.hexdigest(), size
+
+    async def _spool_chunks(
+        self,
+        path: str,
+        file_format: DocsType,
+        filename: str,
+        chunk_size: int,
+        chunk_overlap: int,
+        chunks_path: str,
+    ) -> Dict[str, Any]:
+        # Um job por processo do pool; o prazo conta a extração, não a fila
         try:
-            if file_format == DocsType.PDF:
-                return self._extract_text_from_pdf(content)
-            elif file_format == DocsType.DOCX:
-                return self._extract_text_from_docx(content)
-            elif file_format in [DocsType.TXT, DocsType.HTML, DocsType.MD]:
-                encodings = ["utf-8", "latin-1", "cp1252", "iso-8859-1"]
-                for encoding in encodings:
-                    try:
-                        text = content.decode(encoding)
-                        if len(text.strip()) > 0 and not any(
-                            char in text for char in ["\ufffd", "\x00"]
-                        ):
-                            return text
-                    except (UnicodeDecodeError, UnicodeError):
-                        continue
-
-                return content.decode("utf-8", errors="ignore")
-            else:
-                raise Exception(f"Tipo de arquivo não suportado: {file_format}")
-
-        except Exception as e:
-            raise Exception(f"Erro ao processar arquivo {filename}: {str(e)}")
-
-    async def indexa_documento(self, file: UploadFile) -> DocumentIndexResult:
-        file_format = self._get_file_format(file)
-        document_name = self._get_document_name(file.filename)
-
-        content = await file.read()
-
-        if len(content) == 0:
-            raise Exception("Arquivo está vazio")
+            return await run_in_pool(
+                "extraction",
+                spool_chunks,
+                path,
+                file_format,
+                filename,
+                chunk_size,
+                chunk_overlap,
+                chunks_path,
+                timeout=settings.extraction_timeout,
+                max_workers=settings.extraction_workers,
+            )
+        except TimeoutError:
+            raise Exception(
+                f"Tempo limite de {settings.extraction_timeout:g}s excedido "
+                f"ao extrair texto de {filename}"
+            )
 
+    async def _prepare_document(
+        self, file: UploadFile
+    ) -> Union[PreparedDocument, DocumentIndexResult]:
+        file_format = self.get_file_format(file)
+        upload_path, content_hash, _ = await self.spool_upload(file)
         try:
-            text = self._extract_text_from_file(content, file_format, file.filename)
+            return await self.prepare_spooled(
+                file.filename, file_format, upload_path, content_hash
+            )
+        finally:
+            os.remove(upload_path)
+
+    async def prepare_spooled(
+        self,
+        filename: str,
+        file_format: DocsType,
+        upload_path: str,
+        content_hash: str,
+    ) -> Union[PreparedDocument, DocumentIndexResult]:
+        """
+        Extrai e divide em chunks um arquivo já gravado em disco.
+
+        Args:
+            filename: Nome original do arquivo
+            file_format: Formato do arquivo
+            upload_path: Caminho do conteúdo enviado (não é removido aqui)
+            content_hash: sha256 do conteúdo
+
+        Returns:
+            PreparedDocument pronto para embed_and_write, ou o
+            DocumentIndexResult do manifesto se o arquivo não mudou
+        """
+        document_name = self._get_document_name(filename)
+        chunk_size, chunk_overlap = self._chunk_params(file_format)
+        manifest = await self.llm_client.store.run_read(
+            self.llm_client.get_manifest, filename
+        )
 
-            if not text.strip():
-                raise Exception("Não foi possível extrair conteúdo legível do arquivo")
+        if self._is_unchanged(manifest, content_hash, chunk_size, chunk_overlap):
+            return DocumentIndexResult(
+                message="Documento inalterado, indexação ignorada",
+                status="unchanged",
+                filename=filename,
+                document_name=document_name,
+                file_type=file_format.value,
+                chunks_created=manifest["chunk_count"],
+                characters_processed=manifest["characters"],
+                chunk_size_used=chunk_size,
+                preview=manifest["preview"] or "",
+            )
 
+        chunks_path = self._spool_path(".jsonl")
+        try:
+            stats = await self._spool_chunks(
+                upload_path,
+                file_format,
+                filename,
+                chunk_size,
+                chunk_overlap,
+                chunks_path,
+            )
         except Exception as e:
-            raise Exception(f"Erro ao processar {file.filename}: {str(e)}")
-
-        chunk_size = 1500 if file_format == DocsType.PDF else 1000
-        splitter = CharacterTextSplitter(
-            chunk_size=chunk_size, chunk_overlap=150, separator="\n\n"
-        )
-        docs = splitter.split_text(text)
+            os.remove(chunks_path)
+            raise Exception(f"Erro ao processar {filename}: {str(e)}")
 
-        if not docs:
+        if not stats["chunks"]:
+            os.remove(chunks_path)
             raise Exception("Não foi possível criar chunks do documento")
 
-        enriched_texts = []
-        for i, chunk in enumerate(docs):
-            metadata_text = f"""Arquivo: {file.filename}
-Nome: {document_name}
-Tipo: {file_format.value}
-Chunk: {i+1}/{len(docs)}
-Caracteres: {len(chunk)}
-
-{chunk}"""
-            enriched_texts.append(metadata_text)
-
-        self.llm_client.add_texts(enriched_texts)
-
-        return DocumentIndexResult(
-            message="Documento indexado com sucesso",
-            filename=file.filename,
-            document_name=document_name,
-            file_type=file_format.value,
-            chunks_created=len(docs),
-            characters_processed=len(text),
-            chunk_size_used=chunk_size,
-            preview=text[:300] + "..." if len(text) > 300 else text,
+        return PreparedDocument(
+            filename=filename,
+            chunks_path=chunks_path,
+            metadata={
+                "filename": filename,
+                "document_name": document_name,
+                "file_type": file_format.value,
+                "chunk_total": stats["chunks"],
+                "content_hash": content_hash,
+            },
+            manifest={
+                "content_hash": content_hash,
+                "embedding_model": self.llm_client.embedding_model,
+                "chunk_size": chunk_size,
+                "chunk_overlap": chunk_overlap,
+                "characters": stats["characters"],
+                "document_name": document_name,
+                "file_type": file_format.value,
+                "preview": stats["preview"],
+            },
+            result=DocumentIndexResult(
+                message=(
+                    "Documento reindexado com sucesso"
+                    if manifest
+                    else "Documento indexado com sucesso"
+                ),
+                status="updated" if manifest else "indexed",
+                filename=filename,
+                document_name=document_name,
+                file_type=file_format.value,
+                chunks_created=stats["chunks"],
+                characters_processed=stats["characters"],
+                chunk_size_used=chunk_size,
+                preview=stats["preview"],
+            ),
         )
 
+    async def embed_and_write(
+        self,
+        prepared: PreparedDocument,
+        on_progress: Optional[Callable[[int], None]] = None,
+    ):
+        """
+        Vetoriza e grava os chunks em janelas de settings.ingest_window_chunks.
+
+        Só uma janela por documento fica em memória; cada uma é gravada na
+        área de preparação e o documento é publicado de uma vez no final.
+        Arquivos diferentes rodam em paralelo e suas janelas entram na mesma
+        fila do EmbeddingScheduler, que junta chunks de vários arquivos nos
+        mesmos lotes por tokens. `on_progress` recebe a quantidade de chunks
+        já gravados após cada janela.
+        """
+        token = uuid.uuid4().hex
+        index = 0
+        try:
+            for window in iter_spooled_chunks(
+                prepared.chunks_path, settings.ingest_window_chunks
+            ):
+                texts = [chunk["text"] for chunk in window]
+                metadatas = []
+                for chunk in window:
+                    index += 1
+                    metadatas.append(
+                        {
+                            **prepared.metadata,
+                            "chunk_index": index,
+                            "start_offset": chunk["start"],
+                            "end_offset": chunk["start"] + len(chunk["text"]),
+                        }
+                    )
+                vectors = await self.llm_client.aembed_documents(texts)
+                await self.llm_client.stage_chunks(token, texts, metadatas, vectors)
+                if on_progress:
+                    on_progress(index)
+            await self.llm_client.commit_staged(
+                token, prepared.filename, prepared.manifest
+            )
+        except Exception:
+            await self.llm_client.discard_staged(token)
+            raise
+        finally:
+            os.remove(prepared.chunks_path)
+
+    async def _index_one(
+        self, file: UploadFile
+    ) -> Union[PreparedDocument, DocumentIndexResult]:
+        prepared = await self._prepare_document(file)
+        if isinstance(prepared, PreparedDocument):
+            await self.embed_and_write(prepared)
+        return prepared
+
+    async def indexa_documento(self, file: UploadFile) -> DocumentIndexResult:
+        entry = await self._index_one(file)
+        return entry.result if isinstance(entry, PreparedDocument) else entry
+
     async def indexa_documentos(self, files: List[UploadFile]) -> DocsIndexingResponse:
         if not files:
             raise Exception("Nenhum arquivo fornecido")
@@ -194,20 +342,24 @@ Caracteres: {len(chunk)}
         processed_files = 0
         errors = []
 
-        for file in files:
-            try:
-                result = await self.indexa_documento(file)
-                results.append(result)
-                total_chunks += result.chunks_created
-                total_characters += result.characters_processed
-                processed_files += 1
-
-            except Exception as e:
-                error_msg = f"Erro ao processar {file.filename}: {str(e)}"
+        # Cada arquivo é extraído, vetorizado e gravado em janelas; os
+        # arquivos correm em paralelo e a falha de um não afeta os demais.
+        entries = await asyncio.gather(
+            *(self._index_one(file) for file in files), return_exceptions=True
+        )
+        for file, entry in zip(files, entries):
+            if isinstance(entry, Exception):
+                error_msg = f"Erro ao processar {file.filename}: {str(entry)}"
                 errors.append(error_msg)
                 print(error_msg)
                 continue
 
+            result = entry.result if isinstance(entry, PreparedDocument) else entry
+            results.append(result)
+            total_chunks += result.chunks_created
+            total_characters += result.characters_processed
+            processed_files += 1
+
         if processed_files == 0:
             raise Exception(
                 f"Nenhum arquivo foi processado com sucesso. Erros: {'; '.join(errors)}"
@@ -221,48 +373,21 @@ Caracteres: {len(chunk)}
             errors=errors if errors else None,
         )
 
-    async def search_docs(self, query: str, limit: int = 5) -> SearchDocsResponse:
-        if not query.strip():
-            return SearchDocsResponse(results=[])
-
-        results = self.llm_client.similarity_search(query, k=limit)
-
-        if not results:
-            return SearchDocsResponse(results=[])
-
+    def _format_results(self, results: List[LangChainDocument]) -> SearchDocsResponse:
         formatted_results = []
         for i, doc in enumerate(results):
+            metadata = getattr(doc, "metadata", {})
             content = doc.page_content
-            lines = content.split("\n")
-
-            filename = ""
-            doc_name = ""
-            doc_type = ""
-            chunk_info = ""
-
-            for line in lines[:7]:
-                if line.startswith("Arquivo:"):
-                    filename = line.replace("Arquivo:", "").strip()
-                elif line.startswith("Nome:"):
-                    doc_name = line.replace("Nome:", "").strip()
-                elif line.startswith("Tipo:"):
-                    doc_type = line.replace("Tipo:", "").strip()
-                elif line.startswith("Chunk:"):
-                    chunk_info = line.replace("Chunk:", "").strip()
-
-            content_start = 0
-            for j, line in enumerate(lines):
-                if line.strip() == "" and j > 4:
-                    content_start = j + 1
-                    break
-
-            clean_content = (
-                "\n".join(lines[content_start:]) if content_start > 0 else content
+            doc_type = metadata.get("file_type") or ""
+            chunk_info = (
+                f"{metadata['chunk_index']}/{metadata['chunk_total']}"
+                if metadata.get("chunk_index")
+                else ""
             )
 
             preview_length = 300 if doc_type == "PDF" else 200
-            preview = clean_content[:preview_length]
-            if len(clean_content) > preview_length:
+            preview = content[:preview_length]
+            if len(content) > preview_length:
                 last_space = preview.rfind(" ")
                 if last_space > preview_length * 0.8:
                     preview = preview[:last_space]
@@ -271,25 +396,149 @@ Caracteres: {len(chunk)}
             formatted_results.append(
                 SearchDocResult(
                     rank=i + 1,
-                    content=clean_content,
-                    filename=filename,
-                    document_name=doc_name,
+                    content=content,
+                    filename=metadata.get("filename") or "",
+                    document_name=metadata.get("document_name") or "",
                     document_type=doc_type,
                     chunk=chunk_info,
                     preview=preview,
-                    content_length=len(clean_content),
-                    metadata=getattr(doc, "metadata", {}),
+                    content_length=len(content),
+                    metadata=metadata,
                 )
             )
 
         return SearchDocsResponse(results=formatted_results)
 
-    async def search_docs_with_context(
-        self, query: str, limit: int = 5
-    ) -> SearchDocsWithContextResponse:
-        results = await self.search_docs(query, limit)
+    def _hybrid_search(
+        self,
+        query: str,
+        limit: int,
+        embedding: List[float],
+        filters: Optional[Dict[str, Any]],
+    ) -> List[LangChainDocument]:
+        candidates = max(limit, settings.search_hybrid_candidates)
+        return reciprocal_rank_fusion(
+            [
+                self.llm_client.similarity_search_by_vector(
+                    embedding, k=candidates, filters=filters
+                ),
+                self.llm_client.lexical_search(query, k=candidates, filters=filters),
+            ],
+            key=lambda doc: doc.metadata["rowid"],
+            limit=limit,
+        )
 
-        if not results.results:
+    async def search_docs(
+        self,
+        query: str,
+        limit: int = 5,
+        embedding: Optional[List[float]] = None,
+        mode: SearchMode = SearchMode.VECTOR,
+        filters: Optional[SearchFilters] = None,
+    ) -> SearchDocsResponse:
+        """
+        Busca os chunks mais próximos da query.
+
+        Args:
+            query: Texto de busca
+            limit: Quantidade máxima de resultados
+            embedding: Vetor da query já calculado pelo chamador; quando
+                informado, a query não é vetorizada de novo
+            mode: "vector" (KNN no sqlite-vec), "lexical" (BM25 no FTS5, sem
+                chamada de embedding) ou "hybrid" (os dois combinados com
+                Reciprocal Rank Fusion)
+            filters: Restringe a busca a um arquivo, tipo de arquivo ou
+                intervalo de datas de indexação, antes do KNN
+
+        Returns:
+            SearchDocsResponse com os resultados ordenados por relevância
+        """
+        if not query.strip():
+            return SearchDocsResponse(results=[])
+
+        conditions = filters.model_dump(exclude_none=True) if filters else {}
+        # O resultado é o mesmo enquanto o índice não mudar; a geração entra
+        # na validação da entrada, não na chave.
+        key = (
+            normalize_query(query),
+            limit,
+            mode.value,
+            tuple(sorted(conditions.items())),
+        )
+        generation = await self.llm_client.aindex_generation()
+        cached = self.results_cache.get(key, generation)
+        if cached is not None:
+            return cached
+
+        degraded = False
+        if embedding is None and mode != SearchMode.LEXICAL:
+            # Vetoriza no event loop, antes de ir para o executor: consultas
+            # simultâneas entram nos mesmos lotes do embedder.
+            try:
+                embedding = await self.llm_client.aembed_query(query)
+            except Exception as e:
+                print(f"Erro ao vetorizar a query: {str(e)}")
+                if mode == SearchMode.VECTOR:
+                    return SearchDocsResponse(results=[])
+                # A híbrida segue só com a parte lexical, fora do cache
+                mode, degraded = SearchMode.LEXICAL, True
+
+        # As buscas bloqueiam (sqlite, numpy); rodam no executor de leitura
+        # do StoreManager, uma conexão do pool por busca.
+        if mode == SearchMode.LEXICAL:
+            search, args = self.llm_client.lexical_search, (query, limit, conditions)
+        elif mode == SearchMode.HYBRID:
+            search, args = self._hybrid_search, (query, limit, embedding, conditions)
+        else:
+            search = self.llm_client.similarity_search_by_vector
+            args = (embedding, limit, conditions)
+        results = await self.llm_client.store.run_read(search, *args)
+
+        if not results:
+            return SearchDocsResponse(results=[])
+
+        response = self._format_results(results)
+        if not degraded:
+            self.results_cache.put(
+                key, generation, response, len(response.model_dump_json())
+            )
+        return response
+
+    async def cache_stats(self) -> StoreCacheStats:
+        return StoreCacheStats(
+            index_generation=await self.llm_client.aindex_generation(),
+            search_results=self.results_cache.stats(),
+            embeddings=self.llm_client.embedding.stats(),
+            database=self.llm_client.store.stats(),
+        )
+
+    def vector_engine_stats(self) -> VectorEngineStats:
+        engine = self.llm_client.vector_engine
+        if engine is not None:
+            stats = engine.stats()
+        else:
+            stats = {
+                "quantization": settings.vector_quantization,
+                "rerank_factor": settings.vector_rerank_factor,
+            }
+        return VectorEngineStats(engine=settings.vector_engine, stats=stats)
+
+    def fuse_results(
+        self, rankings: List[List[SearchDocResult]], limit: int = 5
+    ) -> List[SearchDocResult]:
+        """Combina resultados de buscas diferentes com Reciprocal Rank Fusion."""
+        fused = reciprocal_rank_fusion(
+            rankings, key=lambda result: result.metadata.get("rowid"), limit=limit
+        )
+        return [
+            result.model_copy(update={"rank": rank})
+            for rank, result in enumerate(fused, 1)
+        ]
+
+    def build_context(
+        self, query: str, results: List[SearchDocResult]
+    ) -> SearchDocsWithContextResponse:
+        if not results:
             return SearchDocsWithContextResponse(
                 query=query,
                 found_documents=0,
@@ -303,7 +552,7 @@ Caracteres: {len(chunk)}
             )
 
         context_parts = []
-        for result in results.results:
+        for result in results:
             context_parts.append(
                 f"[{result.document_name} - Chunk {result.chunk}]: {result.content}"
             )
@@ -315,12 +564,25 @@ Caracteres: {len(chunk)}
 
         return SearchDocsWithContextResponse(
             query=query,
-            found_documents=len(results.results),
-            results=results.results,
+            found_documents=len(results),
+            results=results,
             context=context,
             context_stats=ContextStats(
                 total_characters=total_chars,
                 estimated_tokens=estimated_tokens,
-                chunks_included=len(results.results),
+                chunks_included=len(results),
             ),
         )
+
+    async def search_docs_with_context(
+        self,
+        query: str,
+        limit: int = 5,
+        embedding: Optional[List[float]] = None,
+        mode: SearchMode = SearchMode.VECTOR,
+        filters: Optional[SearchFilters] = None,
+    ) -> SearchDocsWithContextResponse:
+        results = await self.search_docs(
+            query, limit, embedding=embedding, mode=mode, filters=filters
+        )
+        return self.build_context(query, results.results)
@@ -0,0 +1,34 @@
+import os
+
+# Settings exige as chaves; os testes não chamam as APIs
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("SERP_API_KEY", "test")
+
+import pytest  # noqa: E402
+from langchain_core.embeddings import DeterministicFakeEmbedding  # noqa: E402
+
+import src.lib.clients.langchain as langchain_client  # noqa: E402
+from src.lib.store_manager import close_store_managers  # noqa: E402
+
+
+@pytest.fixture
+def db_file(tmp_path):
+    yield str(tmp_path / "vector_store.db")
+    close_store_managers()
+
+
+@pytest.fixture
+def new_client(db_file, monkeypatch):
+    """Cria LangChainClients sobre db_file com embeddings determinísticos."""
+    monkeypatch.setattr(
+        langchain_client,
+        "build_embedding_provider",
+        lambda: DeterministicFakeEmbedding(size=16),
+    )
+
+    def create() -> langchain_client.LangChainClient:
+        client = langchain_client.LangChainClient(db_file=db_file)
+        client.init_db()
+        return client
+
+    return create
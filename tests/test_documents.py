@@ -0,0 +1,80 @@
+import random
+
+import pytest
+from langchain_text_splitters import CharacterTextSplitter
+
+from src.lib.documents import SEPARATOR, iter_chunks
+
+
+def sample_text(seed: int, paragraphs: int = 80) -> str:
+    rng = random.Random(seed)
+    words = ["chuva", "alagamento", "bairro", "Aracaju", "Defesa", "Civil", "rio"]
+    parts = []
+    for _ in range(paragraphs):
+        size = rng.choice([1, 5, 20, 60, 250])
+        paragraph = " ".join(rng.choice(words) for _ in range(size))
+        # Espaços e quebras extras nas bordas, separadores repetidos
+        parts.append(rng.choice(["", " ", "\n"]) + paragraph + rng.choice(["", "  "]))
+        if rng.random() < 0.1:
+            parts.append("")
+    return SEPARATOR.join(parts)
+
+
+def segmented(text: str, seed: int):
+    """Divide o texto em trechos de tamanho aleatório, cortando separadores."""
+    rng = random.Random(seed)
+    position = 0
+    while position < len(text):
+        size = rng.choice([1, 2, 3, 17, 500, 4096])
+        yield text[position : position + size]
+        position += size
+
+
+@pytest.mark.parametrize(
+    "chunk_size,chunk_overlap", [(1000, 150), (1500, 150), (200, 50)]
+)
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_character_text_splitter(seed, chunk_size, chunk_overlap):
+    text = sample_text(seed)
+    splitter = CharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap, separator=SEPARATOR
+    )
+
+    chunks = list(iter_chunks(segmented(text, seed), chunk_size, chunk_overlap))
+
+    assert [chunk for chunk, _ in chunks] == splitter.split_text(text)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_offsets_point_into_the_text(seed):
+    text = sample_text(seed)
+
+    for chunk, start in iter_chunks(segmented(text, seed), 400, 100):
+        # Separadores repetidos viram um só no chunk, como no LangChain; o
+        # offset aponta para o início do primeiro pedaço
+        assert text.startswith(chunk.split(SEPARATOR)[0], start)
+
+
+def test_separator_split_across_segments():
+    segments = ["primeiro parágrafo\n", "\nsegundo", " parágrafo\n", "\n", "\nterceiro"]
+    text = "".join(segments)
+    splitter = CharacterTextSplitter(
+        chunk_size=20, chunk_overlap=0, separator=SEPARATOR
+    )
+
+    chunks = list(iter_chunks(segments, 20, 0))
+
+    assert [chunk for chunk, _ in chunks] == splitter.split_text(text)
+    assert [start for _, start in chunks] == [0, 20, 40]
+
+
+def test_piece_larger_than_chunk_size_stays_whole():
+    long_piece = "x" * 50
+
+    chunks = list(iter_chunks(["a\n\n", long_piece, "\n\nb"], 10, 0))
+
+    assert [chunk for chunk, _ in chunks] == ["a", long_piece, "b"]
+
+
+def test_blank_text_has_no_chunks():
+    assert list(iter_chunks(["", "\n\n", "  \n\n"], 100, 10)) == []
@@ -0,0 +1,106 @@
+import json
+
+import pytest
+
+from src.lib.jobs import (
+    JOB_COMPLETED,
+    JOB_FAILED,
+    JOB_PROCESSING,
+    JOB_QUEUED,
+    JobStore,
+)
+
+
+@pytest.fixture
+def jobs(tmp_path):
+    return JobStore(str(tmp_path / "indexing_jobs.db"))
+
+
+def accepted(name: str):
+    return {
+        "filename": name,
+        "file_type": "txt",
+        "path": f"/tmp/{name}",
+        "content_hash": name,
+        "size": 10,
+    }
+
+
+def result(chunks: int):
+    return {"chunks_created": chunks, "message": "ok"}
+
+
+def test_files_are_claimed_in_job_order(jobs):
+    first = jobs.create_job([accepted("a.txt"), accepted("b.txt")])
+    second = jobs.create_job([accepted("c.txt")])
+
+    claimed = [jobs.claim_next() for _ in range(3)]
+
+    assert [(row["job_id"], row["filename"]) for row in claimed] == [
+        (first, "a.txt"),
+        (first, "b.txt"),
+        (second, "c.txt"),
+    ]
+    assert jobs.claim_next() is None
+    job, files = jobs.get_job(first)
+    assert job["status"] == JOB_PROCESSING
+    assert {row["status"] for row in files} == {JOB_PROCESSING}
+
+
+def test_job_finishes_with_its_last_file(jobs):
+    job_id = jobs.create_job([accepted("a.txt"), accepted("b.txt")])
+    a, b = jobs.claim_next(), jobs.claim_next()
+
+    jobs.update_progress(job_id, a["position"], chunks_total=4, chunks_done=2)
+    jobs.finish_file(job_id, a["position"], result=result(4))
+    assert jobs.get_job(job_id)[0]["status"] == JOB_PROCESSING
+
+    error = {"status": 500, "detail": "falhou"}
+    jobs.finish_file(job_id, b["position"], error=error)
+    job, files = jobs.get_job(job_id)
+
+    assert job["status"] == JOB_COMPLETED
+    assert job["finished_at"] is not None
+    assert files[0]["status"] == JOB_COMPLETED
+    assert files[0]["chunks_done"] == files[0]["chunks_total"] == 4
+    assert json.loads(files[0]["result"]) == result(4)
+    assert files[1]["status"] == JOB_FAILED
+    assert json.loads(files[1]["error"]) == error
+
+
+def test_rejected_files_start_failed(jobs):
+    error = {"status": 400, "detail": {"status": "invalid_format", "type": ".exe"}}
+    job_id = jobs.create_job([{"filename": "x.exe", "error": error}, accepted("a.txt")])
+
+    job, files = jobs.get_job(job_id)
+    assert job["status"] == JOB_QUEUED
+    assert files[0]["status"] == JOB_FAILED
+    assert json.loads(files[0]["error"]) == error
+    assert jobs.claim_next()["filename"] == "a.txt"
+
+
+def test_job_with_only_rejected_files_fails(jobs):
+    job_id = jobs.create_job([{"filename": "x.exe", "error": {"status": 400}}])
+
+    assert jobs.get_job(job_id)[0]["status"] == JOB_FAILED
+    assert jobs.claim_next() is None
+
+
+def test_requeue_interrupted(jobs):
+    job_id = jobs.create_job([accepted("a.txt")])
+    row = jobs.claim_next()
+    jobs.update_progress(job_id, row["position"], chunks_done=3)
+
+    # Outro JobStore no mesmo arquivo, como após um restart da API
+    restarted = JobStore(jobs.db_file)
+    assert restarted.requeue_interrupted() == 1
+
+    _, files = restarted.get_job(job_id)
+    assert files[0]["status"] == JOB_QUEUED
+    assert files[0]["chunks_done"] == 0
+    assert files[0]["started_at"] is None
+    assert restarted.claim_next()["filename"] == "a.txt"
+
+
+def test_unknown_job(jobs):
+    assert jobs.get_job("nope") is None
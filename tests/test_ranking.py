@@ -0,0 +1,45 @@
+from src.lib.ranking import RRF_K, reciprocal_rank_fusion
+
+
+def identity(item):
+    return item
+
+
+def test_items_in_both_rankings_come_first():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "d"]], identity, limit=4)
+
+    assert fused[0] == "c"
+    assert set(fused) == {"a", "b", "c", "d"}
+
+
+def test_scores_follow_reciprocal_rank():
+    # b: 1/(k+2) + 1/(k+1) supera a: 1/(k+1) + 1/(k+3)
+    fused = reciprocal_rank_fusion([["a", "b"], ["b", "x", "a"]], identity, limit=3)
+
+    assert fused == ["b", "a", "x"]
+
+
+def test_duplicates_keep_first_occurrence():
+    first = {"rowid": 1, "source": "vector"}
+    second = {"rowid": 1, "source": "lexical"}
+
+    fused = reciprocal_rank_fusion(
+        [[first], [second]], key=lambda item: item["rowid"], limit=5
+    )
+
+    assert fused == [first]
+    assert fused[0] is first
+
+
+def test_limit_and_empty_rankings():
+    assert reciprocal_rank_fusion([], identity, limit=3) == []
+    assert reciprocal_rank_fusion([[], []], identity, limit=3) == []
+    assert reciprocal_rank_fusion([list("abcdef")], identity, limit=2) == ["a", "b"]
+
+
+def test_k_balances_top_positions_against_agreement():
+    rankings = [["x", "a", "y"], ["b", "c", "y"]]
+
+    # Com k alto, aparecer nas duas listas vale mais que um primeiro lugar
+    assert reciprocal_rank_fusion(rankings, identity, limit=1, k=RRF_K) == ["y"]
+    assert reciprocal_rank_fusion(rankings, identity, limit=1, k=0) == ["x"]
@@ -0,0 +1,97 @@
+import pytest
+
+import src.lib.clients.langchain as langchain_client
+from src.config import settings
+
+LEGACY_CHUNK = (
+    "Arquivo: boletim.txt\n"
+    "Nome: boletim\n"
+    "Tipo: txt\n"
+    "Chunk: 2/3\n"
+    "Caracteres: 31\n"
+    "\n"
+    "Chuva forte no bairro São José."
+)
+
+
+def vector_storage(client):
+    conn = client.store.connect()
+    try:
+        column = client._vector_column()
+        rows = conn.execute(f"SELECT count(*) FROM {client.table}_vec").fetchone()[0]
+        trigger = conn.execute(
+            "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name = ?",
+            (f"{client.table}_embed_text",),
+        ).fetchone()[0]
+    finally:
+        conn.close()
+    return column.group(1), rows, trigger
+
+
+def test_legacy_header_moves_to_columns(new_client):
+    client = new_client()
+    client.add_texts([LEGACY_CHUNK, "Texto sem cabeçalho."])
+
+    migrated = new_client()
+    rows = migrated.store.read(
+        lambda conn: conn.execute(
+            f"SELECT text, filename, document_name, file_type, chunk_index, "
+            f"chunk_total FROM {migrated.table} ORDER BY rowid"
+        ).fetchall()
+    )
+
+    assert tuple(rows[0]) == (
+        "Chuva forte no bairro São José.",
+        "boletim.txt",
+        "boletim",
+        "txt",
+        2,
+        3,
+    )
+    assert tuple(rows[1]) == ("Texto sem cabeçalho.", None, None, None, None, None)
+
+
+@pytest.mark.parametrize(
+    "quantization,column_type", [("int8", "int8"), ("binary", "bit")]
+)
+def test_quantization_rebuilds_vector_table(
+    new_client, monkeypatch, quantization, column_type
+):
+    client = new_client()
+    client.add_texts([f"chuva no bairro {i}" for i in range(20)])
+    assert vector_storage(client) == ("float", 20, 1)
+
+    monkeypatch.setattr(settings, "vector_quantization", quantization)
+    quantized = new_client()
+    assert vector_storage(quantized) == (column_type, 20, 1)
+
+    # O trigger recriado quantiza as inserções novas
+    quantized.add_texts(["alagamento na avenida"])
+    assert vector_storage(quantized) == (column_type, 21, 1)
+
+    monkeypatch.setattr(settings, "vector_quantization", "float32")
+    assert vector_storage(new_client()) == ("float", 21, 1)
+
+
+def test_failed_quantization_keeps_the_old_table(new_client, monkeypatch):
+    client = new_client()
+    client.add_texts([f"chuva no bairro {i}" for i in range(5)])
+
+    quantize_sql = langchain_client.quantize_sql
+    monkeypatch.setattr(settings, "vector_quantization", "int8")
+    monkeypatch.setattr(
+        langchain_client,
+        "quantize_sql",
+        lambda expression, quantization: f"no_such_function({expression})",
+    )
+    with pytest.raises(Exception):
+        new_client()
+
+    # Nada da migração ficou: tabela float32 completa e trigger presente
+    assert vector_storage(client) == ("float", 5, 1)
+    client.add_texts(["alagamento na avenida"])
+    assert vector_storage(client) == ("float", 6, 1)
+
+    # A próxima abertura refaz a migração do zero
+    monkeypatch.setattr(langchain_client, "quantize_sql", quantize_sql)
+    assert vector_storage(new_client()) == ("int8", 6, 1)
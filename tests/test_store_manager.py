@@ -0,0 +1,77 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.lib.store_manager import StoreManager
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = StoreManager(str(tmp_path / "store.db"), readers=2)
+    manager.write(lambda conn: conn.execute("CREATE TABLE items (name TEXT UNIQUE)"))
+    yield manager
+    manager.close()
+
+
+def names(manager: StoreManager):
+    return manager.read(
+        lambda conn: [row[0] for row in conn.execute("SELECT name FROM items")]
+    )
+
+
+def insert(name: str):
+    def job(conn):
+        conn.execute("INSERT INTO items(name) VALUES (?)", (name,))
+        return name
+
+    return job
+
+
+def test_failed_write_does_not_undo_its_group(manager):
+    running, release = threading.Event(), threading.Event()
+
+    def gate(conn):
+        # Segura o escritor: as próximas gravações entram juntas no grupo seguinte
+        running.set()
+        release.wait(5)
+
+    def partial(conn):
+        conn.execute("INSERT INTO items(name) VALUES ('c')")
+        conn.execute("INSERT INTO items(name) VALUES ('a')")
+
+    gated = manager.submit(gate)
+    assert running.wait(5)
+    futures = [manager.submit(job) for job in (insert("a"), partial, insert("d"))]
+    release.set()
+    gated.result()
+
+    assert futures[0].result() == "a"
+    with pytest.raises(Exception):
+        futures[1].result()
+    assert futures[2].result() == "d"
+
+    # 'c' foi desfeito junto com a gravação que falhou
+    assert sorted(names(manager)) == ["a", "d"]
+    stats = manager.stats()
+    assert stats["largest_group"] == 3
+    assert stats["failed_writes"] == 1
+
+
+def test_readers_see_committed_writes(manager):
+    manager.write(insert("a"))
+
+    with manager.reader() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("SELECT count(*) FROM items").fetchone()[0] == 1
+
+
+def test_run_read_uses_the_executor(manager):
+    manager.write(insert("a"))
+
+    def read():
+        return threading.current_thread().name, names(manager)
+
+    thread, found = asyncio.run(manager.run_read(read))
+    assert thread.startswith("store-read")
+    assert found == ["a"]